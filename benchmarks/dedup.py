@@ -0,0 +1,101 @@
+"""Compares the perceptual hash deduplication with pairwise RMSE comparisons.
+
+Usage: python benchmarks/dedup.py [--sizes 100 1000 10000]
+
+Synthetic frames are generated: a handful of distinct screens, each repeated
+with small amounts of noise as if extracted from a video. The pairwise
+comparison is quadratic, so it is only run up to --pairwise-max frames.
+"""
+
+import random
+import shutil
+import tempfile
+import time
+from pathlib import Path
+import typer
+from PIL import Image, ImageDraw
+from rich.table import Table
+from agent.dedup import DedupSettings
+from agent.logging import console
+from agent.video import calculate_rmse, keep_unique_images
+
+
+def generate_frames(directory: Path, count: int, screens: int):
+    random.seed(count)
+    for index in range(count):
+        screen = index * screens // count
+        image = Image.new("RGB", (640, 360), (255, 255, 255))
+        draw = ImageDraw.Draw(image)
+        draw.rectangle((0, 0, 640, 48), fill=(30, 60, 120))
+        # every screen has its own heading and a panel in a different place
+        draw.text((24, 12), f"Screen {screen}", fill=(255, 255, 255))
+        top = 60 + screen * 280 // screens
+        draw.rectangle((24, top, 320, top + 60), outline=0, fill=(230, 230, 230))
+        draw.text((36, top + 20), "lorem ipsum " * (screen % 4 + 1), fill=0)
+        for _ in range(10):
+            x, y = random.randrange(640), random.randrange(360)
+            image.putpixel((x, y), (random.randrange(256),) * 3)
+        image.save(directory / f"frame{index:05}.png")
+
+
+def pairwise_unique_images(directory: Path, threshold: float = 5.0) -> list[Path]:
+    """The pairwise comparison keep_unique_images used before hashing"""
+    unique_images = []
+    image_paths = sorted(directory.glob("*.png"))
+    while image_paths:
+        current_image = image_paths.pop(0)
+        unique_images.append(current_image)
+        for other_image in image_paths[:]:
+            if calculate_rmse(current_image, other_image) < threshold:
+                other_image.unlink()
+                image_paths.remove(other_image)
+    return unique_images
+
+
+def time_method(frames: Path, method) -> tuple[float, int]:
+    with tempfile.TemporaryDirectory() as directory:
+        directory = Path(directory)
+        for frame in frames.iterdir():
+            shutil.copy(frame, directory)
+        start = time.perf_counter()
+        unique = method(directory)
+        return time.perf_counter() - start, len(unique)
+
+
+def main(
+    sizes: list[int] = typer.Option([100, 1000, 10000], help="Numbers of frames."),
+    screens: int = typer.Option(20, help="Distinct screens among the frames."),
+    pairwise_max: int = typer.Option(1000, help="Largest size to compare pairwise."),
+):
+    methods = {
+        "dhash": lambda d: keep_unique_images(d, settings=DedupSettings(verify=False)),
+        "dhash + rmse": lambda d: keep_unique_images(
+            d, settings=DedupSettings(verify=True)
+        ),
+        "pairwise rmse": pairwise_unique_images,
+    }
+
+    table = Table(title="Image deduplication")
+    table.add_column("Frames", justify="right")
+    for name in methods:
+        table.add_column(f"{name} s", justify="right")
+        table.add_column(f"{name} kept", justify="right")
+
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as frames:
+            frames = Path(frames)
+            generate_frames(frames, size, screens)
+            row = [str(size)]
+            for name, method in methods.items():
+                if name == "pairwise rmse" and size > pairwise_max:
+                    row.extend(["-", "-"])
+                    continue
+                seconds, kept = time_method(frames, method)
+                row.extend([f"{seconds:.2f}", str(kept)])
+            table.add_row(*row)
+
+    console.print(table)
+
+
+if __name__ == "__main__":
+    typer.run(main)
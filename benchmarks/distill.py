@@ -0,0 +1,49 @@
+"""Measures the token reduction of the elements mode on saved pages.
+
+Usage: python benchmarks/distill.py <directory of saved .html pages>
+
+Pages saved by the agent in DEBUG mode or stored in the page cache
+(.agent/cache/pages) can be used as the corpus.
+"""
+
+from pathlib import Path
+import typer
+from rich.table import Table
+from agent.cleaning import clean_html
+from agent.distill import distill_html
+from agent.logging import console
+from agent.utils import estimate_tokens
+
+
+def main(
+    pages: Path = typer.Argument(help="A directory containing saved .html pages."),
+    max_chars: int = typer.Option(8000, help="The max size of the distilled output."),
+):
+    table = Table(title="Elements mode token reduction")
+    for column in ["Page", "Raw", "Body html", "Elements", "Reduction"]:
+        table.add_column(column, justify="left" if column == "Page" else "right")
+
+    totals = [0, 0, 0]
+    for page in sorted(pages.glob("**/*.html")):
+        html = page.read_text(errors="ignore")
+        counts = [
+            estimate_tokens(html),
+            estimate_tokens(clean_html(html)),
+            estimate_tokens(distill_html(html, max_chars=max_chars)),
+        ]
+        totals = [total + count for total, count in zip(totals, counts)]
+        table.add_row(
+            page.name, *map(str, counts), f"{counts[1] / max(counts[2], 1):.1f}x"
+        )
+
+    table.add_row(
+        "Total",
+        *map(str, totals),
+        f"{totals[1] / max(totals[2], 1):.1f}x",
+        style="bold",
+    )
+    console.print(table)
+
+
+if __name__ == "__main__":
+    typer.run(main)
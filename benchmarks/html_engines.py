@@ -0,0 +1,66 @@
+"""Compares the parse time and output size of the html cleaning engines.
+
+Usage: python benchmarks/html_engines.py <directory of saved .html pages>
+
+Pages saved by the agent in DEBUG mode or stored in the page cache
+(.agent/cache/pages) can be used as the corpus.
+"""
+
+import time
+from pathlib import Path
+import typer
+from rich.table import Table
+from agent.cleaning import ENGINES, clean_html
+from agent.logging import console
+from agent.utils import estimate_tokens
+
+
+def time_engine(html: str, engine: str, repeat: int) -> tuple[float, str]:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output = clean_html(html, engine=engine)
+        best = min(best, time.perf_counter() - start)
+    return best, output
+
+
+def main(
+    pages: Path = typer.Argument(help="A directory containing saved .html pages."),
+    repeat: int = typer.Option(3, help="Runs per page, the best time is reported."),
+):
+    engines = [engine for engine in ENGINES if engine != "lxml"]
+    try:
+        import lxml  # noqa: F401
+
+        engines.insert(1, "lxml")
+    except ImportError:
+        console.print("lxml is not installed, skipping the lxml engine.")
+
+    table = Table(title="Html cleaning engines")
+    table.add_column("Page")
+    table.add_column("Input tokens", justify="right")
+    for engine in engines:
+        table.add_column(f"{engine} ms", justify="right")
+        table.add_column(f"{engine} tokens", justify="right")
+
+    totals = {engine: [0.0, 0] for engine in engines}
+    for page in sorted(pages.glob("**/*.html")):
+        html = page.read_text(errors="ignore")
+        row = [page.name, str(estimate_tokens(html))]
+        for engine in engines:
+            seconds, output = time_engine(html, engine, repeat)
+            tokens = estimate_tokens(output)
+            totals[engine][0] += seconds
+            totals[engine][1] += tokens
+            row.extend([f"{seconds * 1000:.1f}", str(tokens)])
+        table.add_row(*row)
+
+    total_row = ["Total", ""]
+    for seconds, tokens in totals.values():
+        total_row.extend([f"{seconds * 1000:.1f}", str(tokens)])
+    table.add_row(*total_row, style="bold")
+    console.print(table)
+
+
+if __name__ == "__main__":
+    typer.run(main)
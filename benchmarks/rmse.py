@@ -0,0 +1,103 @@
+"""Compares the NumPy rmse kernel with the histogram based calculate_rmse.
+
+Usage: python benchmarks/rmse.py [--frames 200] [--width 1280] [--height 720]
+
+Pairs of synthetic frames are compared with both implementations, checking
+that the results match within a tolerance.
+"""
+
+import math
+import tempfile
+import time
+from pathlib import Path
+import numpy as np
+import typer
+from PIL import Image, ImageChops
+from rich.table import Table
+from agent.compare import load_frame, rmse_many, rmse_pairs
+from agent.logging import console
+
+
+def histogram_rmse(image1_path, image2_path):
+    """The histogram based calculation calculate_rmse used before"""
+    with Image.open(image1_path) as img1, Image.open(image2_path) as img2:
+        img1 = img1.convert("RGBA")
+        img2 = img2.convert("RGBA")
+        if img1.size != img2.size:
+            return float("inf")
+        h = ImageChops.difference(img1, img2).histogram()
+        sum_of_squares = sum(value * ((idx % 256) ** 2) for idx, value in enumerate(h))
+        return math.sqrt(sum_of_squares / (img1.size[0] * img1.size[1]))
+
+
+def generate_frames(directory: Path, count: int, width: int, height: int):
+    rng = np.random.default_rng(0)
+    base = rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+    paths = []
+    for index in range(count):
+        frame = base.copy()
+        # a changing region, as if part of the page was updated
+        top = rng.integers(0, height - 50)
+        frame[top : top + 50] = rng.integers(0, 256, (50, width, 3), dtype=np.uint8)
+        path = directory / f"frame{index:05}.png"
+        Image.fromarray(frame).save(path)
+        paths.append(path)
+    return paths
+
+
+def main(
+    frames: int = typer.Option(200, help="The number of frames to compare."),
+    width: int = typer.Option(1280, help="The width of the frames."),
+    height: int = typer.Option(720, help="The height of the frames."),
+    tolerance: float = typer.Option(1e-6, help="The allowed difference in rmse."),
+):
+    with tempfile.TemporaryDirectory() as directory:
+        paths = generate_frames(Path(directory), frames, width, height)
+
+        start = time.perf_counter()
+        expected = [histogram_rmse(paths[0], path) for path in paths]
+        histogram_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        loaded = [load_frame(path) for path in paths]
+        load_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        batched = rmse_many(loaded[0], loaded)
+        many_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        consecutive = rmse_pairs(loaded[1:], loaded[:-1])
+        pairs_seconds = time.perf_counter() - start
+
+    expected_consecutive = [
+        math.sqrt(
+            np.sum((a.astype(np.int64) - b.astype(np.int64)) ** 2) / (width * height)
+        )
+        for a, b in zip(loaded[1:], loaded[:-1])
+    ]
+    error = max(
+        np.max(np.abs(batched - expected)),
+        np.max(np.abs(consecutive - expected_consecutive), initial=0),
+    )
+
+    table = Table(title=f"RMSE of {frames} frames of {width}x{height}")
+    table.add_column("Method")
+    table.add_column("Seconds", justify="right")
+    table.add_column("Per pair ms", justify="right")
+    rows = [
+        ("calculate_rmse (histogram)", histogram_seconds),
+        ("load frames", load_seconds),
+        ("rmse_many", many_seconds),
+        ("rmse_pairs (consecutive)", pairs_seconds),
+    ]
+    for name, seconds in rows:
+        table.add_row(name, f"{seconds:.3f}", f"{seconds / frames * 1000:.2f}")
+    console.print(table)
+    console.print(f"Max difference from calculate_rmse: {error:.2e}")
+    if error > tolerance:
+        raise typer.Exit(1)
+
+
+if __name__ == "__main__":
+    typer.run(main)
@@ -0,0 +1,128 @@
+import base64
+import hashlib
+import json
+import mimetypes
+from pathlib import Path
+from agent.config import get_state_dir
+
+ARTIFACT_URL_PREFIX = "artifact://"
+
+
+def artifact_url(digest: str) -> str:
+    """Returns the url used to refer to a stored artifact in a message"""
+    return f"{ARTIFACT_URL_PREFIX}{digest}"
+
+
+def is_artifact_url(url: str) -> bool:
+    return url.startswith(ARTIFACT_URL_PREFIX)
+
+
+class ArtifactStore:
+    """A content-addressed store for images and other binary test artifacts.
+
+    Each artifact is written once, named by the sha256 of its content, and
+    referred to in messages by an ``artifact://<sha256>`` url. The base64
+    payload is only built when a request is sent.
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def put_bytes(self, data: bytes, suffix: str) -> str:
+        """Stores data and returns its digest
+
+        :param data: The content of the artifact
+        :type data: bytes
+        :param suffix: The file extension of the artifact, e.g. .png
+        :type suffix: str
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.directory / f"{digest}{suffix}"
+        if not path.exists():
+            tmp_path = path.with_suffix(".tmp")
+            tmp_path.write_bytes(data)
+            tmp_path.replace(path)
+        return digest
+
+    def put_file(self, path: Path | str) -> str:
+        path = Path(path)
+        return self.put_bytes(path.read_bytes(), path.suffix.lower())
+
+    def path(self, digest: str) -> Path | None:
+        for path in self.directory.glob(f"{digest}.*"):
+            if path.suffix != ".tmp":
+                return path
+        return None
+
+    def data_url(self, url_or_digest: str) -> str:
+        """Encodes a stored artifact as a base64 data url"""
+        digest = url_or_digest.removeprefix(ARTIFACT_URL_PREFIX)
+        path = self.path(digest)
+        if path is None:
+            raise FileNotFoundError(f"Artifact {digest} not found.")
+        mime_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+        encoded = base64.b64encode(path.read_bytes()).decode("utf-8")
+        return f"data:{mime_type};base64,{encoded}"
+
+
+def get_artifact_store() -> ArtifactStore:
+    return ArtifactStore(get_state_dir() / "artifacts")
+
+
+class ArtifactIndex:
+    """Tracks which test artifacts have been processed and sent to the model.
+
+    Files are identified by their path, modification time and size. The digests
+    of the images stored for each file are recorded so an image is only sent
+    once per session, even if a later run writes an identical file.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.files: dict[str, dict] = {}
+        self.sent: set[str] = set()
+        if self.path.exists():
+            with open(self.path, "r") as f:
+                data = json.load(f)
+            self.files = data.get("files", {})
+            self.sent = set(data.get("sent", []))
+
+    def _signature(self, path: Path) -> dict:
+        stat = path.stat()
+        return {"mtime": stat.st_mtime, "size": stat.st_size}
+
+    def is_new(self, path: Path) -> bool:
+        """Checks whether a file was added or changed since it was last recorded"""
+        entry = self.files.get(str(path))
+        return entry is None or {
+            "mtime": entry["mtime"],
+            "size": entry["size"],
+        } != self._signature(path)
+
+    def record(self, path: Path, digests: list[str] | None = None):
+        self.files[str(path)] = {**self._signature(path), "digests": digests}
+
+    def digests(self, path: Path) -> list[str] | None:
+        """Returns the digests of the stored images prepared from a file"""
+        entry = self.files.get(str(path))
+        return entry.get("digests") if entry else None
+
+    def mark_sent(self, digests: list[str]):
+        self.sent.update(digests)
+
+    def start_session(self):
+        """Forgets the images sent to the conversation of an earlier session"""
+        self.sent.clear()
+
+    def save(self):
+        # forget files that were deleted, e.g. by the clean option or deduplication
+        self.files = {
+            path: entry for path, entry in self.files.items() if Path(path).exists()
+        }
+        with open(self.path, "w") as f:
+            json.dump({"files": self.files, "sent": sorted(self.sent)}, f)
+
+
+def get_artifact_index() -> ArtifactIndex:
+    return ArtifactIndex(get_state_dir() / "artifact_index.json")
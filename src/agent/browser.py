@@ -0,0 +1,383 @@
+import asyncio
+import atexit
+import hashlib
+import os
+import threading
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable
+from playwright.async_api import BrowserContext, Page, async_playwright
+from agent.distill import (
+    format_accessibility_tree,
+    limit_aria_snapshot,
+    strip_scripts,
+)
+from agent.logging import logger
+from agent.page_cache import normalize_url
+
+# navigations keep playwright's default timeout, the session timeout is meant
+# for actions on elements that may not exist
+NAVIGATION_TIMEOUT = 30000
+
+
+@dataclass
+class BrowserMetrics:
+    launch_seconds: float = 0.0
+    navigations: int = 0
+    navigation_seconds: float = 0.0
+    pages_created: int = 0
+    pages_recycled: int = 0
+
+    def summary(self) -> str:
+        average = self.navigation_seconds / self.navigations if self.navigations else 0
+        return (
+            f"Browser launched in {self.launch_seconds:.2f}s. "
+            f"{self.navigations} navigation(s) took {self.navigation_seconds:.2f}s "
+            f"({average:.2f}s on average). "
+            f"{self.pages_created} page(s) created, {self.pages_recycled} recycled."
+        )
+
+
+@dataclass
+class PooledPage:
+    context: BrowserContext
+    page: Page
+    uses: int = 0
+
+
+class BrowserManager:
+    """A single warm Chromium instance shared for the whole agent session.
+
+    Playwright objects are bound to the event loop they were created on, so the
+    browser lives on a dedicated thread running its own loop. Any thread (e.g.
+    the tool worker pool) can submit work with :meth:`run`, which hands the
+    callable a page from the pool. Each page has its own browser context and is
+    recycled after ``max_uses`` uses.
+    """
+
+    def __init__(
+        self,
+        headless: bool = True,
+        max_pages: int = 4,
+        max_uses: int = 20,
+        storage_state: str | None = None,
+        session_timeout: float = 5000,
+    ):
+        self.headless = headless
+        self.session_timeout = session_timeout
+        self.viewport = {"width": 1280, "height": 720}
+        self.storage_state = storage_state
+        self.max_pages = max(1, max_pages)
+        self.max_uses = max(1, max_uses)
+        self.metrics = BrowserMetrics()
+        self._lock = threading.Lock()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._thread: threading.Thread | None = None
+        self._playwright = None
+        self._browser = None
+        self._idle: list[PooledPage] = []
+        self._session: PooledPage | None = None
+        self._slots: asyncio.Semaphore | None = None
+
+    @property
+    def started(self) -> bool:
+        return self._loop is not None
+
+    @property
+    def auth_state(self) -> str | None:
+        """A fingerprint of the storage state pages are opened with"""
+        if not self.storage_state or not os.path.exists(self.storage_state):
+            return None
+        with open(self.storage_state, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._loop is not None:
+                return
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(
+                target=loop.run_forever, name="agent-browser", daemon=True
+            )
+            thread.start()
+            try:
+                asyncio.run_coroutine_threadsafe(self._launch(), loop).result()
+            except Exception:
+                loop.call_soon_threadsafe(loop.stop)
+                thread.join()
+                loop.close()
+                raise
+            self._loop = loop
+            self._thread = thread
+
+    async def _launch(self):
+        logger.info("Launching browser")
+        start = time.perf_counter()
+        self._playwright = await async_playwright().start()
+        try:
+            self._browser = await self._playwright.chromium.launch(
+                headless=self.headless
+            )
+        except Exception:
+            await self._playwright.stop()
+            self._playwright = None
+            raise
+        self._slots = asyncio.Semaphore(self.max_pages)
+        self.metrics.launch_seconds = time.perf_counter() - start
+        logger.info(f"Browser launched in {self.metrics.launch_seconds:.2f}s")
+
+    async def _acquire(self) -> PooledPage:
+        while self._idle:
+            pooled = self._idle.pop()
+            if not pooled.page.is_closed():
+                return pooled
+            await self._discard(pooled)
+
+        return await self._new_page()
+
+    async def _new_page(self) -> PooledPage:
+        context = await self._browser.new_context(
+            viewport=self.viewport, storage_state=self.storage_state
+        )
+        page = await context.new_page()
+        self.metrics.pages_created += 1
+        return PooledPage(context=context, page=page)
+
+    async def _release(self, pooled: PooledPage, broken: bool = False):
+        pooled.uses += 1
+        if broken or pooled.uses >= self.max_uses or pooled.page.is_closed():
+            await self._discard(pooled)
+        else:
+            self._idle.append(pooled)
+
+    async def _discard(self, pooled: PooledPage):
+        self.metrics.pages_recycled += 1
+        try:
+            await pooled.context.close()
+        except Exception as e:
+            logger.debug(f"Error closing browser context: {e}")
+
+    @asynccontextmanager
+    async def page(self):
+        """Borrows a page from the pool, for use on the browser event loop"""
+        async with self._slots:
+            pooled = await self._acquire()
+            broken = False
+            try:
+                yield pooled.page
+            except Exception:
+                broken = True
+                raise
+            finally:
+                await self._release(pooled, broken=broken)
+
+    async def _with_page(self, fn: Callable[[Page], Awaitable[Any]]):
+        async with self.page() as page:
+            return await fn(page)
+
+    def run(self, fn: Callable[[Page], Awaitable[Any]], timeout: float | None = None):
+        """Runs an async callable with a pooled page and returns its result
+
+        :param fn: An async function that receives a playwright Page
+        :type fn: Callable[[Page], Awaitable[Any]]
+        :param timeout: Seconds to wait for the result, defaults to None
+        :type timeout: float | None, optional
+        """
+        return self.run_async(lambda: self._with_page(fn), timeout=timeout)
+
+    def run_async(self, fn: Callable[[], Awaitable[Any]], timeout: float | None = None):
+        """Runs an async callable on the browser event loop and returns its result
+
+        Use this for work that needs several pages at once via :meth:`page`.
+        """
+        self._ensure_started()
+        future = asyncio.run_coroutine_threadsafe(fn(), self._loop)
+        return future.result(timeout)
+
+    async def goto(self, page: Page, url: str, wait_until: str = "domcontentloaded"):
+        """Navigates a page to a url, recording the navigation time"""
+        start = time.perf_counter()
+        response = await page.goto(url, wait_until=wait_until)
+        elapsed = time.perf_counter() - start
+        self.metrics.navigations += 1
+        self.metrics.navigation_seconds += elapsed
+        logger.debug(f"Navigated to {url} in {elapsed:.2f}s")
+        return response
+
+    async def session_page(self, fresh: bool = False) -> Page:
+        """Returns the page used by the interactive session tools
+
+        Unlike pooled pages, the session page stays open (with its cookies, url
+        and form state) across calls until a fresh one is requested.
+
+        :param fresh: Start a new page with a clean browser context, defaults to False
+        :type fresh: bool, optional
+        """
+        if self._session is not None and (fresh or self._session.page.is_closed()):
+            await self._discard(self._session)
+            self._session = None
+        if self._session is None:
+            self._session = await self._new_page()
+            self._session.page.set_default_timeout(self.session_timeout)
+            self._session.page.set_default_navigation_timeout(NAVIGATION_TIMEOUT)
+        return self._session.page
+
+    async def _shutdown(self):
+        if self._session is not None:
+            await self._discard(self._session)
+            self._session = None
+        for pooled in self._idle:
+            await self._discard(pooled)
+        self._idle.clear()
+        if self._browser is not None:
+            await self._browser.close()
+        if self._playwright is not None:
+            await self._playwright.stop()
+
+    def close(self):
+        """Closes the browser and stops the event loop thread"""
+        with self._lock:
+            if self._loop is None:
+                return
+            logger.info("Closing browser")
+            try:
+                asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result(
+                    timeout=30
+                )
+            except Exception as e:
+                logger.debug(f"Error closing browser: {e}")
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=5)
+            self._loop.close()
+            self._loop = None
+            self._thread = None
+            logger.info(self.metrics.summary())
+
+
+async def accessibility_snapshot(
+    page: Page, root_selector: str | None = None, max_depth: int | None = None
+) -> str:
+    """Returns the accessibility tree of a page as an indented role/name tree
+
+    :param page: The page to snapshot
+    :type page: Page
+    :param root_selector: A selector for the subtree root, defaults to the body
+    :type root_selector: str | None, optional
+    :param max_depth: The number of levels to include, defaults to None (all)
+    :type max_depth: int | None, optional
+    """
+    locator = page.locator(root_selector or "body")
+    if await locator.count() == 0:
+        return f"No element matches the selector {root_selector}."
+    locator = locator.first
+
+    # aria snapshots replace the deprecated accessibility api in newer versions
+    if hasattr(locator, "aria_snapshot"):
+        return limit_aria_snapshot(await locator.aria_snapshot(), max_depth)
+
+    root = await locator.element_handle()
+    tree = await page.accessibility.snapshot(root=root)
+    return format_accessibility_tree(tree, max_depth)
+
+
+LOCATOR_KINDS = ["css", "text", "placeholder", "label", "role", "test_id"]
+
+
+def build_locator(page: Page, spec: dict):
+    """Builds a playwright locator from a {kind, value, name} description"""
+    kind = spec.get("kind", "css")
+    value = spec["value"]
+    if kind == "text":
+        return page.get_by_text(value)
+    if kind == "placeholder":
+        return page.get_by_placeholder(value)
+    if kind == "label":
+        return page.get_by_label(value)
+    if kind == "test_id":
+        return page.get_by_test_id(value)
+    if kind == "role":
+        if spec.get("name"):
+            return page.get_by_role(value, name=spec["name"])
+        return page.get_by_role(value)
+    return page.locator(value)
+
+
+async def check_locators(page: Page, specs: list[dict]) -> list[dict]:
+    """Counts the matches of each locator and describes the first match
+
+    :param page: The page to check the locators against
+    :type page: Page
+    :param specs: A list of {kind, value, name} locator descriptions
+    :type specs: list[dict]
+    """
+    results = []
+    for spec in specs:
+        result = {**spec, "count": 0, "visible": False, "html": None}
+        try:
+            locator = build_locator(page, spec)
+            result["count"] = await locator.count()
+            if result["count"]:
+                first = locator.first
+                result["visible"] = await first.is_visible()
+                result["html"] = await first.evaluate("element => element.outerHTML")
+        except Exception as e:
+            result["error"] = str(e).splitlines()[0]
+        results.append(result)
+    return results
+
+
+async def load_snapshot(page: Page, url: str, html: str):
+    """Loads a cached page snapshot into a page under its original url
+
+    The document request is answered from the snapshot and scripts are not run,
+    so the DOM stays as it was when the snapshot was taken.
+    """
+
+    def is_document(request_url: str) -> bool:
+        return normalize_url(request_url) == normalize_url(url)
+
+    async def handle(route):
+        if route.request.resource_type == "script":
+            await route.abort()
+        elif is_document(route.request.url):
+            await route.fulfill(body=strip_scripts(html), content_type="text/html")
+        else:
+            await route.continue_()
+
+    await page.route("**/*", handle)
+    try:
+        await page.goto(url, wait_until="domcontentloaded")
+    finally:
+        await page.unroute("**/*", handle)
+
+
+_manager: BrowserManager | None = None
+_manager_lock = threading.Lock()
+
+
+def get_browser_manager() -> BrowserManager:
+    """Returns the browser manager for this session, creating it if needed"""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = BrowserManager(
+                headless=os.environ.get("HEADLESS", False) == "true",
+                max_pages=int(os.environ.get("AGENT_BROWSER_PAGES", 4)),
+                max_uses=int(os.environ.get("AGENT_BROWSER_PAGE_USES", 20)),
+                storage_state=os.environ.get("AGENT_STORAGE_STATE") or None,
+                session_timeout=float(os.environ.get("AGENT_SESSION_TIMEOUT", 5000)),
+            )
+        return _manager
+
+
+def shutdown_browser():
+    """Closes the session browser if one was started"""
+    global _manager
+    with _manager_lock:
+        manager, _manager = _manager, None
+    if manager is not None:
+        manager.close()
+
+
+atexit.register(shutdown_browser)
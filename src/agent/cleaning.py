@@ -0,0 +1,175 @@
+import os
+import re
+from html import escape
+from html.parser import HTMLParser
+from bs4 import BeautifulSoup, Comment
+from agent.logging import logger
+
+# elements that never help with writing tests and are removed with their content
+NOISE_TAGS = {"head", "script", "style", "noscript", "template", "svg", "canvas"}
+VOID_TAGS = {
+    "area",
+    "base",
+    "br",
+    "col",
+    "embed",
+    "hr",
+    "img",
+    "input",
+    "link",
+    "meta",
+    "param",
+    "source",
+    "track",
+    "wbr",
+}
+NOISE_ATTRIBUTES = {"style", "srcset", "sizes", "nonce", "integrity", "crossorigin"}
+KEPT_DATA_ATTRIBUTES = {"data-testid", "data-test", "data-cy", "data-test-id"}
+# utility class strings (e.g. tailwind) longer than this are dropped
+MAX_CLASS_LENGTH = 60
+ENGINES = ["stream", "lxml", "bs4"]
+
+
+def is_noise_attribute(name: str, value: str | None) -> bool:
+    """Checks whether an attribute can be dropped without losing locator info"""
+    name = name.lower()
+    if name in NOISE_ATTRIBUTES or name.startswith("on"):
+        return True
+    if name.startswith("data-") and name not in KEPT_DATA_ATTRIBUTES:
+        return True
+    if name == "class" and value and len(value) > MAX_CLASS_LENGTH:
+        return True
+    return False
+
+
+class StreamingCleaner(HTMLParser):
+    """Cleans html in a single pass without building a document tree"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.output: list[str] = []
+        self.skip_tag: str | None = None
+        self.skip_depth = 0
+
+    def _start(self, tag: str, attrs: list, closed: bool = False):
+        attributes = "".join(
+            f" {name}" if value is None else f' {name}="{escape(value)}"'
+            for name, value in attrs
+            if not is_noise_attribute(name, value)
+        )
+        self.output.append(f"<{tag}{attributes}{' /' if closed else ''}>")
+
+    def handle_starttag(self, tag, attrs):
+        if self.skip_tag is not None:
+            if tag == self.skip_tag:
+                self.skip_depth += 1
+            return
+        if tag in NOISE_TAGS:
+            self.skip_tag = tag
+            self.skip_depth = 1
+            return
+        if tag in ["link", "meta"]:
+            return
+        self._start(tag, attrs)
+
+    def handle_startendtag(self, tag, attrs):
+        if self.skip_tag is None and tag not in NOISE_TAGS | {"link", "meta"}:
+            self._start(tag, attrs, closed=True)
+
+    def handle_endtag(self, tag):
+        if self.skip_tag is not None:
+            if tag == self.skip_tag:
+                self.skip_depth -= 1
+                if self.skip_depth == 0:
+                    self.skip_tag = None
+            return
+        if tag not in VOID_TAGS:
+            self.output.append(f"</{tag}>")
+
+    def handle_data(self, data):
+        if self.skip_tag is None:
+            self.output.append(escape(data, quote=False))
+
+
+def clean_with_stream(html: str) -> str:
+    cleaner = StreamingCleaner()
+    cleaner.feed(html)
+    cleaner.close()
+    return "".join(cleaner.output)
+
+
+def clean_with_lxml(html: str) -> str:
+    import lxml.html
+    from lxml import etree
+
+    document = lxml.html.document_fromstring(html)
+    root = document.body if document.find("body") is not None else document
+
+    removed = [
+        element
+        for element in root.iter()
+        if element.tag is etree.Comment
+        or element.tag is etree.ProcessingInstruction
+        or (isinstance(element.tag, str) and element.tag.lower() in NOISE_TAGS)
+    ]
+    for element in removed:
+        element.drop_tree()
+
+    for element in root.iter(tag=etree.Element):
+        for name, value in list(element.attrib.items()):
+            if is_noise_attribute(name, value):
+                del element.attrib[name]
+
+    return lxml.html.tostring(root, encoding="unicode")
+
+
+def clean_with_bs4(html: str) -> str:
+    soup = BeautifulSoup(html, "html.parser")
+    for tag in soup.find_all(NOISE_TAGS | {"link", "meta"}):
+        tag.decompose()
+    for comment in soup.find_all(string=lambda text: isinstance(text, Comment)):
+        comment.extract()
+    for tag in soup.find_all(True):
+        tag.attrs = {
+            name: value
+            for name, value in tag.attrs.items()
+            if not is_noise_attribute(
+                name, " ".join(value) if isinstance(value, list) else value
+            )
+        }
+    return str(soup)
+
+
+def get_engine() -> str:
+    engine = os.environ.get("AGENT_HTML_ENGINE", "stream").lower()
+    if engine not in ENGINES:
+        logger.warning(f"Unknown html engine {engine}, using stream instead.")
+        return "stream"
+    return engine
+
+
+def clean_html(html: str, engine: str | None = None) -> str:
+    """Removes scripts, styles, comments, svgs and noise attributes from a page
+
+    :param html: The html of the page
+    :type html: str
+    :param engine: stream, lxml or bs4. Defaults to the configured html_engine
+    :type engine: str | None, optional
+    """
+    engine = engine or get_engine()
+
+    if engine == "lxml":
+        try:
+            cleaned = clean_with_lxml(html)
+        except ImportError:
+            logger.warning(
+                "lxml is not installed, falling back to the stream html engine. Install it with: pip install automators-agent[lxml]"
+            )
+            cleaned = clean_with_stream(html)
+    elif engine == "bs4":
+        cleaned = clean_with_bs4(html)
+    else:
+        cleaned = clean_with_stream(html)
+
+    # collapse the blank lines left behind by removed elements
+    return re.sub(r"\n\s*\n+", "\n", cleaned)
@@ -42,7 +42,7 @@ def init(
     gitignore_dir = folder / ".gitignore"
     if not (gitignore_dir).exists():
         with open(gitignore_dir, "w") as f:
-            f.write(".env\n")
+            f.write(".env\n.agent/\n")
 
     # create a config.toml file if it doesn't exist
     agent_config_dir = folder / "config.toml"
@@ -2,6 +2,9 @@ import os
 import typer
 from typing_extensions import Annotated
 from rich.console import Console
+from agent.artifacts import get_artifact_index
+from agent.browser import shutdown_browser
+from agent.pytest_worker import shutdown_pytest_worker
 from agent.completions import agent
 from agent.logging import logger
 from agent.config import get_test_dir, read_config
@@ -48,6 +51,13 @@ def start(
         str,
         typer.Option(help="The framework to use for testing."),
     ] = "playwright",
+    page_cache: Annotated[
+        bool,
+        typer.Option(
+            "--page-cache/--no-page-cache",
+            help="Reuse previously extracted webpage content while it is fresh.",
+        ),
+    ] = True,
 ):
     """Starts the test generation agent ✨"""
 
@@ -68,6 +78,8 @@ def start(
         config["config"]["language"] = language
     if framework != "playwright":
         config["config"]["framework"] = framework
+    if not page_cache:
+        config["config"]["page_cache"] = False
 
     # perform actions based on config
     log_level = str(config["config"]["log_level"]).upper()
@@ -85,6 +97,78 @@ def start(
     # set agent language and framework as env vars
     os.environ["AGENT_LANGUAGE"] = config["config"]["language"]
     os.environ["AGENT_FRAMEWORK"] = config["config"]["framework"]
+    os.environ["AGENT_TOOL_WORKERS"] = str(config["config"].get("tool_workers", 4))
+    os.environ["AGENT_BROWSER_PAGES"] = str(config["config"].get("browser_pages", 4))
+    os.environ["AGENT_BROWSER_PAGE_USES"] = str(
+        config["config"].get("browser_page_uses", 20)
+    )
+    os.environ["AGENT_PAGE_CACHE"] = str(
+        config["config"].get("page_cache", True)
+    ).lower()
+    os.environ["AGENT_PAGE_CACHE_TTL"] = str(
+        config["config"].get("page_cache_ttl", 3600)
+    )
+    os.environ["AGENT_PAGE_CACHE_MAX_MB"] = str(
+        config["config"].get("page_cache_max_mb", 50)
+    )
+    os.environ["AGENT_HTML_ENGINE"] = str(config["config"].get("html_engine", "stream"))
+    os.environ["AGENT_PAGE_MODE"] = str(config["config"].get("page_mode", "html"))
+    os.environ["AGENT_DISTILL_MAX_CHARS"] = str(
+        config["config"].get("distill_max_chars", 8000)
+    )
+    os.environ["AGENT_CRAWL_MAX_DEPTH"] = str(
+        config["config"].get("crawl_max_depth", 2)
+    )
+    os.environ["AGENT_CRAWL_MAX_PAGES"] = str(
+        config["config"].get("crawl_max_pages", 50)
+    )
+    os.environ["AGENT_CRAWL_CONCURRENCY"] = str(
+        config["config"].get("crawl_concurrency", 4)
+    )
+    os.environ["AGENT_SESSION_TIMEOUT"] = str(
+        config["config"].get("session_timeout", 5000)
+    )
+    os.environ["AGENT_SCREENSHOT_SETS"] = str(
+        config["config"].get("screenshot_sets", 2)
+    )
+    os.environ["AGENT_SCREENSHOT_LAYOUT"] = str(
+        config["config"].get("screenshot_layout", "separate")
+    )
+    os.environ["AGENT_TEST_TIMEOUT"] = str(config["config"].get("test_timeout", 900))
+    os.environ["AGENT_TEST_IDLE_TIMEOUT"] = str(
+        config["config"].get("test_idle_timeout", 180)
+    )
+    os.environ["AGENT_TEST_WORKERS"] = str(config["config"].get("test_workers", 1))
+    os.environ["AGENT_TEST_CACHE_TTL"] = str(
+        config["config"].get("test_cache_ttl", 300)
+    )
+    os.environ["AGENT_TEST_SELECTION"] = str(
+        config["config"].get("test_selection", True)
+    ).lower()
+    os.environ["AGENT_PYTEST_WORKER_RUNS"] = str(
+        config["config"].get("pytest_worker_runs", 20)
+    )
+    os.environ["AGENT_VIDEO_FPS"] = str(config["config"].get("video_fps", 5))
+    os.environ["AGENT_SCENE_THRESHOLD"] = str(
+        config["config"].get("scene_threshold", 2.0)
+    )
+    if config["config"].get("video_workers"):
+        os.environ["AGENT_VIDEO_WORKERS"] = str(config["config"]["video_workers"])
+    os.environ["AGENT_DEDUP_MAX_DISTANCE"] = str(
+        config["config"].get("dedup_max_distance", 2)
+    )
+    os.environ["AGENT_DEDUP_VERIFY"] = str(
+        config["config"].get("dedup_verify", True)
+    ).lower()
+    os.environ["AGENT_IMAGE_MAX_EDGE"] = str(
+        config["config"].get("image_max_edge", 1536)
+    )
+    os.environ["AGENT_IMAGE_FORMAT"] = str(config["config"].get("image_format", "jpeg"))
+    os.environ["AGENT_IMAGE_QUALITY"] = str(config["config"].get("image_quality", 80))
+    if config["config"].get("token_budget"):
+        os.environ["AGENT_TOKEN_BUDGET"] = str(config["config"]["token_budget"])
+    if config["config"].get("storage_state"):
+        os.environ["AGENT_STORAGE_STATE"] = str(config["config"]["storage_state"])
     test_dir = get_test_dir()
 
     # raise an error if required config is missing
@@ -95,6 +179,8 @@ def start(
             )
             raise typer.Exit()
 
+    os.environ["AGENT_URL"] = config["agent"]["url"]
+
     # setup the testing environment
     if config["config"]["language"] in ["javascript", "typescript"]:
         node_version = check_for_node()
@@ -135,10 +221,20 @@ def start(
             scaffold_cypress(test_dir, language=config["config"]["language"])
             check_for_cypress_installation(test_dir)
 
+    # the new conversation has not seen the images sent in earlier sessions
+    artifact_index = get_artifact_index()
+    artifact_index.start_session()
+    artifact_index.save()
+
     # call the agent
-    agent(
-        prompt=config["agent"]["prompt"],
-        url=config["agent"]["url"],
-        language=config["config"]["language"],
-        framework=config["config"]["framework"],
-    )
+    try:
+        agent(
+            prompt=config["agent"]["prompt"],
+            url=config["agent"]["url"],
+            language=config["config"]["language"],
+            framework=config["config"]["framework"],
+        )
+    finally:
+        # close the browser shared by the agent tools and the test worker
+        shutdown_browser()
+        shutdown_pytest_worker()
@@ -0,0 +1,92 @@
+from pathlib import Path
+import numpy as np
+from PIL import Image
+
+# frames compared at once, bounding the memory used
+BATCH_SIZE = 32
+
+
+def load_frame(path: Path | str, max_edge: int | None = None) -> np.ndarray:
+    """Loads an image as an RGBA array, optionally downsampled to fit max_edge"""
+    with Image.open(path) as image:
+        image = image.convert("RGBA")
+        if max_edge and max(image.size) > max_edge:
+            image.thumbnail((max_edge, max_edge), Image.Resampling.BOX)
+        return np.asarray(image, dtype=np.uint8)
+
+
+def rmse(frame: np.ndarray, other: np.ndarray) -> float:
+    """Calculates the root mean square error between two frames
+
+    The squared differences of all channels are summed per pixel, matching
+    ``agent.video.calculate_rmse``. Frames of different sizes are completely
+    different.
+    """
+    if frame.shape != other.shape:
+        return float("inf")
+    return float(rmse_many(frame, other[np.newaxis])[0])
+
+
+def rmse_many(frame: np.ndarray, frames: np.ndarray | list[np.ndarray]) -> np.ndarray:
+    """Calculates the rmse between a frame and each of a stack of frames
+
+    :param frame: An array of shape (height, width, channels)
+    :type frame: np.ndarray
+    :param frames: Frames of the same shape, or an array of shape
+        (n, height, width, channels)
+    :type frames: np.ndarray | list[np.ndarray]
+    :return: The rmse of each frame
+    :rtype: np.ndarray
+    """
+    reference = frame.astype(np.int16)
+    results = []
+    for start in range(0, len(frames), BATCH_SIZE):
+        batch = np.asarray(frames[start : start + BATCH_SIZE], dtype=np.int16)
+        results.append(batch_rmse(batch - reference))
+    return np.concatenate(results) if results else np.empty(0)
+
+
+def rmse_pairs(
+    frames: np.ndarray | list[np.ndarray], others: np.ndarray | list[np.ndarray]
+) -> np.ndarray:
+    """Calculates the rmse of each pair of frames from two stacks of the same shape"""
+    results = []
+    for start in range(0, len(frames), BATCH_SIZE):
+        batch = np.asarray(frames[start : start + BATCH_SIZE], dtype=np.int16)
+        other = np.asarray(others[start : start + BATCH_SIZE], dtype=np.int16)
+        results.append(batch_rmse(batch - other))
+    return np.concatenate(results) if results else np.empty(0)
+
+
+def batch_rmse(difference: np.ndarray) -> np.ndarray:
+    # the differences fit in int16, their squares are summed exactly in int64
+    height, width = difference.shape[1:3]
+    sum_of_squares = np.einsum("nhwc,nhwc->n", difference, difference, dtype=np.int64)
+    return np.sqrt(sum_of_squares / (height * width))
+
+
+class FrameCache:
+    """Keeps decoded frames in memory so each image is only loaded once"""
+
+    def __init__(self, max_edge: int | None = None):
+        self.max_edge = max_edge
+        self.frames: dict[Path, np.ndarray] = {}
+
+    def get(self, path: Path) -> np.ndarray:
+        if path not in self.frames:
+            self.frames[path] = load_frame(path, self.max_edge)
+        return self.frames[path]
+
+    def closest(
+        self, path: Path, candidates: list[Path], threshold: float
+    ) -> Path | None:
+        """Returns the first candidate whose rmse to path is below threshold"""
+        frame = self.get(path)
+        same_size = [c for c in candidates if self.get(c).shape == frame.shape]
+        if not same_size:
+            return None
+        errors = rmse_many(frame, [self.get(c) for c in same_size])
+        for candidate, error in zip(same_size, errors):
+            if error < threshold:
+                return candidate
+        return None
@@ -3,6 +3,9 @@ import os
 import typer
 from openai import OpenAI
 import agent.tools as tools
+from agent.artifacts import artifact_url
+from agent.conversation import Conversation
+from agent.executor import execute_tool_calls
 from agent.logging import logger
 from agent.rich import print_in_panel, print_in_question_panel
 from agent.utils import check_for_screenshots
@@ -122,6 +125,91 @@ def create_completion(messages: list, client: OpenAI):
     return response, tool_calls
 
 
+def assistant_message(message) -> dict:
+    """Convert an assistant completion message into a request message.
+
+    The tool calls must be echoed back so that the following ``tool`` messages
+    can reference them by ``tool_call_id``.
+    """
+    out = {"role": "assistant", "content": message.content}
+    if message.tool_calls:
+        out["tool_calls"] = [
+            {
+                "id": tool_call.id,
+                "type": "function",
+                "function": {
+                    "name": tool_call.function.name,
+                    "arguments": tool_call.function.arguments,
+                },
+            }
+            for tool_call in message.tool_calls
+        ]
+    return out
+
+
+def screenshot_message(screenshots: list[str], traces: list[str] | None = None) -> dict:
+    """Builds a message referring to screenshots in the artifact store
+
+    The failure digests of any playwright traces are added as text.
+    """
+    content = [
+        {"type": "text", "text": f"Playwright traces of the failing tests:\n{trace}"}
+        for trace in traces or []
+    ]
+    if screenshots:
+        content.append(
+            {
+                "type": "text",
+                "text": "Screenshots were taken on test failure. Please review the screenshots below to help debug the failing tests.",
+            }
+        )
+    content.extend(
+        {"type": "image_url", "image_url": {"url": artifact_url(screenshot)}}
+        for screenshot in screenshots
+    )
+    return {"role": "user", "content": content}
+
+
+def dispatch_tool_calls(tool_calls: list) -> list[dict]:
+    """Run every tool call requested in a single assistant turn.
+
+    Returns one ``tool`` message per call, in the order they were requested,
+    followed by any screenshot messages collected from test runs. The caller
+    should make exactly one completion once these have been appended.
+    """
+    calls = []
+    for tool_call in tool_calls:
+        name = tool_call.function.name
+        kwargs = json.loads(tool_call.function.arguments or "{}")
+        logger.debug(f"Calling tool: {name} with arguments: {kwargs}")
+        calls.append((name, kwargs))
+
+    outputs = execute_tool_calls(calls)
+
+    tool_messages = []
+    screenshot_messages = []
+    for tool_call, (name, _), function_call_output in zip(tool_calls, calls, outputs):
+        tool_messages.append(
+            {
+                "role": "tool",
+                "tool_call_id": tool_call.id,
+                "content": str(function_call_output),
+            }
+        )
+
+        if name == "run_tests":
+            screenshots, traces = check_for_screenshots()
+            if screenshots or traces:
+                logger.info(
+                    f"Adding {len(screenshots)} screenshot(s) and {len(traces)} trace(s) to context."
+                )
+                screenshot_messages.append(screenshot_message(screenshots, traces))
+
+    # tool messages must directly follow the assistant message that requested
+    # them, so any images are only added once every call has been answered
+    return tool_messages + screenshot_messages
+
+
 def agent(
     prompt: str, url: str, language: str = "python", framework: str = "playwright"
 ):
@@ -136,36 +224,39 @@ def agent(
     client = OpenAI(api_key=openai_api_key)
 
     agent_working = True
-    messages = []
-    messages.append(
+    conversation = Conversation(model=os.environ.get("OPENAI_MODEL", "gpt-4o"))
+    conversation.pin(
         {
             "role": "assistant",
             "content": "You are a useful test code writing agent. Use the supplied tools to create passing tests for the user.",
         },
     )
-    messages.append(
+    conversation.pin(
         {
             "role": "assistant",
             "content": f"{language_prompt(language)} {framework_prompt(framework)}",
         }
     )
-    messages.append(
+    conversation.pin(
         {
             "role": "assistant",
             "content": f"""If tests are not passing, consider using the tools to debug the issue. 
             - You can overwrite any code in the {get_test_dir()} folder using the relevant tools. Use links found on the webpage to determine if navigation to other pages are required. 
+            - Use the crawl_site tool once to index the app, then use query_site_index to find pages, forms, inputs and links instead of extracting pages one at a time.
             - You can use the extract_webpage_content tool in place of navigation. 
+            - Use the browser_ tools to try out interactions and selectors on a live page before writing them into tests, instead of running the whole test suite.
+            - Use the verify_locators tool to check that every locator in a test matches exactly one element before running the tests.
             - Do not make assumptions about the app structure or redirects unless there are clear links to support it. If you need more context, add code to save screenshots to the 'test-results' folder and the run the tests. We will send you the screenshots.
             - If you need input from the user, always use the get_user_input tool.""",
         },
     )
-    messages.append(
+    conversation.pin(
         {
             "role": "user",
             "content": f"Our webpage entry point is: {url}. Consider the following requirements: {prompt}",
         },
     )
-    messages.append(
+    conversation.pin(
         {
             "role": "user",
             "content": f"Consider the following requirements: {prompt}",
@@ -175,11 +266,14 @@ def agent(
     logger.info(
         "Starting agent. Set log level to [cadet_blue]DEBUG[/cadet_blue] to see full requests."
     )
-    logger.debug(json.dumps(messages, indent=2))
+    logger.debug(json.dumps(conversation.messages, indent=2))
 
-    response, tool_calls = create_completion(messages, client)
+    response, tool_calls = create_completion(conversation.render(), client)
 
     while agent_working:
+        # keep the assistant turn in the history, including any tool calls
+        conversation.append(assistant_message(response.choices[0].message))
+
         if tool_calls == []:
             logger.info("No obvious action to be taken.")
             # prompt the user for an additional prompt
@@ -188,51 +282,21 @@ def agent(
                 title="Additional Prompt",
             )
             user_input = typer.prompt("Additional Prompt")
-            if user_input.lower() != "exit":
-                messages.append(
-                    {
-                        "role": "user",
-                        "content": user_input,
-                    }
-                )
-                response, tool_calls = create_completion(messages, client)
-            else:
+            if user_input.lower() == "exit":
                 agent_working = False
                 break
 
-        for tool_call in tool_calls:
-            name = tool_call.function.name
-            kwargs = json.loads(tool_call.function.arguments)
-            logger.debug(f"Calling tool: {name} with arguments: {kwargs}")
-
-            function_call_output = getattr(tools, name)(**kwargs)
-            messages.append(
+            conversation.append(
                 {
-                    "role": "assistant",
-                    "content": f"Called tool: {name} with arguments: {kwargs}. The function call output was: {function_call_output} ",
+                    "role": "user",
+                    "content": user_input,
                 }
             )
-            if name == "run_tests":
-                screenshots = check_for_screenshots()
-                for screenshot in screenshots:
-                    logger.info("Screenshot found. Adding to context.")
-                    messages.append(
-                        {
-                            "role": "user",
-                            "content": [
-                                {
-                                    "type": "text",
-                                    "text": "Screenshots were taken on test failure. Please review the screenshots below to help debug the failing tests.",
-                                },
-                                {
-                                    "type": "image_url",
-                                    "image_url": {
-                                        "url": f"data:image/jpeg;base64,{screenshot}"
-                                    },
-                                },
-                            ],
-                        }
-                    )
-
-            logger.debug(json.dumps(messages, indent=2))
-            response, tool_calls = create_completion(messages, client)
+        else:
+            # answer every tool call from this turn before asking for the next one
+            conversation.extend(dispatch_tool_calls(tool_calls))
+
+        # keep the request within the token budget of the model
+        conversation.compact()
+        logger.debug(json.dumps(conversation.messages, indent=2))
+        response, tool_calls = create_completion(conversation.render(), client)
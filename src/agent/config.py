@@ -17,6 +17,13 @@ def get_test_dir() -> Path:
     return test_dir
 
 
+def get_state_dir() -> Path:
+    """Returns the directory used for caches and indexes kept between runs"""
+    state_dir = Path(os.environ.get("AGENT_STATE_DIR", ".agent"))
+    state_dir.mkdir(parents=True, exist_ok=True)
+    return state_dir
+
+
 def read_config():
     config_file = Path("config.toml")
 
@@ -0,0 +1,267 @@
+import json
+import os
+from dataclasses import dataclass
+from agent.artifacts import ArtifactStore, get_artifact_store, is_artifact_url
+from agent.logging import logger
+from agent.utils import estimate_tokens
+
+# context windows of the models the agent is commonly run with, matched by prefix
+MODEL_CONTEXT_WINDOWS = {
+    "gpt-4o": 128_000,
+    "gpt-4.1": 1_000_000,
+    "gpt-4-turbo": 128_000,
+    "gpt-4": 8_192,
+    "gpt-3.5-turbo": 16_385,
+    "o1": 200_000,
+    "o3": 200_000,
+    "o4": 200_000,
+}
+DEFAULT_CONTEXT_WINDOW = 128_000
+# share of the context window available to the messages, the rest is left for
+# the tool definitions and the response
+BUDGET_RATIO = 0.75
+# the cost of a high detail image of up to 1024x1024 pixels
+IMAGE_TOKENS = 765
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# tools whose output is a snapshot of a page, keyed by the arguments that
+# identify the snapshot. A later call with the same key supersedes earlier ones.
+SNAPSHOT_TOOLS = {
+    "extract_webpage_content": ["url", "mode"],
+    "get_accessibility_tree": ["url", "root_selector", "max_depth"],
+    "browser_snapshot": ["mode"],
+}
+
+
+def get_token_budget(model: str) -> int:
+    """Returns the number of tokens the messages may use for a model"""
+    if os.environ.get("AGENT_TOKEN_BUDGET"):
+        return int(os.environ["AGENT_TOKEN_BUDGET"])
+
+    window = DEFAULT_CONTEXT_WINDOW
+    for prefix in sorted(MODEL_CONTEXT_WINDOWS, key=len, reverse=True):
+        if model.startswith(prefix):
+            window = MODEL_CONTEXT_WINDOWS[prefix]
+            break
+    return int(window * BUDGET_RATIO)
+
+
+def estimate_message_tokens(message: dict) -> int:
+    """Estimates the tokens used by a chat message, including any images"""
+    tokens = MESSAGE_OVERHEAD_TOKENS
+    content = message.get("content")
+    if isinstance(content, str):
+        tokens += estimate_tokens(content)
+    elif isinstance(content, list):
+        for part in content:
+            if part.get("type") == "image_url":
+                tokens += IMAGE_TOKENS
+            else:
+                tokens += estimate_tokens(part.get("text", ""))
+    for tool_call in message.get("tool_calls") or []:
+        tokens += estimate_tokens(json.dumps(tool_call["function"]))
+    return tokens
+
+
+def has_images(message: dict) -> bool:
+    content = message.get("content")
+    return isinstance(content, list) and any(
+        part.get("type") == "image_url" for part in content
+    )
+
+
+@dataclass
+class Entry:
+    message: dict
+    turn: int
+    pinned: bool = False
+    tool_name: str | None = None
+    snapshot_key: str | None = None
+    tokens: int = 0
+    compacted: bool = False
+
+
+class Conversation:
+    """The messages sent to the model, kept within a token budget.
+
+    Pinned messages (the system prompts and requirements) and everything from
+    the latest assistant turn are always sent as they are. Once the budget is
+    exceeded, superseded page snapshots are replaced by stubs, the images of
+    earlier turns are dropped and the oldest tool outputs are shrunk to stubs
+    until the conversation fits again.
+    """
+
+    def __init__(
+        self,
+        model: str,
+        budget: int | None = None,
+        screenshot_sets: int | None = None,
+    ):
+        self.model = model
+        self.budget = budget or get_token_budget(model)
+        if screenshot_sets is None:
+            screenshot_sets = int(os.environ.get("AGENT_SCREENSHOT_SETS", 2))
+        self.screenshot_sets = screenshot_sets
+        self.entries: list[Entry] = []
+        self.turn = 0
+        self._tool_calls: dict[str, tuple[str, dict]] = {}
+
+    @property
+    def messages(self) -> list[dict]:
+        return [entry.message for entry in self.entries]
+
+    @property
+    def tokens(self) -> int:
+        return sum(entry.tokens for entry in self.entries)
+
+    def render(self, store: ArtifactStore | None = None) -> list[dict]:
+        """Builds the messages for a request, attaching the latest screenshots
+
+        Artifact references are replaced with base64 data urls. Only the last
+        ``screenshot_sets`` messages with images are attached, earlier ones are
+        reduced to their text.
+        """
+        store = store or get_artifact_store()
+        image_entries = [e for e in self.entries if has_images(e.message)]
+        latest = image_entries[-self.screenshot_sets :] if self.screenshot_sets else []
+        attached = {id(entry) for entry in latest}
+
+        messages = []
+        for entry in self.entries:
+            message = entry.message
+            if not has_images(message):
+                messages.append(message)
+                continue
+
+            content = []
+            detached = 0
+            for part in message["content"]:
+                if part.get("type") != "image_url":
+                    content.append(part)
+                elif id(entry) not in attached:
+                    detached += 1
+                elif is_artifact_url(part["image_url"]["url"]):
+                    url = store.data_url(part["image_url"]["url"])
+                    content.append(
+                        {**part, "image_url": {**part["image_url"], "url": url}}
+                    )
+                else:
+                    content.append(part)
+            if detached:
+                content.append(
+                    {
+                        "type": "text",
+                        "text": f"[{detached} screenshot(s) from an earlier test run are no longer attached.]",
+                    }
+                )
+            messages.append({**message, "content": content})
+        return messages
+
+    def pin(self, message: dict):
+        """Adds a message that is never compacted"""
+        self.append(message)
+        self.entries[-1].pinned = True
+
+    def append(self, message: dict):
+        if message["role"] == "assistant":
+            self.turn += 1
+            for tool_call in message.get("tool_calls") or []:
+                function = tool_call["function"]
+                try:
+                    arguments = json.loads(function["arguments"] or "{}")
+                except json.JSONDecodeError:
+                    arguments = {}
+                self._tool_calls[tool_call["id"]] = (function["name"], arguments)
+
+        entry = Entry(
+            message=message,
+            turn=self.turn,
+            tokens=estimate_message_tokens(message),
+        )
+        if message["role"] == "tool":
+            name, arguments = self._tool_calls.get(message["tool_call_id"], (None, {}))
+            entry.tool_name = name
+            if name in SNAPSHOT_TOOLS:
+                entry.snapshot_key = json.dumps(
+                    [name, *(arguments.get(key) for key in SNAPSHOT_TOOLS[name])]
+                )
+        self.entries.append(entry)
+
+    def extend(self, messages: list[dict]):
+        for message in messages:
+            self.append(message)
+
+    def _compactable(self) -> list[Entry]:
+        return [
+            entry
+            for entry in self.entries
+            if not entry.pinned and not entry.compacted and entry.turn < self.turn
+        ]
+
+    def _stub(self, entry: Entry, reason: str):
+        entry.message = {**entry.message, "content": reason}
+        entry.tokens = estimate_message_tokens(entry.message)
+        entry.compacted = True
+
+    def _strip_images(self, entry: Entry):
+        content = [
+            part for part in entry.message["content"] if part.get("type") != "image_url"
+        ]
+        removed = len(entry.message["content"]) - len(content)
+        content.append(
+            {
+                "type": "text",
+                "text": f"[{removed} screenshot(s) from an earlier test run removed to save context.]",
+            }
+        )
+        entry.message = {**entry.message, "content": content}
+        entry.tokens = estimate_message_tokens(entry.message)
+        entry.compacted = True
+
+    def compact(self) -> bool:
+        """Shrinks older messages until the conversation fits the token budget
+
+        Returns True if any message was changed.
+        """
+        if self.tokens <= self.budget:
+            return False
+        before = self.tokens
+
+        # page snapshots that a later call with the same arguments replaced
+        latest_snapshots = {}
+        for index, entry in enumerate(self.entries):
+            if entry.snapshot_key:
+                latest_snapshots[entry.snapshot_key] = index
+        for entry in self._compactable():
+            key = entry.snapshot_key
+            if key and self.entries[latest_snapshots[key]] is not entry:
+                self._stub(
+                    entry,
+                    f"[Output of {entry.tool_name} removed: a newer snapshot of the same page follows.]",
+                )
+
+        # screenshots from earlier turns, keeping the text sent with them such as
+        # the failure digests of traces
+        if self.tokens > self.budget:
+            stale = [e for e in self._compactable() if has_images(e.message)]
+            for entry in stale:
+                self._strip_images(entry)
+
+        # the oldest tool outputs, until the conversation fits
+        for entry in self._compactable():
+            if self.tokens <= self.budget:
+                break
+            if entry.message["role"] == "tool":
+                self._stub(
+                    entry,
+                    f"[Output of {entry.tool_name} removed to save context. Call the tool again if you need it.]",
+                )
+
+        logger.info(
+            f"Compacted the conversation from ~{before} to ~{self.tokens} tokens (budget {self.budget})."
+        )
+        if self.tokens > self.budget:
+            logger.warning(
+                "The conversation is still over the token budget after compacting."
+            )
+        return True
@@ -0,0 +1,267 @@
+import asyncio
+import json
+import time
+from urllib.parse import urljoin, urlsplit
+from bs4 import BeautifulSoup
+from agent.browser import BrowserManager
+from agent.config import get_state_dir
+from agent.distill import describe_element, is_hidden, normalize_text
+from agent.logging import logger
+from agent.page_cache import PageCache, cache_key, normalize_url
+
+FIELD_TAGS = ["input", "textarea", "select"]
+BUTTON_TYPES = ["submit", "button", "reset", "image"]
+
+
+def same_origin(url: str, other: str) -> bool:
+    url_parts, other_parts = urlsplit(url), urlsplit(other)
+    return (url_parts.scheme, url_parts.netloc) == (
+        other_parts.scheme,
+        other_parts.netloc,
+    )
+
+
+def is_button(tag) -> bool:
+    if tag.name == "button":
+        return True
+    return tag.name == "input" and str(tag.get("type", "")).lower() in BUTTON_TYPES
+
+
+def summarize_page(html: str, url: str) -> dict:
+    """Extracts the title, headings, forms, inputs and links of a page
+
+    :param html: The html of the page
+    :type html: str
+    :param url: The url the page was loaded from, used to resolve links
+    :type url: str
+    """
+    soup = BeautifulSoup(html, "html.parser")
+    body = soup.body or soup
+
+    forms = []
+    for form in body.find_all("form"):
+        if is_hidden(form):
+            continue
+        forms.append(
+            {
+                "action": urljoin(url, str(form.get("action", ""))),
+                "method": str(form.get("method", "get")).lower(),
+                "fields": [
+                    describe_element(field)
+                    for field in form.find_all(FIELD_TAGS)
+                    if not is_hidden(field) and not is_button(field)
+                ],
+                "buttons": [
+                    describe_element(button)
+                    for button in form.find_all(["button", "input"])
+                    if not is_hidden(button) and is_button(button)
+                ],
+            }
+        )
+
+    links = {}
+    for link in body.find_all("a", href=True):
+        href = urljoin(url, str(link["href"]))
+        if urlsplit(href).scheme not in ["http", "https"] or is_hidden(link):
+            continue
+        links.setdefault(normalize_url(href), normalize_text(link.get_text(" ")))
+
+    return {
+        "url": url,
+        "title": normalize_text(soup.title.get_text(" ")) if soup.title else "",
+        "headings": [
+            normalize_text(heading.get_text(" "))
+            for heading in body.find_all(["h1", "h2", "h3"])
+            if not is_hidden(heading)
+        ],
+        "forms": forms,
+        "inputs": [
+            describe_element(field)
+            for field in body.find_all(FIELD_TAGS)
+            if not field.find_parent("form") and not is_hidden(field)
+        ],
+        "buttons": [
+            describe_element(button)
+            for button in body.find_all("button")
+            if not button.find_parent("form") and not is_hidden(button)
+        ],
+        "links": [{"url": href, "text": text} for href, text in links.items()],
+    }
+
+
+async def crawl(
+    browser: BrowserManager,
+    start_url: str,
+    max_depth: int = 2,
+    max_pages: int = 50,
+    concurrency: int = 4,
+    page_cache: PageCache | None = None,
+) -> dict:
+    """Crawls the pages reachable from start_url on the same origin
+
+    Pages are visited breadth first by ``concurrency`` workers sharing the
+    session browser, and stored in the page cache when one is given. Must be
+    awaited on the browser event loop.
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+    seen = {normalize_url(start_url)}
+    pages = {}
+    queue.put_nowait((start_url, 0))
+
+    async def worker():
+        while True:
+            url, depth = await queue.get()
+            try:
+                async with browser.page() as page:
+                    await browser.goto(page, url, wait_until="domcontentloaded")
+                    html = await page.content()
+                    final_url = page.url
+
+                if page_cache:
+                    key = cache_key(url, browser.viewport, browser.auth_state)
+                    page_cache.put(key, html)
+
+                summary = summarize_page(html, final_url)
+                summary["depth"] = depth
+                pages[normalize_url(url)] = summary
+                logger.info(f"Indexed {url}")
+
+                if depth >= max_depth:
+                    continue
+                for link in summary["links"]:
+                    if len(seen) >= max_pages:
+                        break
+                    if link["url"] in seen or not same_origin(link["url"], start_url):
+                        continue
+                    seen.add(link["url"])
+                    queue.put_nowait((link["url"], depth + 1))
+            except Exception as e:
+                logger.error(f"Error crawling {url}: {e}")
+                pages[normalize_url(url)] = {
+                    "url": url,
+                    "depth": depth,
+                    "error": str(e),
+                }
+            finally:
+                queue.task_done()
+
+    workers = [asyncio.create_task(worker()) for _ in range(max(1, concurrency))]
+    try:
+        await queue.join()
+    finally:
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+    return {
+        "start_url": start_url,
+        "crawled_at": time.time(),
+        "pages": pages,
+    }
+
+
+def get_site_index_path():
+    return get_state_dir() / "site_index.json"
+
+
+def save_site_index(index: dict):
+    with open(get_site_index_path(), "w") as f:
+        json.dump(index, f, indent=2)
+
+
+def load_site_index() -> dict | None:
+    path = get_site_index_path()
+    if not path.exists():
+        return None
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def format_site_map(index: dict) -> str:
+    """Formats the crawled pages with their titles and number of forms and inputs"""
+    lines = [f"Site map for {index['start_url']} ({len(index['pages'])} pages):"]
+    for page in sorted(index["pages"].values(), key=lambda p: (p["depth"], p["url"])):
+        if page.get("error"):
+            lines.append(f"- {page['url']} (error: {page['error']})")
+            continue
+        inputs = len(page["inputs"]) + sum(
+            len(form["fields"]) for form in page["forms"]
+        )
+        lines.append(
+            f"- {page['url']} title={json.dumps(page['title'])} forms={len(page['forms'])} inputs={inputs}"
+        )
+    return "\n".join(lines)
+
+
+def format_page(page: dict) -> str:
+    """Formats the forms, inputs, buttons and links of an indexed page"""
+    if page.get("error"):
+        return f"{page['url']} could not be crawled: {page['error']}"
+
+    lines = [f"Page: {page['url']}", f"Title: {page['title']}"]
+    if page["headings"]:
+        lines.append(f"Headings: {', '.join(page['headings'])}")
+    for form in page["forms"]:
+        lines.append(f"- form action={form['action']} method={form['method']}")
+        for element in form["fields"] + form["buttons"]:
+            lines.append(f"  - {format_description(element)}")
+    for element in page["inputs"] + page["buttons"]:
+        lines.append(f"- {format_description(element)}")
+    for link in page["links"]:
+        lines.append(f"- link {json.dumps(link['text'])} -> {link['url']}")
+    return "\n".join(lines)
+
+
+def format_description(description: dict) -> str:
+    fields = " ".join(
+        f"{key}={json.dumps(value)}"
+        for key, value in description.items()
+        if key not in ["tag", "locator"]
+    )
+    return f"{description['tag']} {fields} -> {description['locator']}"
+
+
+def query_index(index: dict, query: str) -> str:
+    """Finds the indexed pages and elements matching a search term"""
+    query = query.lower()
+    results = []
+    for page in index["pages"].values():
+        if page.get("error"):
+            continue
+        page_matches = query in page["url"].lower() or query in page["title"].lower()
+        page_matches = page_matches or any(
+            query in heading.lower() for heading in page["headings"]
+        )
+        elements = (
+            [
+                element
+                for form in page["forms"]
+                for element in form["fields"] + form["buttons"]
+            ]
+            + page["inputs"]
+            + page["buttons"]
+        )
+        matching_elements = [
+            element
+            for element in elements
+            if any(query in str(value).lower() for value in element.values())
+        ]
+        matching_links = [
+            link
+            for link in page["links"]
+            if query in link["text"].lower() or query in link["url"].lower()
+        ]
+        if not (page_matches or matching_elements or matching_links):
+            continue
+
+        lines = [f"Page: {page['url']} title={json.dumps(page['title'])}"]
+        lines.extend(f"- {format_description(e)}" for e in matching_elements)
+        lines.extend(
+            f"- link {json.dumps(link['text'])} -> {link['url']}"
+            for link in matching_links
+        )
+        results.append("\n".join(lines))
+
+    if not results:
+        return f"No pages or elements in the site index match '{query}'."
+    return "\n\n".join(results)
@@ -0,0 +1,134 @@
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+import numpy as np
+from PIL import Image
+from agent.logging import logger
+
+# a hash of HASH_SIZE x HASH_SIZE bits, large enough to tell apart frames that
+# differ by a few lines of text
+HASH_SIZE = 16
+
+
+def dhash(image: Image.Image, hash_size: int = HASH_SIZE) -> int:
+    """Computes the difference hash of an image
+
+    The image is shrunk to a (hash_size + 1) x hash_size grayscale grid and each
+    bit records whether a pixel is brighter than its right neighbour, so similar
+    images get hashes that differ in only a few bits.
+    """
+    pixels = np.asarray(
+        image.convert("L").resize((hash_size + 1, hash_size), Image.Resampling.BOX),
+        dtype=np.int16,
+    )
+    bits = pixels[:, 1:] > pixels[:, :-1]
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+@dataclass
+class BKNode:
+    hash: int
+    item: object
+    children: dict[int, "BKNode"] = field(default_factory=dict)
+
+
+class BKTree:
+    """A BK-tree of image hashes, finding the hashes within a hamming distance
+    without comparing against every hash in the tree."""
+
+    def __init__(self):
+        self.root: BKNode | None = None
+        self.size = 0
+
+    def add(self, hash: int, item: object):
+        self.size += 1
+        if self.root is None:
+            self.root = BKNode(hash, item)
+            return
+        node = self.root
+        while True:
+            distance = hamming_distance(hash, node.hash)
+            child = node.children.get(distance)
+            if child is None:
+                node.children[distance] = BKNode(hash, item)
+                return
+            node = child
+
+    def search(self, hash: int, max_distance: int) -> list[tuple[int, object]]:
+        """Returns the (distance, item) pairs within max_distance, closest first"""
+        matches = []
+        nodes = [self.root] if self.root else []
+        while nodes:
+            node = nodes.pop()
+            distance = hamming_distance(hash, node.hash)
+            if distance <= max_distance:
+                matches.append((distance, node.item))
+            # by the triangle inequality only these children can hold matches
+            for child_distance, child in node.children.items():
+                if abs(child_distance - distance) <= max_distance:
+                    nodes.append(child)
+        return sorted(matches, key=lambda match: match[0])
+
+
+@dataclass
+class DedupSettings:
+    max_distance: int = 2
+    # a hash match is only a duplicate if its rmse is low too, a few bits can
+    # be a typed value or an error message
+    verify: bool = True
+
+    @classmethod
+    def from_env(cls) -> "DedupSettings":
+        return cls(
+            max_distance=int(os.environ.get("AGENT_DEDUP_MAX_DISTANCE", 2)),
+            verify=os.environ.get("AGENT_DEDUP_VERIFY", "true").lower() == "true",
+        )
+
+
+def find_duplicates(
+    image_paths: list[Path],
+    max_distance: int = 2,
+    verify=None,
+) -> dict[Path, Path]:
+    """Finds images that are nearly identical to an earlier image in the list
+
+    Each image is decoded once and hashed. Images only match images of the same
+    size whose hash is within max_distance bits.
+
+    :param image_paths: The images, earlier images are kept over later ones
+    :type image_paths: list[Path]
+    :param max_distance: The number of bits two hashes may differ by
+    :type max_distance: int
+    :param verify: An optional second check called with an image and the kept
+        images its hash matches, returning the one it duplicates or None
+    :return: A dict of each duplicate image to the image it duplicates
+    :rtype: dict[Path, Path]
+    """
+    trees: dict[tuple[int, int], BKTree] = {}
+    duplicates = {}
+    for image_path in image_paths:
+        try:
+            with Image.open(image_path) as image:
+                size = image.size
+                # jpeg images can be decoded at a fraction of their size
+                image.draft("L", (HASH_SIZE * 8, HASH_SIZE * 8))
+                hash = dhash(image)
+        except Exception as e:
+            logger.error(f"Error hashing {image_path}: {e}")
+            continue
+
+        tree = trees.setdefault(size, BKTree())
+        matches = [match for _, match in tree.search(hash, max_distance)]
+        if matches and verify is not None:
+            original = verify(image_path, matches)
+        else:
+            original = matches[0] if matches else None
+        if original is None:
+            tree.add(hash, image_path)
+        else:
+            duplicates[image_path] = original
+    return duplicates
@@ -0,0 +1,223 @@
+import re
+from bs4 import BeautifulSoup, Tag
+
+HEADINGS = ["h1", "h2", "h3", "h4", "h5", "h6"]
+INTERACTIVE_TAGS = ["form", "input", "textarea", "select", "button", "a", "label"]
+ROLE_BY_TAG = {
+    "a": "link",
+    "button": "button",
+    "select": "combobox",
+    "textarea": "textbox",
+    **{heading: "heading" for heading in HEADINGS},
+}
+ROLE_BY_INPUT_TYPE = {
+    "button": "button",
+    "submit": "button",
+    "reset": "button",
+    "checkbox": "checkbox",
+    "radio": "radio",
+    "range": "slider",
+    "search": "searchbox",
+}
+MAX_TEXT_LENGTH = 80
+
+
+def normalize_text(text: str, limit: int = MAX_TEXT_LENGTH) -> str:
+    text = re.sub(r"\s+", " ", text).strip()
+    if len(text) > limit:
+        text = f"{text[: limit - 3]}..."
+    return text
+
+
+def quote(value: str) -> str:
+    return '"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def strip_scripts(html: str) -> str:
+    """Removes the script tags from a page, leaving everything else untouched"""
+    soup = BeautifulSoup(html, "html.parser")
+    for script in soup.find_all("script"):
+        script.decompose()
+    return str(soup)
+
+
+def is_hidden(tag: Tag) -> bool:
+    """Checks whether an element or any of its ancestors is hidden"""
+    for node in [tag, *tag.parents]:
+        if not isinstance(node, Tag) or node.name == "[document]":
+            continue
+        if node.has_attr("hidden") or node.get("aria-hidden") == "true":
+            return True
+        if node.name == "input" and str(node.get("type", "")).lower() == "hidden":
+            return True
+        style = str(node.get("style", "")).replace(" ", "").lower()
+        if "display:none" in style or "visibility:hidden" in style:
+            return True
+    return False
+
+
+def get_role(tag: Tag) -> str | None:
+    if tag.get("role"):
+        return str(tag["role"])
+    if tag.name == "input":
+        return ROLE_BY_INPUT_TYPE.get(str(tag.get("type", "text")).lower(), "textbox")
+    if tag.name == "a" and not tag.get("href"):
+        return None
+    return ROLE_BY_TAG.get(tag.name)
+
+
+def get_text(tag: Tag) -> str:
+    if tag.name == "input":
+        return normalize_text(str(tag.get("value", "")))
+    return normalize_text(tag.get_text(" "))
+
+
+def suggest_locator(tag: Tag) -> str:
+    """Suggests the most stable playwright selector for an element
+
+    Test ids, ids, names and placeholders are preferred over roles and visible
+    text, which are preferred over hrefs and bare tag names.
+    """
+    test_id = tag.get("data-testid") or tag.get("data-test") or tag.get("data-cy")
+    if test_id:
+        attribute = next(
+            a for a in ["data-testid", "data-test", "data-cy"] if tag.get(a)
+        )
+        return f"[{attribute}={quote(str(test_id))}]"
+    if tag.get("id"):
+        element_id = str(tag["id"])
+        if re.fullmatch(r"[A-Za-z][\w-]*", element_id):
+            return f"#{element_id}"
+        return f"[id={quote(element_id)}]"
+    if tag.get("name"):
+        return f"{tag.name}[name={quote(str(tag['name']))}]"
+    if tag.get("placeholder"):
+        return f"[placeholder={quote(str(tag['placeholder']))}]"
+    if tag.get("aria-label"):
+        return f"[aria-label={quote(str(tag['aria-label']))}]"
+
+    role = get_role(tag)
+    text = get_text(tag)
+    if role and text:
+        return f"role={role}[name={quote(text)}]"
+    if text and tag.name != "form":
+        return f"{tag.name}:has-text({quote(text)})"
+    if tag.get("href"):
+        return f"a[href={quote(str(tag['href']))}]"
+    return tag.name
+
+
+def describe_element(tag: Tag) -> dict:
+    """Collects the attributes of an element that are useful for writing tests"""
+    description = {"tag": tag.name}
+    for attribute in ["id", "name", "type", "placeholder", "href", "for", "action"]:
+        value = tag.get(attribute)
+        if value:
+            description[attribute] = normalize_text(str(value))
+
+    role = get_role(tag)
+    if role:
+        description["role"] = role
+
+    if tag.name != "form":
+        text = get_text(tag)
+        if text:
+            description["text"] = text
+
+    description["locator"] = suggest_locator(tag)
+    return description
+
+
+def format_element(description: dict, indent: int = 0) -> str:
+    fields = " ".join(
+        f"{key}={quote(value)}"
+        for key, value in description.items()
+        if key not in ["tag", "locator"]
+    )
+    line = f"{'  ' * indent}- {description['tag']}"
+    if fields:
+        line = f"{line} {fields}"
+    return f"{line} -> {description['locator']}"
+
+
+def distill_html(html: str, max_chars: int | None = 8000) -> str:
+    """Distills a page down to a compact list of the elements tests interact with
+
+    Inputs, buttons, links, forms, labels and headings are listed in document
+    order with their identifying attributes and a suggested locator. Elements
+    inside a form are indented below it.
+
+    :param html: The html of the page
+    :type html: str
+    :param max_chars: The maximum size of the output, defaults to 8000
+    :type max_chars: int | None, optional
+    """
+    soup = BeautifulSoup(html, "html.parser")
+    lines = []
+
+    title = soup.title.get_text(" ") if soup.title else ""
+    if title.strip():
+        lines.append(f"Title: {normalize_text(title)}")
+
+    body = soup.body or soup
+    for tag in body.find_all(INTERACTIVE_TAGS + HEADINGS):
+        if is_hidden(tag):
+            continue
+        indent = 1 if tag.name != "form" and tag.find_parent("form") else 0
+        lines.append(format_element(describe_element(tag), indent=indent))
+
+    output = []
+    size = 0
+    for index, line in enumerate(lines):
+        if max_chars and size + len(line) + 1 > max_chars:
+            output.append(f"... ({len(lines) - index} more elements not shown)")
+            break
+        output.append(line)
+        size += len(line) + 1
+
+    return "\n".join(output)
+
+
+def format_accessibility_tree(
+    node: dict | None, max_depth: int | None = None, depth: int = 0
+) -> str:
+    """Formats an accessibility snapshot as an indented role/name tree
+
+    :param node: A node returned by playwright's accessibility snapshot
+    :type node: dict | None
+    :param max_depth: The number of levels to include, defaults to None (all)
+    :type max_depth: int | None, optional
+    """
+    if not node:
+        return ""
+
+    line = f"{'  ' * depth}- {node.get('role', 'generic')}"
+    if node.get("name"):
+        line = f"{line} {quote(normalize_text(str(node['name'])))}"
+    for key in ["value", "level", "checked", "pressed", "selected", "disabled"]:
+        if node.get(key) not in [None, "", False]:
+            line = f"{line} [{key}={node[key]}]"
+
+    lines = [line]
+    children = node.get("children") or []
+    if max_depth is not None and depth + 1 >= max_depth:
+        if children:
+            lines.append(f"{'  ' * (depth + 1)}- ... ({len(children)} children)")
+    else:
+        for child in children:
+            lines.append(format_accessibility_tree(child, max_depth, depth + 1))
+
+    return "\n".join(line for line in lines if line)
+
+
+def limit_aria_snapshot(snapshot: str, max_depth: int | None = None) -> str:
+    """Removes the levels of a playwright aria snapshot below max_depth"""
+    if max_depth is None:
+        return snapshot
+
+    lines = []
+    for line in snapshot.splitlines():
+        indent = len(line) - len(line.lstrip(" "))
+        if indent // 2 < max_depth:
+            lines.append(line)
+    return "\n".join(lines)
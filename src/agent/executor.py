@@ -0,0 +1,83 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+import agent.tools as tools
+from agent.logging import logger
+
+# tools that only read state and can safely run alongside each other. Anything
+# not listed here (writing files, running tests, prompting the user) runs on its
+# own, in the order it was requested.
+PARALLEL_SAFE_TOOLS = {
+    "extract_webpage_content",
+    "get_accessibility_tree",
+    "list_files_in_dir",
+    "query_site_index",
+    "read_file_contents",
+    "verify_locators",
+}
+
+
+def get_tool_workers() -> int:
+    """Returns the size of the worker pool used for parallel safe tools"""
+    try:
+        return max(1, int(os.environ.get("AGENT_TOOL_WORKERS", 4)))
+    except ValueError:
+        return 4
+
+
+def call_tool(name: str, kwargs: dict):
+    """Calls a single tool, logging how long it took
+
+    :param name: The name of the tool function in agent.tools
+    :type name: str
+    :param kwargs: The arguments requested by the model
+    :type kwargs: dict
+    """
+    start = time.perf_counter()
+    try:
+        output = getattr(tools, name)(**kwargs)
+    except Exception as e:
+        logger.error(f"Error calling tool {name}: {e}")
+        output = f"Error calling tool {name}: {e}"
+    logger.info(f"Tool {name} finished in {time.perf_counter() - start:.2f}s")
+    return output
+
+
+def execute_tool_calls(calls: list[tuple[str, dict]]) -> list:
+    """Executes tool calls, running consecutive parallel safe tools concurrently
+
+    Results are returned in the same order as the calls were given.
+
+    :param calls: A list of (tool name, kwargs) tuples
+    :type calls: list[tuple[str, dict]]
+    """
+    results = [None] * len(calls)
+    batch: list[int] = []
+
+    def flush():
+        if not batch:
+            return
+        if len(batch) == 1:
+            index = batch[0]
+            results[index] = call_tool(*calls[index])
+        else:
+            workers = min(get_tool_workers(), len(batch))
+            logger.debug(f"Running {len(batch)} tools with {workers} worker(s)")
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                futures = {
+                    index: pool.submit(call_tool, *calls[index]) for index in batch
+                }
+                for index, future in futures.items():
+                    results[index] = future.result()
+        batch.clear()
+
+    for index, (name, _) in enumerate(calls):
+        if name in PARALLEL_SAFE_TOOLS:
+            batch.append(index)
+        else:
+            # keep serialized tools ordered relative to everything around them
+            flush()
+            results[index] = call_tool(*calls[index])
+    flush()
+
+    return results
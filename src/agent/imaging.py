@@ -0,0 +1,140 @@
+import io
+import math
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from PIL import Image
+
+FORMATS = {"jpeg": ".jpeg", "webp": ".webp"}
+# images taller than this many times their width are split into tiles
+TALL_RATIO = 2.0
+MAX_TILES = 8
+
+
+@dataclass
+class ImageSettings:
+    max_edge: int = 1536
+    format: str = "jpeg"
+    quality: int = 80
+
+    @classmethod
+    def from_env(cls) -> "ImageSettings":
+        image_format = os.environ.get("AGENT_IMAGE_FORMAT", "jpeg").lower()
+        return cls(
+            max_edge=int(os.environ.get("AGENT_IMAGE_MAX_EDGE", 1536)),
+            format=image_format if image_format in FORMATS else "jpeg",
+            quality=int(os.environ.get("AGENT_IMAGE_QUALITY", 80)),
+        )
+
+
+@dataclass
+class ImageStats:
+    images: int = 0
+    original_bytes: int = 0
+    prepared_bytes: int = 0
+
+    def add(self, original_bytes: int, prepared: list[tuple[bytes, str]]):
+        self.images += 1
+        self.original_bytes += original_bytes
+        self.prepared_bytes += sum(len(data) for data, _ in prepared)
+
+    def summary(self) -> str:
+        saved = self.original_bytes - self.prepared_bytes
+        ratio = saved / self.original_bytes * 100 if self.original_bytes else 0
+        return (
+            f"Prepared {self.images} image(s): {self.original_bytes / 1024:.0f} KB -> "
+            f"{self.prepared_bytes / 1024:.0f} KB ({saved / 1024:.0f} KB, {ratio:.0f}% saved)."
+        )
+
+
+def flatten(image: Image.Image) -> Image.Image:
+    """Converts an image to RGB, placing any transparency on a white background"""
+    if image.mode in ["RGBA", "LA"] or "transparency" in image.info:
+        image = image.convert("RGBA")
+        background = Image.new("RGB", image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel("A"))
+        return background
+    return image.convert("RGB")
+
+
+def resize_and_tile(image: Image.Image, max_edge: int) -> list[Image.Image]:
+    """Scales an image to fit max_edge, splitting very tall images into tiles
+
+    Tall images (e.g. full page screenshots) are scaled to fit the width and cut
+    into tiles of at most max_edge pixels high, so the text stays readable
+    instead of being shrunk to fit the height.
+    """
+    width, height = image.size
+    if height > width * TALL_RATIO:
+        scale = min(1.0, max_edge / width)
+        image = image.resize(
+            (round(width * scale), round(height * scale)), Image.Resampling.LANCZOS
+        )
+        width, height = image.size
+        tiles = min(MAX_TILES, math.ceil(height / max_edge))
+        tile_height = math.ceil(height / tiles)
+        if tile_height > max_edge:
+            # too many tiles, shrink the remainder to fit
+            return [
+                tile.resize(
+                    (round(tile.width * max_edge / tile_height), max_edge),
+                    Image.Resampling.LANCZOS,
+                )
+                for tile in split(image, tiles, tile_height)
+            ]
+        return split(image, tiles, tile_height)
+
+    scale = min(1.0, max_edge / max(width, height))
+    if scale < 1.0:
+        image = image.resize(
+            (round(width * scale), round(height * scale)), Image.Resampling.LANCZOS
+        )
+    return [image]
+
+
+def split(image: Image.Image, tiles: int, tile_height: int) -> list[Image.Image]:
+    return [
+        image.crop((0, top, image.width, min(top + tile_height, image.height)))
+        for top in range(0, tile_height * tiles, tile_height)
+        if top < image.height
+    ]
+
+
+def encode(image: Image.Image, settings: ImageSettings) -> bytes:
+    buffer = io.BytesIO()
+    image.save(buffer, format=settings.format.upper(), quality=settings.quality)
+    return buffer.getvalue()
+
+
+def prepare(
+    image: Image.Image, settings: ImageSettings | None = None
+) -> list[tuple[bytes, str]]:
+    """Downscales, tiles and re-encodes an image that is already loaded"""
+    settings = settings or ImageSettings.from_env()
+    tiles = resize_and_tile(flatten(image), settings.max_edge)
+    return [(encode(tile, settings), FORMATS[settings.format]) for tile in tiles]
+
+
+def prepare_image(
+    path: Path | str,
+    settings: ImageSettings | None = None,
+    stats: ImageStats | None = None,
+) -> list[tuple[bytes, str]]:
+    """Downscales, tiles and re-encodes an image before it is sent to the model
+
+    :param path: The path of the image
+    :type path: Path | str
+    :param settings: The size, format and quality to use, defaults to the config
+    :type settings: ImageSettings | None, optional
+    :param stats: Collects the number of bytes saved, defaults to None
+    :type stats: ImageStats | None, optional
+    :return: A list of (encoded bytes, file extension) tuples, one per tile
+    :rtype: list[tuple[bytes, str]]
+    """
+    with Image.open(path) as image:
+        prepared = prepare(image, settings)
+
+    if stats is not None:
+        stats.add(Path(path).stat().st_size, prepared)
+
+    return prepared
@@ -0,0 +1,124 @@
+import hashlib
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+from agent.config import get_state_dir
+from agent.logging import logger
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def normalize_url(url: str) -> str:
+    """Normalizes a url so that equivalent urls share a cache entry
+
+    The scheme and host are lowercased, default ports and fragments are dropped,
+    query parameters are sorted and a trailing slash is removed from the path.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    path = parts.path.rstrip("/") or "/"
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, host, path, query, ""))
+
+
+def cache_key(url: str, viewport: dict | None = None, auth_state: str | None = None):
+    """Builds the content address for a page snapshot
+
+    :param url: The url of the page
+    :type url: str
+    :param viewport: The viewport the page was rendered with, defaults to None
+    :type viewport: dict | None, optional
+    :param auth_state: An identifier for the authentication state, defaults to None
+    :type auth_state: str | None, optional
+    """
+    key = json.dumps(
+        {
+            "url": normalize_url(url),
+            "viewport": viewport or {},
+            "auth_state": auth_state or "anonymous",
+        },
+        sort_keys=True,
+    )
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+class PageCache:
+    """An on-disk cache of page html with a TTL and an LRU size cap.
+
+    The modification time of an entry records when it was stored (for the TTL)
+    and the access time records when it was last used (for eviction).
+    """
+
+    def __init__(self, directory: Path, ttl: float = 3600, max_bytes: int = 50_000_000):
+        self.directory = Path(directory)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.html"
+
+    def get(self, key: str) -> str | None:
+        path = self._path(key)
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            return None
+
+        if time.time() - stat.st_mtime > self.ttl:
+            logger.debug(f"Page cache entry {key} has expired.")
+            path.unlink(missing_ok=True)
+            return None
+
+        content = path.read_text()
+        # mark the entry as recently used, keeping the stored time intact
+        os.utime(path, (time.time(), stat.st_mtime))
+        return content
+
+    def put(self, key: str, content: str):
+        # each writer has its own temporary file, so concurrent puts of the same
+        # key do not write into each other's file before it is moved in place
+        with tempfile.NamedTemporaryFile(
+            "w", dir=self.directory, suffix=".tmp", delete=False
+        ) as f:
+            f.write(content)
+        os.replace(f.name, self._path(key))
+        self.evict()
+
+    def evict(self):
+        """Deletes the least recently used entries until the cache fits its cap"""
+        entries = []
+        total = 0
+        for path in self.directory.glob("*.html"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                # evicted or expired by another thread since the listing
+                continue
+            entries.append((stat.st_atime, stat.st_size, path))
+            total += stat.st_size
+
+        entries.sort()
+        while entries and total > self.max_bytes:
+            _, size, path = entries.pop(0)
+            logger.debug(f"Evicting {path.name} from the page cache.")
+            path.unlink(missing_ok=True)
+            total -= size
+
+
+def get_page_cache() -> PageCache | None:
+    """Returns the page cache configured for this session, or None if disabled"""
+    if os.environ.get("AGENT_PAGE_CACHE", "true").lower() == "false":
+        return None
+
+    return PageCache(
+        get_state_dir() / "cache" / "pages",
+        ttl=float(os.environ.get("AGENT_PAGE_CACHE_TTL", 3600)),
+        max_bytes=int(float(os.environ.get("AGENT_PAGE_CACHE_MAX_MB", 50)) * 1e6),
+    )
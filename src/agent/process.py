@@ -0,0 +1,215 @@
+import os
+import re
+import shutil
+import signal
+import subprocess
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from pathlib import Path
+from rich.text import Text
+from agent.logging import console, logger
+from agent.results import strip_ansi
+
+# the output kept in memory from the start and the end of a run
+HEAD_CHARS = 4000
+TAIL_CHARS = 16000
+# the time a run may take to exit after its reporter printed the results
+DONE_GRACE_SECONDS = 10
+KILL_GRACE_SECONDS = 5
+
+
+@dataclass
+class ProcessResult:
+    output: str
+    returncode: int | None
+    log_path: Path | None = None
+    note: str | None = None
+
+
+class OutputBuffer:
+    """Keeps the start and the end of a stream of output within a fixed size"""
+
+    def __init__(self, head_chars: int = HEAD_CHARS, tail_chars: int = TAIL_CHARS):
+        self.head_chars = head_chars
+        self.tail_chars = tail_chars
+        self.head: list[str] = []
+        self.head_size = 0
+        self.tail: deque[str] = deque()
+        self.tail_size = 0
+        self.dropped = 0
+
+    def write(self, text: str):
+        if self.head_size < self.head_chars:
+            self.head.append(text)
+            self.head_size += len(text)
+            return
+        self.tail.append(text)
+        self.tail_size += len(text)
+        while self.tail_size > self.tail_chars and len(self.tail) > 1:
+            dropped = self.tail.popleft()
+            self.tail_size -= len(dropped)
+            self.dropped += len(dropped)
+
+    def getvalue(self) -> str:
+        output = "".join(self.head)
+        if self.dropped:
+            output += f"\n... ({self.dropped} characters omitted, see the log)\n"
+        return output + "".join(self.tail)
+
+
+def read_output(log_path: Path) -> str:
+    """Reads the start and the end of a log file"""
+    buffer = OutputBuffer()
+    if log_path.exists():
+        with open(log_path, "r", errors="replace") as f:
+            for line in f:
+                buffer.write(line)
+    return buffer.getvalue()
+
+
+def merge_results(results: list[ProcessResult], log_path: Path) -> ProcessResult:
+    """Combines the results of runs made in parallel, concatenating their logs
+
+    The log of each run is removed once it is copied to log_path.
+    """
+    with open(log_path, "w") as log_file:
+        for index, result in enumerate(results):
+            log_file.write(f"=== shard {index + 1} of {len(results)} ===\n")
+            if result.log_path and result.log_path.exists():
+                with open(result.log_path, "r", errors="replace") as f:
+                    shutil.copyfileobj(f, log_file)
+                result.log_path.unlink()
+
+    returncodes = [result.returncode for result in results]
+    notes = list(dict.fromkeys(result.note for result in results if result.note))
+    return ProcessResult(
+        output=read_output(log_path),
+        returncode=None if None in returncodes else max(returncodes),
+        log_path=log_path,
+        note=" ".join(notes) or None,
+    )
+
+
+def get_timeout(name: str, default: float) -> float | None:
+    """Reads a timeout in seconds from the environment, 0 disables it"""
+    timeout = float(os.environ.get(name, default))
+    return timeout or None
+
+
+def kill_process_group(process: subprocess.Popen):
+    """Terminates a process and its children, killing them if they do not exit"""
+    try:
+        os.killpg(process.pid, signal.SIGTERM)
+        process.wait(KILL_GRACE_SECONDS)
+    except subprocess.TimeoutExpired:
+        os.killpg(process.pid, signal.SIGKILL)
+        process.wait()
+    except ProcessLookupError:
+        pass
+
+
+def run_streaming(
+    cmd: list[str],
+    cwd: Path | None = None,
+    env: dict | None = None,
+    log_path: Path | None = None,
+    timeout: float | None = None,
+    idle_timeout: float | None = None,
+    done_pattern: str | None = None,
+) -> ProcessResult:
+    """Runs a command, showing its output live and spooling it to a log file
+
+    The command runs in its own process group, which is killed if it runs
+    longer than timeout, prints nothing for idle_timeout seconds, or has not
+    exited a few seconds after a line matching done_pattern was printed.
+
+    :param cmd: The command and its arguments
+    :type cmd: list[str]
+    :param log_path: The file the full output is written to, defaults to None
+    :type log_path: Path | None, optional
+    :param timeout: The maximum duration of the run in seconds, defaults to None
+    :type timeout: float | None, optional
+    :param idle_timeout: The maximum time without output in seconds, defaults to None
+    :type idle_timeout: float | None, optional
+    :param done_pattern: A regex matching the line that ends the run's report
+    :type done_pattern: str | None, optional
+    :return: The start and end of the output, and why the run was stopped
+    :rtype: ProcessResult
+    """
+    buffer = OutputBuffer()
+    done = threading.Event()
+    last_output = time.monotonic()
+    log_file = open(log_path, "w") if log_path else None
+
+    process = subprocess.Popen(
+        cmd,
+        cwd=cwd,
+        env=env,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+        errors="replace",
+        bufsize=1,
+        start_new_session=True,
+    )
+
+    def read_output():
+        nonlocal last_output
+        for line in process.stdout:
+            last_output = time.monotonic()
+            console.print(Text.from_ansi(line.rstrip("\n")))
+            plain = strip_ansi(line)
+            buffer.write(plain)
+            if log_file:
+                log_file.write(plain)
+            if done_pattern and re.search(done_pattern, plain):
+                done.set()
+
+    reader = threading.Thread(target=read_output, daemon=True)
+    reader.start()
+
+    start = time.monotonic()
+    done_at = None
+    note = None
+    try:
+        while process.poll() is None:
+            now = time.monotonic()
+            if done.is_set() and done_at is None:
+                done_at = now
+            if timeout and now - start > timeout:
+                note = f"The test run was killed after {timeout:.0f}s."
+            elif idle_timeout and now - last_output > idle_timeout:
+                note = (
+                    f"The test run was killed after {idle_timeout:.0f}s without output."
+                )
+            elif done_at and now - done_at > DONE_GRACE_SECONDS:
+                logger.debug("The test run reported its results but did not exit.")
+            else:
+                time.sleep(0.1)
+                continue
+            kill_process_group(process)
+            break
+    finally:
+        if process.poll() is None:
+            kill_process_group(process)
+        reader.join(KILL_GRACE_SECONDS)
+        if reader.is_alive():
+            # children that outlived the runner still hold the output open
+            try:
+                os.killpg(process.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            reader.join(KILL_GRACE_SECONDS)
+        if log_file:
+            log_file.close()
+
+    if note:
+        logger.warning(note)
+    return ProcessResult(
+        output=buffer.getvalue(),
+        returncode=process.returncode,
+        log_path=log_path,
+        note=note,
+    )
@@ -0,0 +1,241 @@
+import atexit
+import json
+import multiprocessing
+import os
+import sys
+import threading
+from pathlib import Path
+import pytest
+from agent.logging import logger
+
+# runs served by a worker before it is replaced by a fresh one
+DEFAULT_MAX_RUNS = 20
+
+
+class Tee:
+    """Writes to a log file as well as the original stream"""
+
+    def __init__(self, stream, log_file):
+        self.stream = stream
+        self.log_file = log_file
+
+    def write(self, text: str) -> int:
+        self.stream.write(text)
+        self.log_file.write(text)
+        return len(text)
+
+    def flush(self):
+        self.stream.flush()
+        self.log_file.flush()
+
+    def isatty(self) -> bool:
+        return False
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+
+class WarmBrowserFixtures:
+    """Keeps playwright and the browsers launched by pytest-playwright open
+    between runs, instead of starting them for every pytest session."""
+
+    def __init__(self):
+        self.started_playwright = None
+        self.new_request_context = None
+        self.browsers = {}
+
+    @pytest.fixture(scope="session")
+    def playwright(self, request):
+        if self.started_playwright is None:
+            from playwright.sync_api import sync_playwright
+
+            self.started_playwright = sync_playwright().start()
+            self.new_request_context = self.started_playwright.request.new_context
+        try:
+            api_request_contexts = request.getfixturevalue("_pw_api_request_contexts")
+        except pytest.FixtureLookupError:
+            api_request_contexts = None
+        if api_request_contexts:
+            # undo the instrumentation of the previous session
+            self.started_playwright.request.new_context = self.new_request_context
+            api_request_contexts.instrument(self.started_playwright)
+        yield self.started_playwright
+
+    @pytest.fixture(scope="session")
+    def browser(self, launch_browser, browser_name, browser_type_launch_args):
+        key = json.dumps([browser_name, browser_type_launch_args], default=str)
+        browser = self.browsers.get(key)
+        if browser is None or not browser.is_connected():
+            browser = self.browsers[key] = launch_browser()
+        yield browser
+
+    def close(self):
+        for browser in self.browsers.values():
+            try:
+                browser.close()
+            except Exception:
+                pass
+        if self.started_playwright is not None:
+            self.started_playwright.stop()
+
+
+class WarmBrowserPlugin:
+    """Registers the warm browser fixtures in every pytest session"""
+
+    def __init__(self):
+        self.fixtures = WarmBrowserFixtures()
+
+    @pytest.hookimpl(trylast=True)
+    def pytest_configure(self, config):
+        # the fixtures of the last registered plugin win, so they are registered
+        # after the plugins loaded from entry points, such as pytest-playwright
+        config.pluginmanager.register(self.fixtures, "agent-warm-browser")
+
+    def close(self):
+        self.fixtures.close()
+
+
+def purge_modules(directory: Path):
+    """Removes the modules imported from directory from sys.modules, so the
+    next run imports the tests and their helpers again instead of running stale
+    code. Modules that did not change are cheap to import again, unlike the
+    plugins and the browser, which are kept."""
+    directory = directory.resolve()
+    for name, module in list(sys.modules.items()):
+        file = getattr(module, "__file__", None)
+        if file and Path(file).resolve().is_relative_to(directory):
+            del sys.modules[name]
+
+
+def serve(connection, warm_browser: bool = True):
+    """Runs pytest sessions requested over connection until it is closed"""
+    import pytest_playwright
+
+    plugin = WarmBrowserPlugin() if warm_browser else None
+    try:
+        while True:
+            try:
+                request = connection.recv()
+            except EOFError:
+                break
+            purge_modules(Path(request["test_dir"]))
+            plugins = [pytest_playwright] + ([plugin] if plugin else [])
+            with open(request["log_path"], "w") as log_file:
+                stdout, stderr = sys.stdout, sys.stderr
+                sys.stdout = Tee(stdout, log_file)
+                sys.stderr = Tee(stderr, log_file)
+                try:
+                    exit_code = pytest.main(request["args"], plugins=plugins)
+                finally:
+                    sys.stdout.flush()
+                    sys.stderr.flush()
+                    sys.stdout, sys.stderr = stdout, stderr
+            connection.send(int(exit_code))
+    finally:
+        if plugin:
+            plugin.close()
+
+
+class PytestWorker:
+    """A long lived pytest process that keeps its plugins loaded and the
+    browser open between runs.
+
+    The worker is replaced after max_runs runs, or if it crashes or a run
+    times out.
+    """
+
+    def __init__(self, max_runs: int = DEFAULT_MAX_RUNS, warm_browser: bool = True):
+        self.max_runs = max_runs
+        self.warm_browser = warm_browser
+        self.process = None
+        self.connection = None
+        self.runs = 0
+        self.lock = threading.Lock()
+
+    def _start(self):
+        # spawn rather than fork, the agent process runs other threads
+        context = multiprocessing.get_context("spawn")
+        self.connection, child = context.Pipe()
+        self.process = context.Process(
+            target=serve, args=(child, self.warm_browser), daemon=True
+        )
+        self.process.start()
+        child.close()
+        self.runs = 0
+        logger.debug(f"Started pytest worker {self.process.pid}.")
+
+    def _stop(self):
+        if self.process is None:
+            return
+        try:
+            self.connection.close()
+            self.process.join(5)
+        finally:
+            if self.process.is_alive():
+                self.process.kill()
+                self.process.join()
+            self.process = None
+            self.connection = None
+
+    def run(
+        self,
+        args: list[str],
+        test_dir: Path,
+        log_path: Path,
+        timeout: float | None = None,
+    ) -> tuple[int | None, str | None]:
+        """Runs pytest with args, writing its output to log_path
+
+        :return: The exit code, or None and the reason the run did not finish
+        :rtype: tuple[int | None, str | None]
+        """
+        with self.lock:
+            if self.process is None or not self.process.is_alive():
+                self._start()
+            self.connection.send(
+                {"args": args, "test_dir": str(test_dir), "log_path": str(log_path)}
+            )
+            try:
+                if not self.connection.poll(timeout):
+                    self._stop()
+                    return None, f"The test run was killed after {timeout:.0f}s."
+                exit_code = self.connection.recv()
+            except (EOFError, OSError):
+                self._stop()
+                return None, "The pytest worker crashed, it will be restarted."
+
+            self.runs += 1
+            if self.runs >= self.max_runs:
+                self._stop()
+            return exit_code, None
+
+    def close(self):
+        with self.lock:
+            self._stop()
+
+
+# one worker per shard of the tests run in parallel
+_workers: dict[int, PytestWorker] = {}
+_worker_lock = threading.Lock()
+
+
+def get_pytest_worker(index: int = 0) -> PytestWorker:
+    with _worker_lock:
+        if index not in _workers:
+            _workers[index] = PytestWorker(
+                max_runs=int(
+                    os.environ.get("AGENT_PYTEST_WORKER_RUNS", DEFAULT_MAX_RUNS)
+                ),
+            )
+        return _workers[index]
+
+
+def shutdown_pytest_worker():
+    with _worker_lock:
+        workers = list(_workers.values())
+        _workers.clear()
+    for worker in workers:
+        worker.close()
+
+
+atexit.register(shutdown_pytest_worker)
@@ -0,0 +1,272 @@
+import json
+import re
+import shutil
+import time
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass, field
+from pathlib import Path
+from agent.config import get_state_dir
+
+ANSI_ESCAPE = re.compile(r"\x1b\[[0-9;?]*[ -/]*[@-~]")
+STACK_LINES = 8
+MESSAGE_CHARS = 500
+# the output of a run without parsable results, from its start and end
+OUTPUT_HEAD_CHARS = 1000
+OUTPUT_TAIL_CHARS = 3000
+# the runs whose reports and logs are kept on disk
+KEPT_RUNS = 20
+FAILED_STATUSES = ["failed", "error"]
+
+
+def strip_ansi(text: str) -> str:
+    return ANSI_ESCAPE.sub("", text)
+
+
+def trim_stack(stack: str | None, lines: int = STACK_LINES) -> str | None:
+    """Keeps the last lines of a stack trace, where the assertion usually is"""
+    if not stack:
+        return None
+    stack_lines = [line for line in strip_ansi(stack).splitlines() if line.strip()]
+    if len(stack_lines) > lines:
+        skipped = len(stack_lines) - lines
+        stack_lines = [f"... ({skipped} lines)", *stack_lines[-lines:]]
+    return "\n".join(stack_lines)
+
+
+def slugify(text: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-")
+
+
+@dataclass
+class TestResult:
+    __test__ = False
+
+    id: str
+    status: str
+    duration: float = 0.0
+    message: str | None = None
+    stack: str | None = None
+    artifacts: list[str] = field(default_factory=list)
+    # the spec file of the test, if the report names it
+    file: str | None = None
+
+    @property
+    def failed(self) -> bool:
+        return self.status in FAILED_STATUSES
+
+
+@dataclass
+class TestRun:
+    """The results of a test run in a form shared by every framework"""
+
+    __test__ = False
+
+    framework: str
+    results: list[TestResult] = field(default_factory=list)
+    duration: float = 0.0
+    output: str = ""
+    log_path: Path | None = None
+
+    @property
+    def counts(self) -> dict[str, int]:
+        counts = {}
+        for result in self.results:
+            counts[result.status] = counts.get(result.status, 0) + 1
+        return counts
+
+    @property
+    def failed(self) -> list[TestResult]:
+        return [result for result in self.results if result.failed]
+
+    def summary(self) -> str:
+        """Formats the counts and the failures of the run for the model"""
+        lines = []
+        if self.results:
+            counts = ", ".join(f"{n} {status}" for status, n in self.counts.items())
+            lines.append(
+                f"Ran {len(self.results)} test(s) in {self.duration:.1f}s: {counts}."
+            )
+        else:
+            # the tests did not run, e.g. a syntax error, so the output is needed
+            output = strip_ansi(self.output).strip()
+            if len(output) > OUTPUT_HEAD_CHARS + OUTPUT_TAIL_CHARS:
+                skipped = len(output) - OUTPUT_HEAD_CHARS - OUTPUT_TAIL_CHARS
+                output = (
+                    f"{output[:OUTPUT_HEAD_CHARS]}\n... ({skipped} characters)\n"
+                    f"{output[-OUTPUT_TAIL_CHARS:]}"
+                )
+            lines.append(f"No test results were reported. Output:\n{output}")
+
+        for result in self.failed:
+            lines.append(
+                f"{result.status.upper()} {result.id} ({result.duration:.1f}s)"
+            )
+            if result.message:
+                message = strip_ansi(result.message).strip()
+                if len(message) > MESSAGE_CHARS:
+                    message = f"{message[: MESSAGE_CHARS - 3]}..."
+                lines.append(f"  {message}")
+            if result.stack:
+                lines.extend(f"    {line}" for line in result.stack.splitlines())
+            for artifact in result.artifacts:
+                lines.append(f"  artifact: {artifact}")
+
+        if self.log_path:
+            lines.append(f"Full log: {self.log_path}")
+        return "\n".join(lines)
+
+
+def get_runs_dir() -> Path:
+    runs_dir = get_state_dir() / "runs"
+    runs_dir.mkdir(parents=True, exist_ok=True)
+    return runs_dir
+
+
+def new_run_dir() -> Path:
+    """Creates the directory for the reports and log of a run, pruning old runs"""
+    runs_dir = get_runs_dir()
+    for old_run in sorted(runs_dir.iterdir())[: -KEPT_RUNS + 1]:
+        shutil.rmtree(old_run, ignore_errors=True)
+    run_dir = runs_dir / time.strftime("%Y%m%d-%H%M%S")
+    suffix = 1
+    while run_dir.exists():
+        run_dir = runs_dir / f"{time.strftime('%Y%m%d-%H%M%S')}-{suffix}"
+        suffix += 1
+    run_dir.mkdir()
+    return run_dir
+
+
+def parse_junit_xml(path: Path) -> list[TestResult]:
+    """Parses a JUnit XML report, as written by pytest and cypress"""
+    results = []
+    root = ET.parse(path).getroot()
+    # cypress writes a report per spec file, naming the file on its root suite
+    spec_file = next(
+        (suite.get("file") for suite in root.iter("testsuite") if suite.get("file")),
+        None,
+    )
+    for testcase in root.iter("testcase"):
+        classname = testcase.get("classname", "")
+        name = testcase.get("name", "")
+        result = TestResult(
+            id=f"{classname}::{name}" if classname else name,
+            status="passed",
+            duration=float(testcase.get("time") or 0),
+            file=testcase.get("file") or spec_file,
+        )
+        for tag in ["failure", "error", "skipped"]:
+            element = testcase.find(tag)
+            if element is None:
+                continue
+            result.status = {"failure": "failed"}.get(tag, tag)
+            result.message = element.get("message")
+            if tag != "skipped":
+                result.stack = trim_stack(element.text)
+            break
+        results.append(result)
+    return results
+
+
+def parse_playwright_json(path: Path) -> list[TestResult]:
+    """Parses the report of playwright's json reporter"""
+    with open(path, "r") as f:
+        report = json.load(f)
+
+    results = []
+
+    def visit(suite: dict, titles: list[str]):
+        for spec in suite.get("specs", []):
+            for test in spec.get("tests", []):
+                runs = test.get("results") or [{}]
+                last = runs[-1]
+                status = last.get("status", "skipped")
+                if status in ["timedOut", "interrupted"]:
+                    status = "failed"
+                error = last.get("error") or next(iter(last.get("errors") or []), {})
+                title = " › ".join([*titles, spec.get("title", "")])
+                test_id = f"{spec.get('file')}:{spec.get('line')} › {title}"
+                if test.get("projectName"):
+                    test_id = f"[{test['projectName']}] {test_id}"
+                results.append(
+                    TestResult(
+                        id=test_id,
+                        status=status,
+                        duration=last.get("duration", 0) / 1000,
+                        message=error.get("message"),
+                        stack=trim_stack(error.get("stack")),
+                        artifacts=[
+                            attachment["path"]
+                            for attachment in last.get("attachments", [])
+                            if attachment.get("path")
+                        ],
+                        file=spec.get("file"),
+                    )
+                )
+        for child in suite.get("suites", []):
+            visit(child, [*titles, child.get("title", "")])
+
+    for suite in report.get("suites", []):
+        # the top level suites are the spec files, which are part of the id
+        visit(suite, [])
+    return results
+
+
+def find_pytest_artifacts(result: TestResult, output_dirs: list[Path]) -> list[str]:
+    """Finds the screenshots, videos and traces pytest-playwright saved for a test
+
+    pytest-playwright names the output directory of a test after its node id.
+    """
+    module, _, name = result.id.rpartition("::")
+    module_slug = slugify(module.rpartition(".")[2])
+    name_slug = slugify(name)
+    artifacts = []
+    for output_dir in output_dirs:
+        if not output_dir.is_dir():
+            continue
+        for test_dir in output_dir.iterdir():
+            if test_dir.name.endswith(name_slug) and module_slug in test_dir.name:
+                artifacts.extend(str(path) for path in sorted(test_dir.iterdir()))
+    return artifacts
+
+
+def load_results(
+    framework: str,
+    run_dir: Path,
+    output: str,
+    duration: float,
+    artifact_dirs: list[Path] | None = None,
+) -> TestRun:
+    """Reads the reports a run wrote to run_dir and saves its full output there
+
+    :param framework: pytest, playwright or cypress
+    :type framework: str
+    :param run_dir: The directory of the run, see new_run_dir
+    :type run_dir: Path
+    :param output: The console output of the run
+    :type output: str
+    :param duration: The time the run took in seconds
+    :type duration: float
+    :param artifact_dirs: Where pytest-playwright saved the test artifacts
+    :type artifact_dirs: list[Path] | None, optional
+    """
+    log_path = run_dir / "output.log"
+    # streamed runs have already written their full output
+    if not log_path.exists():
+        log_path.write_text(strip_ansi(output))
+    run = TestRun(framework, duration=duration, output=output, log_path=log_path)
+
+    for report in sorted(run_dir.glob("*.xml")):
+        try:
+            run.results.extend(parse_junit_xml(report))
+        except ET.ParseError:
+            continue
+    for report in sorted(run_dir.glob("*.json")):
+        try:
+            run.results.extend(parse_playwright_json(report))
+        except (json.JSONDecodeError, KeyError):
+            continue
+
+    if framework == "pytest":
+        for result in run.failed:
+            result.artifacts = find_pytest_artifacts(result, artifact_dirs or [])
+    return run
@@ -0,0 +1,98 @@
+import hashlib
+import json
+import os
+import time
+from dataclasses import asdict
+from pathlib import Path
+from agent.config import get_state_dir
+from agent.logging import logger
+from agent.page_cache import normalize_url
+from agent.results import TestResult, TestRun
+from agent.selection import TestSelection
+
+
+def run_cache_key(
+    reporter: str, url: str, selection: TestSelection, full_run: bool = False
+) -> str:
+    """Builds the key of a test run from the contents of the test directory
+
+    :param reporter: pytest, playwright or cypress
+    :type reporter: str
+    :param url: The url of the app under test
+    :type url: str
+    :param selection: The selection of the run, which holds the file digests
+    :type selection: TestSelection
+    :param full_run: Whether every test file was requested, defaults to False
+    :type full_run: bool, optional
+    """
+    key = json.dumps(
+        {
+            "reporter": reporter,
+            "url": normalize_url(url) if url else "",
+            "full_run": full_run,
+            "specs": selection.digests,
+            "shared": selection.shared,
+        },
+        sort_keys=True,
+    )
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def run_to_dict(run: TestRun) -> dict:
+    data = asdict(run)
+    data["log_path"] = str(run.log_path) if run.log_path else None
+    return data
+
+
+def run_from_dict(data: dict) -> TestRun:
+    results = [TestResult(**result) for result in data.pop("results")]
+    log_path = Path(data.pop("log_path")) if data.get("log_path") else None
+    return TestRun(**data, results=results, log_path=log_path)
+
+
+class RunCache:
+    """Remembers the results of the last test runs, so a run of tests that did
+    not change returns the earlier results within the TTL instead of opening
+    the browsers again."""
+
+    def __init__(self, path: Path, ttl: float = 300):
+        self.path = Path(path)
+        self.ttl = ttl
+
+    def _load(self) -> dict:
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return {}
+
+    def get(self, key: str) -> tuple[TestRun, list[str], float] | None:
+        """Returns the run stored under key, its notes and when it finished"""
+        entry = self._load().get(key)
+        if entry is None:
+            return None
+        if time.time() - entry["time"] > self.ttl:
+            logger.debug(f"Run cache entry {key} has expired.")
+            return None
+        return run_from_dict(entry["run"]), entry["notes"], entry["time"]
+
+    def put(self, key: str, run: TestRun, notes: list[str]):
+        now = time.time()
+        entries = {
+            k: entry
+            for k, entry in self._load().items()
+            if now - entry["time"] <= self.ttl
+        }
+        entries[key] = {"time": now, "notes": notes, "run": run_to_dict(run)}
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(entries, f)
+        tmp_path.replace(self.path)
+
+
+def get_run_cache() -> RunCache | None:
+    """Returns the run cache configured for this session, or None if disabled"""
+    ttl = float(os.environ.get("AGENT_TEST_CACHE_TTL", 300))
+    if ttl <= 0:
+        return None
+    return RunCache(get_state_dir() / "run_cache.json", ttl=ttl)
@@ -0,0 +1,202 @@
+import hashlib
+import json
+import os
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from agent.config import get_state_dir
+from agent.page_cache import normalize_url
+from agent.results import TestResult, TestRun
+
+# the spec files of each reporter, other files are shared by every spec
+SPEC_PATTERNS = {
+    "pytest": r"^test_.*\.py$|_test\.py$",
+    "playwright": r"\.(spec|test)\.[cm]?[jt]sx?$",
+    "cypress": r"\.cy\.[cm]?[jt]sx?$",
+}
+# the sources and configuration shared by the specs, other files such as the
+# page dumps of debug runs do not change what the tests do
+SHARED_PATTERN = r"\.([cm]?[jt]sx?|py|json|ya?ml|toml|ini|cfg|env)$"
+# directories holding dependencies and the output of runs, not tests
+IGNORED_DIRS = [
+    "node_modules",
+    "__pycache__",
+    "test-results",
+    "playwright-report",
+    "blob-report",
+    "screenshots",
+    "videos",
+    "downloads",
+]
+
+
+@dataclass
+class TestSelection:
+    """The spec files to run, relative to the test directory
+
+    A full run runs the whole test directory rather than the listed specs.
+    """
+
+    __test__ = False
+
+    specs: list[str] = field(default_factory=list)
+    full_run: bool = True
+    total: int = 0
+    # the digests the selection was made from, recorded once the specs ran
+    digests: dict[str, str] = field(default_factory=dict)
+    shared: str = ""
+    url: str = ""
+
+    def describe(self) -> str | None:
+        if self.full_run:
+            return None
+        skipped = self.total - len(self.specs)
+        return (
+            f"Ran {len(self.specs)} of {self.total} test file(s), the new, changed "
+            f"and previously failing ones. The other {skipped} passed in an earlier "
+            "run and did not change."
+        )
+
+
+def file_digest(path: Path) -> str:
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+def scan_test_files(test_dir: Path, reporter: str) -> tuple[dict[str, str], str]:
+    """Hashes the spec files of a test directory, and its other sources together
+
+    :return: The digest of each spec file by its path relative to test_dir, and
+        the digest of the configuration, fixtures and helpers
+    :rtype: tuple[dict[str, str], str]
+    """
+    pattern = re.compile(SPEC_PATTERNS[reporter])
+    shared_pattern = re.compile(SHARED_PATTERN)
+    specs = {}
+    shared = hashlib.sha256()
+    for root, dirs, files in os.walk(test_dir):
+        dirs[:] = sorted(
+            d for d in dirs if d not in IGNORED_DIRS and not d.startswith(".")
+        )
+        for name in sorted(files):
+            path = Path(root) / name
+            relative = path.relative_to(test_dir).as_posix()
+            digest = file_digest(path)
+            if pattern.search(name):
+                specs[relative] = digest
+            elif shared_pattern.search(name):
+                shared.update(f"{relative}\0{digest}\0".encode())
+    return specs, shared.hexdigest()
+
+
+def get_selection_path() -> Path:
+    return get_state_dir() / "test_selection.json"
+
+
+def load_state(test_dir: Path, reporter: str, url: str = "") -> dict | None:
+    """Loads the state of the last run, if it ran the same test directory
+    against the same url"""
+    try:
+        with open(get_selection_path(), "r") as f:
+            state = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+    if (
+        state.get("test_dir") != str(test_dir)
+        or state.get("reporter") != reporter
+        or state.get("url", "") != url
+    ):
+        return None
+    return state
+
+
+def select_specs(
+    test_dir: Path, reporter: str, url: str = "", full_run: bool = False
+) -> TestSelection:
+    """Selects the spec files that are new, changed or failed in the last run
+
+    Everything runs if there is no earlier run to compare with, the url of the
+    app changed, or a file other than a spec changed, e.g. the configuration or
+    a fixture.
+    """
+    url = normalize_url(url) if url else ""
+    specs, shared = scan_test_files(test_dir, reporter)
+    state = load_state(test_dir, reporter, url)
+    if full_run or state is None or state.get("shared") != shared:
+        return TestSelection(sorted(specs), True, len(specs), specs, shared, url)
+
+    previous = state.get("specs", {})
+    selected = [
+        spec
+        for spec, digest in sorted(specs.items())
+        if spec not in previous
+        or previous[spec]["digest"] != digest
+        or not previous[spec]["passed"]
+    ]
+    return TestSelection(selected, False, len(specs), specs, shared, url)
+
+
+def pytest_module_matches(module: str, spec: str) -> bool:
+    """Checks if a pytest module name, as in a junit classname, is the spec file
+
+    The module name depends on the root directory of the run, so it is matched
+    against the end of the spec's path, e.g. tests.test_login or
+    playwright.tests.test_login.TestLogin for tests/test_login.py.
+    """
+    spec_parts = spec.removesuffix(".py").split("/")
+    parts = module.split(".")
+    for end in range(1, len(parts) + 1):
+        if parts[end - 1] != spec_parts[-1]:
+            continue
+        prefix = parts[:end]
+        shorter, longer = sorted([prefix, spec_parts], key=len)
+        if longer[-len(shorter) :] == shorter:
+            return True
+    return False
+
+
+def result_spec(result: TestResult, specs: list[str]) -> str | None:
+    """Finds the spec file a test result belongs to"""
+    for spec in specs:
+        if result.file:
+            file = result.file.replace("\\", "/").removeprefix("./")
+            if spec == file or spec.endswith(f"/{file}") or file.endswith(f"/{spec}"):
+                return spec
+        elif pytest_module_matches(result.id.partition("::")[0], spec):
+            return spec
+    return None
+
+
+def record_run(test_dir: Path, reporter: str, selection: TestSelection, run: TestRun):
+    """Saves the digest of each spec that ran and whether all its tests passed
+
+    Specs that ran without reporting any results, e.g. because of a syntax
+    error or a run that was killed, are treated as failing.
+    """
+    state = load_state(test_dir, reporter, selection.url) or {}
+    previous = state.get("specs", {}) if not selection.full_run else {}
+
+    passed = {}
+    for result in run.results:
+        spec = result_spec(result, selection.specs)
+        if spec is not None:
+            passed[spec] = passed.get(spec, True) and not result.failed
+
+    recorded = {}
+    for spec, digest in selection.digests.items():
+        if spec in selection.specs:
+            recorded[spec] = {"digest": digest, "passed": passed.get(spec, False)}
+        elif spec in previous:
+            recorded[spec] = previous[spec]
+
+    with open(get_selection_path(), "w") as f:
+        json.dump(
+            {
+                "test_dir": str(test_dir),
+                "reporter": reporter,
+                "url": selection.url,
+                "shared": selection.shared,
+                "specs": recorded,
+            },
+            f,
+        )
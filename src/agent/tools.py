@@ -1,22 +1,46 @@
 import os
+import time
 import typer
-from playwright.sync_api import sync_playwright
+from agent.browser import (
+    LOCATOR_KINDS,
+    accessibility_snapshot,
+    check_locators,
+    get_browser_manager,
+    load_snapshot,
+)
+from agent.cleaning import clean_html
 from agent.config import get_test_dir
-from agent.rich import print_in_panel, print_in_question_panel
+from agent.crawler import (
+    crawl,
+    format_page,
+    format_site_map,
+    load_site_index,
+    query_index,
+    save_site_index,
+)
+from agent.distill import distill_html
+from agent.page_cache import cache_key, get_page_cache, normalize_url
+from agent.results import load_results, new_run_dir
+from agent.rich import print_in_question_panel
+from agent.run_cache import get_run_cache, run_cache_key
+from agent.selection import record_run, select_specs
 from agent.utils import (
+    PYTEST_OUTPUT_DIR,
+    get_test_workers,
     run_cypress,
     run_playwright,
     run_pytest_playwright,
     strip_code_fences,
+    truncate,
 )
 from agent.logging import logger
 from typing import TypedDict
-from bs4 import BeautifulSoup
 
 
 # TODO: Consider adding pydantic for additional data validation
 class TExtractWebpageContent(TypedDict):
     url: str
+    mode: str
 
 
 def extract_webpage_content(**kwargs: TExtractWebpageContent) -> str | None:
@@ -24,45 +48,336 @@ def extract_webpage_content(**kwargs: TExtractWebpageContent) -> str | None:
     if not url:
         return logger.error("No URL provided to extract webpage content from.")
 
+    mode = kwargs.get("mode") or os.environ.get("AGENT_PAGE_MODE", "html")
+
     logger.info(f"Extracting webpage content from {url}")
-    content = None
-    with sync_playwright() as p:
-        logger.info("Launching browser")
-        browser = p.chromium.launch(
-            headless=os.environ.get("HEADLESS", False) == "true"
+    browser = get_browser_manager()
+    page_cache = get_page_cache()
+    key = cache_key(url, viewport=browser.viewport, auth_state=browser.auth_state)
+
+    content = page_cache.get(key) if page_cache else None
+    if content is not None:
+        logger.info(f"Using cached content for {url}")
+    else:
+
+        async def get_page_content(page):
+            logger.info(f"Visiting {url}")
+            await browser.goto(page, url, wait_until="domcontentloaded")
+            logger.info("Page loaded! Extracting content.")
+            return await page.content()
+
+        content = browser.run(get_page_content)
+        if page_cache:
+            page_cache.put(key, content)
+
+    if mode == "elements":
+        content = distill_html(
+            content, max_chars=int(os.environ.get("AGENT_DISTILL_MAX_CHARS", 8000))
         )
-        page = browser.new_page()
-        logger.info(f"Visiting {url}")
-        page.goto(url)
-        logger.info("Waiting for page load state to be domcontentloaded")
-        page.wait_for_load_state("domcontentloaded")
-        logger.info("Page loaded! Extracting content.")
-        content = page.content()
-
-        # use beautiful soup to extract the body only
-        soup = BeautifulSoup(content, "html.parser")
-        # delete the head tag
-        soup.head.extract()
-        # delete the script tags
-        for script in soup.find_all("script"):
-            script.extract()
-
-        content = str(soup)
-
-        page_file_name = f"{url.replace('https://', '').replace('http://', '').replace('/', '_')}.html"
-
-        if os.environ.get("LOG_LEVEL", "INFO") == "DEBUG":
-            logger.info(f"Writing content to {page_file_name}")
-            test_dir = get_test_dir()
-            with open(test_dir / page_file_name, "w+") as f:
-                f.write(content)
-
-        logger.info("Closing browser")
-        browser.close()
+    else:
+        content = clean_html(content)
+
+    extension = "txt" if mode == "elements" else "html"
+    page_file_name = f"{url.replace('https://', '').replace('http://', '').replace('/', '_')}.{extension}"
+
+    if os.environ.get("LOG_LEVEL", "INFO") == "DEBUG":
+        logger.info(f"Writing content to {page_file_name}")
+        test_dir = get_test_dir()
+        with open(test_dir / page_file_name, "w+") as f:
+            f.write(content)
 
     return content
 
 
+class TGetAccessibilityTree(TypedDict):
+    url: str
+    max_depth: int
+    root_selector: str
+
+
+def get_accessibility_tree(**kwargs: TGetAccessibilityTree) -> str:
+    url = kwargs.get("url", None)
+    if not url:
+        return "No URL provided to get the accessibility tree from."
+
+    max_depth = kwargs.get("max_depth", None)
+    root_selector = kwargs.get("root_selector", None)
+
+    logger.info(f"Getting the accessibility tree of {url}")
+    browser = get_browser_manager()
+
+    async def get_tree(page):
+        await browser.goto(page, url, wait_until="domcontentloaded")
+        return await accessibility_snapshot(page, root_selector, max_depth)
+
+    return browser.run(get_tree)
+
+
+class TCrawlSite(TypedDict):
+    url: str
+    max_depth: int
+
+
+def crawl_site(**kwargs: TCrawlSite) -> str:
+    url = kwargs.get("url", None) or os.environ.get("AGENT_URL", None)
+    if not url:
+        return "No URL provided to start crawling from."
+
+    max_depth = kwargs.get("max_depth", None)
+    if max_depth is None:
+        max_depth = int(os.environ.get("AGENT_CRAWL_MAX_DEPTH", 2))
+
+    logger.info(f"Crawling {url} to a depth of {max_depth}")
+    browser = get_browser_manager()
+    index = browser.run_async(
+        lambda: crawl(
+            browser,
+            url,
+            max_depth=max_depth,
+            max_pages=int(os.environ.get("AGENT_CRAWL_MAX_PAGES", 50)),
+            concurrency=int(os.environ.get("AGENT_CRAWL_CONCURRENCY", 4)),
+            page_cache=get_page_cache(),
+        )
+    )
+    save_site_index(index)
+    logger.info(f"Indexed {len(index['pages'])} page(s)")
+
+    return format_site_map(index)
+
+
+class TQuerySiteIndex(TypedDict):
+    query: str
+    url: str
+
+
+def query_site_index(**kwargs: TQuerySiteIndex) -> str:
+    query = kwargs.get("query", None)
+    url = kwargs.get("url", None)
+
+    index = load_site_index()
+    if index is None:
+        return "The site has not been indexed yet. Use the crawl_site tool first."
+
+    if url:
+        page = index["pages"].get(normalize_url(url))
+        if page is None:
+            return f"{url} is not in the site index."
+        return format_page(page)
+
+    if query:
+        return query_index(index, query)
+
+    return format_site_map(index)
+
+
+def run_in_session(fn, fresh: bool = False) -> str:
+    """Runs an async callable with the persistent browser session page
+
+    Errors (e.g. a selector timing out) are returned to the model as text so
+    that it can try something else.
+    """
+    browser = get_browser_manager()
+
+    async def with_session_page():
+        page = await browser.session_page(fresh=fresh)
+        return await fn(page)
+
+    try:
+        return browser.run_async(with_session_page)
+    except Exception as e:
+        logger.error(f"Browser session error: {e}")
+        return f"Browser session error: {e}"
+
+
+async def describe_session_page(page) -> str:
+    return f"The page is now at {page.url} (title: {await page.title()})."
+
+
+class TBrowserOpen(TypedDict):
+    url: str
+
+
+def browser_open(**kwargs: TBrowserOpen) -> str:
+    url = kwargs.get("url", None) or os.environ.get("AGENT_URL", None)
+    if not url:
+        return "No URL provided to open."
+
+    logger.info(f"Opening a browser session at {url}")
+    browser = get_browser_manager()
+
+    async def open_session(page):
+        await browser.goto(page, url, wait_until="domcontentloaded")
+        return f"Opened a new browser session. {await describe_session_page(page)}"
+
+    return run_in_session(open_session, fresh=True)
+
+
+class TBrowserGoto(TypedDict):
+    url: str
+
+
+def browser_goto(**kwargs: TBrowserGoto) -> str:
+    url = kwargs.get("url", None)
+    if not url:
+        return "No URL provided to navigate to."
+
+    browser = get_browser_manager()
+
+    async def goto(page):
+        await browser.goto(page, url, wait_until="domcontentloaded")
+        return await describe_session_page(page)
+
+    return run_in_session(goto)
+
+
+class TBrowserClick(TypedDict):
+    selector: str
+
+
+def browser_click(**kwargs: TBrowserClick) -> str:
+    selector = kwargs.get("selector", None)
+    if not selector:
+        return "No selector provided to click."
+
+    async def click(page):
+        await page.locator(selector).click()
+        await page.wait_for_load_state("domcontentloaded")
+        return f"Clicked {selector}. {await describe_session_page(page)}"
+
+    return run_in_session(click)
+
+
+class TBrowserFill(TypedDict):
+    selector: str
+    value: str
+
+
+def browser_fill(**kwargs: TBrowserFill) -> str:
+    selector = kwargs.get("selector", None)
+    value = kwargs.get("value", "")
+    if not selector:
+        return "No selector provided to fill."
+
+    async def fill(page):
+        await page.locator(selector).fill(value)
+        return f"Filled {selector}. {await describe_session_page(page)}"
+
+    return run_in_session(fill)
+
+
+class TBrowserQuery(TypedDict):
+    selector: str
+
+
+def browser_query(**kwargs: TBrowserQuery) -> str:
+    selector = kwargs.get("selector", None)
+    if not selector:
+        return "No selector provided to query."
+
+    async def query(page):
+        locator = page.locator(selector)
+        count = await locator.count()
+        lines = [f"{selector} matches {count} element(s) on {page.url}."]
+        for index in range(min(count, 5)):
+            match = locator.nth(index)
+            visible = await match.is_visible()
+            outer_html = await match.evaluate("element => element.outerHTML")
+            lines.append(
+                f"- [{index}] visible={visible} html={truncate(outer_html, 300)}"
+            )
+        return "\n".join(lines)
+
+    return run_in_session(query)
+
+
+class TBrowserSnapshot(TypedDict):
+    mode: str
+
+
+def browser_snapshot(**kwargs: TBrowserSnapshot) -> str:
+    mode = kwargs.get("mode", None) or "elements"
+
+    async def snapshot(page):
+        if mode == "accessibility":
+            content = await accessibility_snapshot(page)
+        elif mode == "html":
+            content = clean_html(await page.content())
+        else:
+            content = distill_html(
+                await page.content(),
+                max_chars=int(os.environ.get("AGENT_DISTILL_MAX_CHARS", 8000)),
+            )
+        return f"{await describe_session_page(page)}\n{content}"
+
+    return run_in_session(snapshot)
+
+
+class TLocator(TypedDict):
+    kind: str
+    value: str
+    name: str
+
+
+class TVerifyLocators(TypedDict):
+    locators: list[TLocator]
+    url: str
+    live: bool
+
+
+def format_locator_result(result: dict) -> str:
+    name = f" name={result['name']!r}" if result.get("name") else ""
+    line = f"- {result.get('kind', 'css')} {result['value']!r}{name}: "
+    if result.get("error"):
+        return f"{line}error: {result['error']}"
+    line = f"{line}{result['count']} match(es), first visible={result['visible']}"
+    if result["html"]:
+        line = f"{line}, first html={truncate(result['html'], 200)}"
+    return line
+
+
+def verify_locators(**kwargs: TVerifyLocators) -> str:
+    locators = kwargs.get("locators", None)
+    url = kwargs.get("url", None)
+    live = kwargs.get("live", False)
+
+    if not locators:
+        return "No locators provided to verify."
+
+    browser = get_browser_manager()
+
+    # without a url, check the page the browser session is currently on
+    if not url:
+
+        async def check_session(page):
+            results = await check_locators(page, locators)
+            return f"Checked against the browser session page {page.url}:", results
+
+        output = run_in_session(check_session)
+        if isinstance(output, str):
+            return output
+        heading, results = output
+    else:
+        page_cache = get_page_cache()
+        key = cache_key(url, viewport=browser.viewport, auth_state=browser.auth_state)
+        html = page_cache.get(key) if page_cache and not live else None
+
+        async def check_page(page):
+            if html is not None:
+                await load_snapshot(page, url, html)
+            else:
+                await browser.goto(page, url, wait_until="domcontentloaded")
+                if page_cache:
+                    page_cache.put(key, await page.content())
+            return await check_locators(page, locators)
+
+        logger.info(f"Verifying {len(locators)} locator(s) on {url}")
+        results = browser.run(check_page)
+        source = "a cached snapshot of" if html is not None else "the live page"
+        heading = f"Checked against {source} {url}:"
+
+    return "\n".join([heading, *map(format_locator_result, results)])
+
+
 class TWriteCodeToFile(TypedDict):
     code: str
     file_name: str
@@ -125,7 +440,12 @@ def write_code_to_file(**kwargs: TWriteCodeToFile):
         return f"Code written to {file_name}"
 
 
-def run_tests():
+class TRunTests(TypedDict):
+    full_run: bool
+    force: bool
+
+
+def run_tests(**kwargs: TRunTests):
     # ensure the tests directory exists
     test_dir = get_test_dir()
     test_dir.mkdir(exist_ok=True)
@@ -134,32 +454,94 @@ def run_tests():
     # get the language and framework from the environment
     language = os.environ.get("AGENT_LANGUAGE", "python")
     framework = os.environ.get("AGENT_FRAMEWORK", "playwright")
+
     if language == "python" and framework == "playwright":
-        # run the tests and capture the output
-        output = run_pytest_playwright(test_dir)
-        # print output in a panel
-        print_in_panel(output, "Test Output")
-        return output
-
-    elif language == "typescript" and framework == "playwright":
-        output = run_playwright(test_dir / "tests")
-        print_in_panel(output, "Test Output")
-        return output
-    elif language == "javascript" and framework == "playwright":
-        output = run_playwright(test_dir / "tests")
-        print_in_panel(output, "Test Output")
-        return output
-    elif language == "typescript" and framework == "cypress":
-        output = run_cypress(test_dir, config_file_name="cypress.config.ts")
-        print_in_panel(output, "Test Output")
-        return output
-    elif language == "javascript" and framework == "cypress":
-        output = run_cypress(test_dir, config_file_name="cypress.config.js")
-        print_in_panel(output, "Test Output")
-        return output
+        reporter = "pytest"
+    elif language in ["typescript", "javascript"] and framework in [
+        "playwright",
+        "cypress",
+    ]:
+        reporter = framework
     else:
         return "Not possible to run tests."
 
+    # only the spec files that are new, changed or failed in the last run are
+    # run, unless a full run is requested. Forcing a run implies a full run, so
+    # it is not skipped when every test passed before.
+    force = kwargs.get("force", False)
+    full_run = (
+        kwargs.get("full_run", False)
+        or force
+        or os.environ.get("AGENT_TEST_SELECTION", "true") != "true"
+    )
+    url = os.environ.get("AGENT_URL", "")
+    selection = select_specs(test_dir, reporter, url=url, full_run=full_run)
+    if not selection.full_run and not selection.total:
+        return f"No test files found in {test_dir}."
+    if not selection.full_run and not selection.specs:
+        return (
+            f"All {selection.total} test file(s) passed in an earlier run and did "
+            "not change. Call run_tests with full_run to run them again."
+        )
+
+    # the results of an identical run are returned while they are fresh
+    run_cache = get_run_cache()
+    key = run_cache_key(reporter, url, selection, full_run=full_run)
+    cached = run_cache.get(key) if run_cache and not force else None
+    if cached:
+        run, notes, finished = cached
+        logger.info("The tests did not change, returning the cached results.")
+        cached_note = (
+            f"Cached results of a run {time.time() - finished:.0f}s ago, the tests "
+            "and the URL did not change since. Call run_tests with force to run "
+            "them again."
+        )
+        return "\n".join([cached_note, *notes, run.summary()])
+
+    if not selection.full_run:
+        logger.info(
+            f"Running {len(selection.specs)} of {selection.total} test file(s)."
+        )
+    # pytest and cypress are given the spec files to spread across processes,
+    # playwright spreads the tests across its own workers
+    workers = get_test_workers()
+    specs = None
+    if not selection.full_run or (workers > 1 and reporter != "playwright"):
+        specs = [test_dir / spec for spec in selection.specs]
+
+    # the reports and the full output of the run are kept in the run directory,
+    # only a summary of the results is returned
+    run_dir = new_run_dir()
+    start = time.perf_counter()
+    # the output of the runners is shown as it is printed
+    if reporter == "pytest":
+        process = run_pytest_playwright(test_dir, run_dir, specs, workers)
+    elif reporter == "playwright":
+        process = run_playwright(test_dir / "tests", run_dir, specs, workers)
+    else:
+        config_file_name = (
+            "cypress.config.ts" if language == "typescript" else "cypress.config.js"
+        )
+        process = run_cypress(test_dir, config_file_name, run_dir, specs, workers)
+
+    run = load_results(
+        reporter,
+        run_dir,
+        process.output,
+        duration=time.perf_counter() - start,
+        artifact_dirs=[
+            PYTEST_OUTPUT_DIR,
+            *sorted(PYTEST_OUTPUT_DIR.glob("shard-*")),
+            test_dir / "test-results",
+        ],
+    )
+    record_run(test_dir, reporter, selection, run)
+    notes = [note for note in [process.note, selection.describe()] if note]
+    # runs that were killed or crashed are not worth repeating
+    if run_cache and run.results and not process.note:
+        run_cache.put(key, run, notes)
+    return "\n".join([*notes, run.summary()])
+
 
 class TGetUserInput(TypedDict):
     question: str
@@ -217,7 +599,21 @@ tools = [
         "type": "function",
         "function": {
             "name": "run_tests",
-            "description": f"Runs the written tests in the '{get_test_dir()}' folder. Call this whenever you need to validate if the tests are working as expected.",
+            "description": f"Runs the written tests in the '{get_test_dir()}' folder. Call this whenever you need to validate if the tests are working as expected. Only the test files that are new, changed or failed in the last run are run, unless full_run is set.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "full_run": {
+                        "type": "boolean",
+                        "description": "Run every test file, e.g. to check the whole suite passes before finishing.",
+                    },
+                    "force": {
+                        "type": "boolean",
+                        "description": "Run every test file even if the tests and the URL did not change since an earlier run, instead of returning its cached results.",
+                    },
+                },
+                "additionalProperties": False,
+            },
         },
     },
     {
@@ -246,7 +642,7 @@ tools = [
         "type": "function",
         "function": {
             "name": "extract_webpage_content",
-            "description": "Extracts the content of a webpage.",
+            "description": "Extracts the content of a webpage. Use the 'elements' mode to get a compact list of the inputs, buttons, links, forms, labels and headings on the page with suggested locators, or the 'html' mode to get the full body html.",
             "parameters": {
                 "type": "object",
                 "properties": {
@@ -254,12 +650,241 @@ tools = [
                         "type": "string",
                         "description": "The URL of the webpage to extract content from.",
                     },
+                    "mode": {
+                        "type": "string",
+                        "enum": ["elements", "html"],
+                        "description": "Whether to return a compact list of interactive elements or the full body html.",
+                    },
                 },
                 "required": ["url"],
                 "additionalProperties": False,
             },
         },
     },
+    {
+        "type": "function",
+        "function": {
+            "name": "get_accessibility_tree",
+            "description": "Gets the accessibility tree of a webpage as an indented list of roles and accessible names. This is much smaller than the page html and is the best source for role, label and text based locators.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "url": {
+                        "type": "string",
+                        "description": "The URL of the webpage to get the accessibility tree of.",
+                    },
+                    "max_depth": {
+                        "type": "integer",
+                        "description": "The number of levels of the tree to include. Omit to include the whole tree.",
+                    },
+                    "root_selector": {
+                        "type": "string",
+                        "description": "A selector for the element to use as the root of the tree, e.g. 'form#signup'. Omit to use the page body.",
+                    },
+                },
+                "required": ["url"],
+                "additionalProperties": False,
+            },
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "crawl_site",
+            "description": "Crawls the app from its entry point and stores an index of every page's forms, inputs, buttons and links. Returns a site map. Use this once instead of extracting pages one at a time, then use query_site_index to look up pages and elements.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "url": {
+                        "type": "string",
+                        "description": "The URL to start crawling from. Omit to use the app entry point.",
+                    },
+                    "max_depth": {
+                        "type": "integer",
+                        "description": "How many links deep to follow from the start URL.",
+                    },
+                },
+                "additionalProperties": False,
+            },
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "query_site_index",
+            "description": "Queries the index built by crawl_site. Pass a url to get that page's forms, inputs, buttons, links and suggested locators, a query to search page urls, titles, headings, elements and links, or nothing to get the site map.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "query": {
+                        "type": "string",
+                        "description": "A search term, e.g. 'password' or 'settings'.",
+                    },
+                    "url": {
+                        "type": "string",
+                        "description": "The URL of an indexed page.",
+                    },
+                },
+                "additionalProperties": False,
+            },
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "browser_open",
+            "description": "Opens a persistent browser session at a URL with a clean browser state. The session page stays open between tool calls, so you can use the other browser_ tools to try out interactions and selectors in milliseconds instead of writing and running a test.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "url": {
+                        "type": "string",
+                        "description": "The URL to open. Omit to use the app entry point.",
+                    },
+                },
+                "additionalProperties": False,
+            },
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "browser_goto",
+            "description": "Navigates the browser session page to a URL, keeping cookies and other state.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "url": {
+                        "type": "string",
+                        "description": "The URL to navigate to.",
+                    },
+                },
+                "required": ["url"],
+                "additionalProperties": False,
+            },
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "browser_click",
+            "description": "Clicks the element matching a playwright selector on the browser session page.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "selector": {
+                        "type": "string",
+                        "description": "A playwright selector, e.g. '#submit', 'text=Sign in' or 'role=button[name=\"Save\"]'.",
+                    },
+                },
+                "required": ["selector"],
+                "additionalProperties": False,
+            },
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "browser_fill",
+            "description": "Fills the input matching a playwright selector on the browser session page.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "selector": {
+                        "type": "string",
+                        "description": "A playwright selector, e.g. '#email' or '[placeholder=\"Email\"]'.",
+                    },
+                    "value": {
+                        "type": "string",
+                        "description": "The value to fill the input with.",
+                    },
+                },
+                "required": ["selector", "value"],
+                "additionalProperties": False,
+            },
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "browser_query",
+            "description": "Counts the elements matching a playwright selector on the browser session page and returns their visibility and html.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "selector": {
+                        "type": "string",
+                        "description": "A playwright selector.",
+                    },
+                },
+                "required": ["selector"],
+                "additionalProperties": False,
+            },
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "browser_snapshot",
+            "description": "Returns the current state of the browser session page.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "mode": {
+                        "type": "string",
+                        "enum": ["elements", "accessibility", "html"],
+                        "description": "A compact list of interactive elements (default), the accessibility tree or the body html.",
+                    },
+                },
+                "additionalProperties": False,
+            },
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "verify_locators",
+            "description": "Checks a batch of locators against a page in one call, reporting how many elements each one matches, whether the first match is visible and its html. Use this before running the tests to make sure every locator resolves to exactly one element. Without a url the locators are checked against the browser session page.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "locators": {
+                        "type": "array",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "kind": {
+                                    "type": "string",
+                                    "enum": LOCATOR_KINDS,
+                                    "description": "css takes any playwright selector. The other kinds match the playwright get_by_* methods.",
+                                },
+                                "value": {
+                                    "type": "string",
+                                    "description": "The selector, text, placeholder, label, role or test id.",
+                                },
+                                "name": {
+                                    "type": "string",
+                                    "description": "The accessible name, for role locators only.",
+                                },
+                            },
+                            "required": ["kind", "value"],
+                            "additionalProperties": False,
+                        },
+                    },
+                    "url": {
+                        "type": "string",
+                        "description": "The URL of the page to check. Omit to use the browser session page.",
+                    },
+                    "live": {
+                        "type": "boolean",
+                        "description": "Load the page live instead of using a cached snapshot.",
+                    },
+                },
+                "required": ["locators"],
+                "additionalProperties": False,
+            },
+        },
+    },
     {
         "type": "function",
         "function": {
@@ -0,0 +1,167 @@
+import io
+import json
+import zipfile
+from dataclasses import dataclass, field
+from pathlib import Path
+from agent.distill import normalize_text
+
+# the screencast frames read around the failing action
+TRACE_FRAMES = 3
+# the actions listed before the failing action
+TRACE_ACTIONS = 15
+TRACE_LOG_LINES = 10
+
+
+@dataclass
+class TraceAction:
+    call_id: str
+    api_name: str
+    start_time: float
+    end_time: float | None = None
+    selector: str | None = None
+    error: str | None = None
+    log: list[str] = field(default_factory=list)
+
+    def format(self) -> str:
+        line = self.api_name
+        if self.selector:
+            line = f"{line}({self.selector})"
+        if self.end_time is not None:
+            line = f"{line} {self.end_time - self.start_time:.0f}ms"
+        if self.error:
+            line = f"{line} FAILED: {normalize_text(self.error, 300)}"
+        return line
+
+
+@dataclass
+class TraceDigest:
+    """The parts of a playwright trace that explain why a test failed"""
+
+    path: Path
+    actions: list[TraceAction] = field(default_factory=list)
+    console_errors: list[str] = field(default_factory=list)
+    errors: list[str] = field(default_factory=list)
+    frames: list[tuple[float, bytes]] = field(default_factory=list)
+
+    @property
+    def failing_action(self) -> TraceAction | None:
+        return next((action for action in self.actions if action.error), None)
+
+    @property
+    def failed(self) -> bool:
+        """Whether an action failed or the page raised an error"""
+        return self.failing_action is not None or bool(self.errors)
+
+    def format(self) -> str:
+        lines = [f"Trace {self.path}:"]
+        failing = self.failing_action
+        actions = self.actions
+        if failing:
+            index = actions.index(failing)
+            actions = actions[max(0, index - TRACE_ACTIONS) : index + 1]
+        else:
+            actions = actions[-TRACE_ACTIONS:]
+
+        if actions:
+            lines.append("Actions:")
+            lines.extend(f"- {action.format()}" for action in actions)
+        if failing and failing.log:
+            lines.append(f"Log of {failing.api_name}:")
+            lines.extend(f"  {line}" for line in failing.log[-TRACE_LOG_LINES:])
+        for title, messages in [
+            ("Errors", self.errors),
+            ("Console errors", self.console_errors),
+        ]:
+            if messages:
+                lines.append(f"{title}:")
+                lines.extend(
+                    f"- {normalize_text(message, 300)}" for message in messages
+                )
+        return "\n".join(lines)
+
+
+def iter_events(archive: zipfile.ZipFile):
+    """Streams the events of every trace file in the archive"""
+    for name in archive.namelist():
+        if not name.endswith(".trace"):
+            continue
+        with archive.open(name) as f:
+            for line in io.TextIOWrapper(f, encoding="utf-8"):
+                if not line.strip():
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+
+
+def error_message(error) -> str:
+    if isinstance(error, dict):
+        if "error" in error:
+            return error_message(error["error"])
+        return str(error.get("message") or error.get("name") or error)
+    return str(error)
+
+
+def read_trace(path: Path, frames: int = TRACE_FRAMES) -> TraceDigest | None:
+    """Reads the failing action, action log, errors and screencast frames of a trace
+
+    The trace event log is streamed from the zip file, and only the screencast
+    frames closest to the failing action (or the end of the trace if no action
+    failed) are read. Returns None if the file is not a playwright trace.
+
+    :param path: The path of the trace.zip file
+    :type path: Path
+    :param frames: The number of screencast frames to read, defaults to 3
+    :type frames: int, optional
+    """
+    digest = TraceDigest(path=Path(path))
+    actions: dict[str, TraceAction] = {}
+    screencast: list[tuple[float, str]] = []
+
+    with zipfile.ZipFile(path) as archive:
+        if not any(name.endswith(".trace") for name in archive.namelist()):
+            return None
+
+        for event in iter_events(archive):
+            kind = event.get("type")
+            if kind == "before":
+                params = event.get("params") or {}
+                actions[event["callId"]] = TraceAction(
+                    call_id=event["callId"],
+                    api_name=event.get("apiName")
+                    or f"{event.get('class', '')}.{event.get('method', '')}",
+                    start_time=event.get("startTime", 0),
+                    selector=params.get("selector") or params.get("url"),
+                )
+            elif kind == "after" and event.get("callId") in actions:
+                action = actions[event["callId"]]
+                action.end_time = event.get("endTime")
+                if event.get("error"):
+                    action.error = error_message(event["error"])
+            elif kind == "log" and event.get("callId") in actions:
+                actions[event["callId"]].log.append(event.get("message", ""))
+            elif kind == "console" and event.get("messageType") == "error":
+                digest.console_errors.append(event.get("text", ""))
+            elif kind == "event" and event.get("method") == "pageError":
+                digest.errors.append(error_message(event.get("params", {})))
+            elif kind == "error":
+                digest.errors.append(error_message(event))
+            elif kind == "screencast-frame":
+                screencast.append((event.get("timestamp", 0), event["sha1"]))
+
+        digest.actions = sorted(actions.values(), key=lambda a: a.start_time)
+
+        failing = digest.failing_action
+        if failing:
+            moment = failing.end_time or failing.start_time
+        else:
+            moment = max((timestamp for timestamp, _ in screencast), default=0)
+        closest = sorted(screencast, key=lambda frame: abs(frame[0] - moment))
+        for timestamp, sha1 in sorted(closest[:frames]):
+            try:
+                digest.frames.append((timestamp, archive.read(f"resources/{sha1}")))
+            except KeyError:
+                continue
+
+    return digest
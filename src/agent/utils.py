@@ -1,14 +1,34 @@
 import io
-import base64
+import math
 import os
-import pytest
-import pytest_playwright
+import re
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from contextlib import redirect_stdout
+from PIL import Image
+from agent.artifacts import (
+    ArtifactIndex,
+    ArtifactStore,
+    get_artifact_index,
+    get_artifact_store,
+)
 from agent.config import get_test_dir
+from agent.imaging import ImageStats, prepare, prepare_image
 from agent.logging import logger
-from agent.video import extract_frames, keep_unique_images
-import subprocess
+from agent.process import (
+    ProcessResult,
+    get_timeout,
+    merge_results,
+    read_output,
+    run_streaming,
+)
+from agent.pytest_worker import get_pytest_worker
+from agent.trace import read_trace
+from agent.video import build_contact_sheets, extract_all_frames, keep_unique_images
+
+# where pytest-playwright saves the screenshots, videos and traces of the tests
+PYTEST_OUTPUT_DIR = Path("test-results")
 
 
 def strip_code_fences(code):
@@ -27,62 +47,147 @@ def strip_code_fences(code):
     return code
 
 
-def run_pytest_playwright(test_dir: Path) -> str:
-    # Create a StringIO buffer to capture the output
-    buffer = io.StringIO()
+def truncate(text: str, limit: int) -> str:
+    """Shortens text to at most limit characters, marking where it was cut"""
+    if len(text) <= limit:
+        return text
+    return f"{text[: limit - 3]}..."
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimates the number of tokens in a piece of text without a tokenizer
+
+    Assumes roughly four characters per token, which holds for English text and
+    markup with the OpenAI tokenizers.
+    """
+    return math.ceil(len(text) / 4)
+
+
+def get_test_workers() -> int:
+    """Returns the number of processes the tests are spread across"""
+    try:
+        return max(1, int(os.environ.get("AGENT_TEST_WORKERS", 1)))
+    except ValueError:
+        return 1
+
+
+def shard_specs(specs: list[Path], shards: int) -> list[list[Path]]:
+    """Deals the spec files out over at most shards groups"""
+    shards = max(1, min(shards, len(specs)))
+    return [specs[index::shards] for index in range(shards)]
+
+
+def pytest_args(
+    test_dir: Path,
+    report_dir: Path,
+    specs: list[Path] | None = None,
+    shard: int | None = None,
+) -> list[str]:
+    # run the given spec files, or the whole directory
+    paths = [str(spec) for spec in specs] if specs else [str(test_dir)]
+    report_name = "junit.xml" if shard is None else f"junit-{shard}.xml"
     args = [
         "-v",
-        str(test_dir),
+        *paths,
         "--screenshot=on",
         "--video=on",
         "--full-page-screenshot",
+        f"--junitxml={report_dir / report_name}",
     ]
+    if shard is not None:
+        # pytest-playwright empties its output directory when a session starts
+        args.append(f"--output={PYTEST_OUTPUT_DIR / f'shard-{shard}'}")
 
     headless = os.environ.get("HEADLESS", False)
     if not headless:
         args.append("--headed")
+    return args
+
+
+def run_pytest_playwright(
+    test_dir: Path,
+    report_dir: Path,
+    specs: list[Path] | None = None,
+    workers: int = 1,
+) -> ProcessResult:
+    # the tests run in separate, long lived processes which show the output as
+    # it is printed and write it to the log
+    timeout = get_timeout("AGENT_TEST_TIMEOUT", 900)
+    shards = shard_specs(specs, workers) if specs else []
+    if len(shards) < 2:
+        log_path = report_dir / "output.log"
+        returncode, note = get_pytest_worker().run(
+            pytest_args(test_dir, report_dir, specs), test_dir, log_path, timeout
+        )
+        if note:
+            logger.warning(note)
+        return ProcessResult(read_output(log_path), returncode, log_path, note)
+
+    # the shards write their artifacts to subdirectories, remove those of
+    # earlier runs which used the output directory itself
+    shutil.rmtree(PYTEST_OUTPUT_DIR, ignore_errors=True)
 
-    # Redirect the stdout to the buffer
-    with redirect_stdout(buffer):
-        pytest.main(
-            args,
-            plugins=[pytest_playwright],
+    def run_shard(shard: int) -> ProcessResult:
+        log_path = report_dir / f"output-{shard}.log"
+        returncode, note = get_pytest_worker(shard).run(
+            pytest_args(test_dir, report_dir, shards[shard], shard),
+            test_dir,
+            log_path,
+            timeout,
         )
-    # Get the content of the buffer
-    output = buffer.getvalue()
-    # Close the buffer
-    buffer.close()
-    return output
+        if note:
+            logger.warning(note)
+        return ProcessResult("", returncode, log_path, note)
 
+    with ThreadPoolExecutor(max_workers=len(shards)) as executor:
+        results = list(executor.map(run_shard, range(len(shards))))
+    return merge_results(results, report_dir / "output.log")
 
-def run_playwright(test_dir: Path) -> str:
+
+def run_playwright(
+    test_dir: Path,
+    report_dir: Path,
+    specs: list[Path] | None = None,
+    workers: int = 1,
+) -> ProcessResult:
     # ensure test_dir exists
     test_dir.mkdir(exist_ok=True)
-    # Create a StringIO buffer to capture the output
-    buffer = io.StringIO()
 
-    cmd = ["npx", "playwright", "test", "--trace=on", "--reporter=line"]
+    cmd = ["npx", "playwright", "test", "--trace=on", "--reporter=line,json"]
+    if workers > 1:
+        # otherwise the workers of the playwright config are used
+        cmd.append(f"--workers={workers}")
+    if specs:
+        # playwright filters the test files with regular expressions
+        cmd.extend(re.escape(spec.as_posix()) for spec in specs)
+    # the json reporter writes to the file named by these variables
+    report_file = str(report_dir / "playwright.json")
+    env = {
+        **os.environ,
+        "PLAYWRIGHT_JSON_OUTPUT_NAME": report_file,
+        "PLAYWRIGHT_JSON_OUTPUT_FILE": report_file,
+    }
 
-    # Run the command using subprocess and capture the output
-    process = subprocess.Popen(
-        cmd, cwd=test_dir, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
+    # stream the output, the line reporter ends with the number of passed and
+    # failed tests
+    return run_streaming(
+        cmd,
+        cwd=test_dir,
+        env=env,
+        log_path=report_dir / "output.log",
+        timeout=get_timeout("AGENT_TEST_TIMEOUT", 900),
+        idle_timeout=get_timeout("AGENT_TEST_IDLE_TIMEOUT", 180),
+        done_pattern=r"^\s+\d+ (passed|failed|flaky|skipped)",
     )
-    stdout, stderr = process.communicate()
-
-    # Write the output to the buffer
-    buffer.write(stdout)
-    buffer.write(stderr)
 
-    # Get the content of the buffer
-    output = buffer.getvalue()
-    # Close the buffer
-    buffer.close()
-    return output
 
-
-def run_cypress(test_dir: Path, config_file_name: str) -> str:
-    # Create a StringIO buffer to capture the output
-    buffer = io.StringIO()
+def cypress_command(
+    test_dir: Path,
+    config_file_name: str,
+    report_dir: Path,
+    specs: list[Path] | None = None,
+    shard: int | None = None,
+) -> list[str]:
     cmd = [
         "npx",
         "cypress",
@@ -90,61 +195,149 @@ def run_cypress(test_dir: Path, config_file_name: str) -> str:
         "--headless",
         "--config-file",
         str(test_dir / config_file_name),
+        # one junit report is written per spec file
+        "--reporter",
+        "junit",
+        "--reporter-options",
+        f"mochaFile={report_dir / 'junit-[hash].xml'}",
     ]
+    if specs:
+        cmd.extend(["--spec", ",".join(str(spec) for spec in specs)])
+    if shard is not None:
+        # cypress empties its screenshot and video folders when a run starts,
+        # so each shard uses its own, relative to the project root
+        cmd.extend(
+            [
+                "--config",
+                f"screenshotsFolder=cypress/screenshots/shard-{shard},"
+                f"videosFolder=cypress/videos/shard-{shard}",
+            ]
+        )
+    return cmd
 
-    # Run the command using subprocess and capture the output
-    process = subprocess.Popen(
-        cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
-    )
-    stdout, stderr = process.communicate()
 
-    # Write the output to the buffer
-    buffer.write(stdout)
-    buffer.write(stderr)
+def run_cypress(
+    test_dir: Path,
+    config_file_name: str,
+    report_dir: Path,
+    specs: list[Path] | None = None,
+    workers: int = 1,
+) -> ProcessResult:
+    def run_shard(shard: int | None, shard_files: list[Path] | None) -> ProcessResult:
+        suffix = "" if shard is None else f"-{shard}"
+        # stream the output, cypress prints a table of the results once all
+        # specs ran
+        return run_streaming(
+            cypress_command(test_dir, config_file_name, report_dir, shard_files, shard),
+            log_path=report_dir / f"output{suffix}.log",
+            timeout=get_timeout("AGENT_TEST_TIMEOUT", 900),
+            idle_timeout=get_timeout("AGENT_TEST_IDLE_TIMEOUT", 180),
+            done_pattern=r"\(Run Finished\)",
+        )
+
+    shards = shard_specs(specs, workers) if specs else []
+    if len(shards) < 2:
+        return run_shard(None, specs)
 
-    # Get the content of the buffer
-    output = buffer.getvalue()
-    # Close the buffer
-    buffer.close()
-    return output
+    # each shard is a separate cypress run
+    with ThreadPoolExecutor(max_workers=len(shards)) as executor:
+        results = list(executor.map(run_shard, range(len(shards)), shards))
+    return merge_results(results, report_dir / "output.log")
 
 
-# Function to encode the image
-def encode_image(image_path):
-    with open(image_path, "rb") as image_file:
-        return base64.b64encode(image_file.read()).decode("utf-8")
+def add_contact_sheets(
+    image_files: list[Path],
+    index: ArtifactIndex,
+    store: ArtifactStore,
+    stats: ImageStats,
+):
+    """Combines the new images of each test into timestamp labelled contact sheets
 
+    Images are grouped by the directory they were written to, which holds the
+    results of a single test. Every image in a group is recorded with the
+    digests of the sheets, so the sheets are sent once in their place.
+    """
+    groups: dict[Path, list[Path]] = {}
+    for image_file in image_files:
+        if index.digests(image_file) is None or index.is_new(image_file):
+            groups.setdefault(image_file.parent, []).append(image_file)
+
+    for directory, group in groups.items():
+        if len(group) < 2:
+            continue
+        try:
+            prepared = []
+            for sheet in build_contact_sheets(group):
+                prepared.extend(prepare(sheet))
+        except Exception as e:
+            logger.error(f"Error building contact sheet for {directory}: {e}")
+            continue
+        stats.add(sum(f.stat().st_size for f in group), prepared)
+        digests = [store.put_bytes(data, suffix) for data, suffix in prepared]
+        for image_file in group:
+            index.record(image_file, digests)
+        logger.info(
+            f"Combined {len(group)} image(s) in {directory} into {len(digests)} contact sheet(s)."
+        )
 
-def check_for_screenshots():
+
+def check_for_screenshots() -> tuple[list[str], list[str]]:
+    """Collects the screenshots, trace frames and video frames of a test run
+
+    Only traces, videos and images that are new since the last call are
+    processed, and only images that have not been sent before are returned.
+    Returns the digests of the images in the artifact store, and a failure
+    digest of each new playwright trace.
+    """
     screenshots = []
+    traces = []
     test_dir = get_test_dir()
 
     if not test_dir:
-        return screenshots
-
-    # unzip any trace.zip folders
-    trace_files = list(test_dir.glob("**/*.zip"))
-    logger.info(f"Found {len(trace_files)} trace file(s).")
-    if trace_files:
-        for trace_file in trace_files:
-            # extract the contents of the zip file
-            try:
-                subprocess.run(
-                    f"unzip {str(trace_file)} -d {str(trace_file.parent)}",
-                    shell=True,
+        return screenshots, traces
+
+    start = time.perf_counter()
+    index = get_artifact_index()
+
+    store = get_artifact_store()
+    stats = ImageStats()
+
+    # read the failing action, its frames and the errors of any new traces of
+    # failed tests
+    trace_files = [f for f in test_dir.glob("**/*.zip") if index.is_new(f)]
+    logger.info(f"Found {len(trace_files)} new trace file(s).")
+    for trace_file in trace_files:
+        try:
+            digest = read_trace(trace_file)
+            if digest is None:
+                continue
+            # every test records a trace, only those of failures are sent
+            if not digest.failed:
+                index.record(trace_file)
+                continue
+            digests = []
+            for _, frame in digest.frames:
+                with Image.open(io.BytesIO(frame)) as image:
+                    prepared = prepare(image)
+                stats.add(len(frame), prepared)
+                digests.extend(
+                    store.put_bytes(data, suffix) for data, suffix in prepared
                 )
-                # find all image files in any subdirectories
-                keep_unique_images(test_dir)
-            except Exception as e:
-                logger.error(f"Error extracting trace file: {e}")
+            index.record(trace_file, digests)
+            traces.append(digest.format())
+        except Exception as e:
+            logger.error(f"Error reading trace file {trace_file}: {e}")
 
-    # check for video files
-    video_files = list(test_dir.glob("**/*.webm"))
-    logger.info(f"Found {len(video_files)} video(s).")
-    if video_files:
-        for video_file in video_files:
-            # extract frames from the video using moviepy
-            extract_frames(video_file)
+    # check for new video files
+    video_files = [f for f in test_dir.glob("**/*.webm") if index.is_new(f)]
+    logger.info(f"Found {len(video_files)} new video(s).")
+    # extract the frames at which the page changes, one video per process
+    extracted = extract_all_frames(video_files)
+    for video_file, frames in extracted.items():
+        logger.debug(f"Extracted {len(frames)} frame(s) from {video_file}.")
+        index.record(video_file)
+    for directory in {video_file.parent for video_file in extracted}:
+        keep_unique_images(directory)
 
     logger.info("Checking for screenshots.")
 
@@ -153,11 +346,36 @@ def check_for_screenshots():
     for format in ["jpeg", "jpg", "webp"]:
         image_files.extend(list(test_dir.glob(f"**/*.{format}")))
 
-    logger.info(f"Found {len(image_files)} screenshot(s).")
-    if image_files:
-        for image_file in image_files:
-            # convert to base64 and display in a panel
-            image_data = encode_image(image_file)
-            screenshots.append(image_data)
+    if os.environ.get("AGENT_SCREENSHOT_LAYOUT", "separate") == "contact_sheet":
+        add_contact_sheets(image_files, index, store, stats)
+
+    for trace_file in trace_files:
+        for digest in index.digests(trace_file) or []:
+            if digest not in index.sent and digest not in screenshots:
+                screenshots.append(digest)
+
+    for image_file in image_files:
+        digests = index.digests(image_file)
+        if digests is None or index.is_new(image_file):
+            try:
+                # downscale and re-encode the image, very tall ones become tiles
+                prepared = prepare_image(image_file, stats=stats)
+            except Exception as e:
+                logger.error(f"Error preparing image {image_file}: {e}")
+                continue
+            # store the image once, messages refer to it by its digest
+            digests = [store.put_bytes(data, suffix) for data, suffix in prepared]
+            index.record(image_file, digests)
+        for digest in digests:
+            if digest not in index.sent and digest not in screenshots:
+                screenshots.append(digest)
+
+    index.mark_sent(screenshots)
+    index.save()
+    if stats.images:
+        logger.info(stats.summary())
+    logger.info(
+        f"Found {len(screenshots)} new screenshot(s) in {time.perf_counter() - start:.2f}s."
+    )
 
-    return screenshots
+    return screenshots, traces
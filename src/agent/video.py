@@ -1,11 +1,27 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from moviepy.editor import VideoFileClip
 import numpy as np
 from datetime import timedelta
 from pathlib import Path
 import math
-from PIL import Image, ImageChops
+import multiprocessing
+import os
+import re
+from PIL import Image, ImageDraw, ImageFont
+from agent.compare import FrameCache, load_frame, rmse
+from agent.dedup import DedupSettings, find_duplicates
 from agent.logging import logger
 
+# frames per contact sheet, more frames are split over several sheets
+SHEET_FRAMES = 16
+SHEET_COLUMNS = 4
+SHEET_WIDTH = 1536
+LABEL_HEIGHT = 20
+# frames are compared at 1/SCORE_STRIDE of their size to detect scene changes
+SCORE_STRIDE = 4
+# the names extract_frames gives to frames, e.g. frame0-00-01.00.png
+FRAME_NAME = re.compile(r"frame(\d+)-(\d+)-(\d+(?:\.\d+)?)")
+
 
 def format_timedelta(td):
     """Utility function to format timedelta objects in a cool way (e.g 00:00:20.05)
@@ -24,82 +40,194 @@ def calculate_rmse(image1_path, image2_path):
     """
     Calculate the Root Mean Square Error (RMSE) between two images.
     """
-    with Image.open(image1_path) as img1, Image.open(image2_path) as img2:
-        # Convert both images to a consistent format (e.g., RGBA)
-        img1 = img1.convert("RGBA")
-        img2 = img2.convert("RGBA")
-
-        # Ensure the images have the same size for comparison
-        if img1.size != img2.size:
-            return float(
-                "inf"
-            )  # Consider images with different sizes as completely different
-
-        # Calculate the difference between the images
-        diff = ImageChops.difference(img1, img2)
-
-        # Calculate the squared difference of each pixel
-        h = diff.histogram()
-        sum_of_squares = sum(value * ((idx % 256) ** 2) for idx, value in enumerate(h))
+    # images with different sizes are considered completely different
+    return rmse(load_frame(image1_path), load_frame(image2_path))
 
-        # Calculate the RMSE
-        rmse = math.sqrt(sum_of_squares / (img1.size[0] * img1.size[1]))
-        return rmse
 
-
-def keep_unique_images(directory, threshold=5.0):
+def keep_unique_images(directory, threshold=5.0, settings: DedupSettings | None = None):
     """
     Find and keep only unique images in a directory based on pixel content similarity.
     Delete images that are almost identical to others.
+
+    Near-duplicates are found by perceptual hash. When the verify setting is on,
+    a hash match is only deleted if its RMSE is also below the threshold.
     """
-    unique_images = []
+    settings = settings or DedupSettings.from_env()
     image_paths = list(Path(directory).glob("**/*.png"))
     image_paths.extend(list(Path(directory).glob("**/*.jpeg")))
     image_paths.extend(list(Path(directory).glob("**/*.jpg")))
     image_paths.extend(list(Path(directory).glob("**/*.webp")))
 
-    # Loop through all PNG files and compare them pairwise
-    while image_paths:
-        current_image = image_paths.pop(0)
-        unique_images.append(current_image)
+    # the second pass compares each image with all of its hash matches at once
+    frames = FrameCache()
+
+    def verify(image, candidates):
+        try:
+            return frames.closest(image, candidates, threshold)
+        except Exception as e:
+            logger.error(f"Error comparing {image}: {e}")
+            return None
+
+    duplicates = find_duplicates(
+        image_paths,
+        max_distance=settings.max_distance,
+        verify=verify if settings.verify else None,
+    )
+    for duplicate, original in duplicates.items():
+        logger.debug(
+            f"Deleting nearly identical image: {duplicate} (same as {original})"
+        )
+        duplicate.unlink()
+
+    return [image_path for image_path in image_paths if image_path not in duplicates]
+
+
+def save_frame(video_file: Path, frame: np.ndarray, seconds: float) -> Path:
+    frame_duration_formatted = format_timedelta(timedelta(seconds=seconds))
+    frame_filename = video_file.parent / f"frame{frame_duration_formatted}.png"
+    # frames are re-encoded before they are sent, so favour speed over size
+    Image.fromarray(frame).save(frame_filename, compress_level=1)
+    return frame_filename
+
+
+def extract_frames(
+    video_file: Path,
+    frames_per_second: float | None = None,
+    threshold: float | None = None,
+) -> list[Path]:
+    """Extracts the frames at which the page changes from a video
+
+    The video is decoded once, sampling ``frames_per_second`` frames. A frame
+    is saved when it differs from the last saved frame by more than threshold
+    (the rmse of a downsampled copy), and the last frame, showing the page when
+    the test failed, is always saved.
+
+    :param video_file: The path of the video
+    :type video_file: Path
+    :param frames_per_second: The frames sampled per second, defaults to the config
+    :type frames_per_second: float | None, optional
+    :param threshold: The rmse that counts as a scene change, defaults to the config
+    :type threshold: float | None, optional
+    :return: The saved frames
+    :rtype: list[Path]
+    """
+    if frames_per_second is None:
+        frames_per_second = float(os.environ.get("AGENT_VIDEO_FPS", 5))
+    if threshold is None:
+        threshold = float(os.environ.get("AGENT_SCENE_THRESHOLD", 2.0))
+
+    saved = []
+    with VideoFileClip(str(video_file), audio=False) as video_clip:
+        # if frames_per_second is above the video fps, then use the fps (as maximum)
+        fps = min(video_clip.fps, frames_per_second) or video_clip.fps
+        last_saved = None
+        last = None
+        for index, frame in enumerate(video_clip.iter_frames(fps=fps, dtype="uint8")):
+            # changes are scored on a downsampled copy of the frame
+            small = frame[::SCORE_STRIDE, ::SCORE_STRIDE]
+            if last_saved is None or rmse(small, last_saved) > threshold:
+                saved.append(save_frame(video_file, frame, index / fps))
+                last_saved = small
+                last = None
+            else:
+                last = (frame, index / fps)
+
+    if last is not None:
+        saved.append(save_frame(video_file, *last))
+    return saved
+
+
+def extract_all_frames(
+    video_files: list[Path], workers: int | None = None
+) -> dict[Path, list[Path]]:
+    """Extracts the frames of several videos in parallel across processes
+
+    :return: The saved frames of each video that could be decoded
+    :rtype: dict[Path, list[Path]]
+    """
+    if workers is None:
+        workers = int(os.environ.get("AGENT_VIDEO_WORKERS", os.cpu_count() or 1))
+    workers = max(1, min(workers, len(video_files)))
 
-        for other_image in image_paths[:]:
+    frames = {}
+    if workers == 1:
+        for video_file in video_files:
+            try:
+                frames[video_file] = extract_frames(video_file)
+            except Exception as e:
+                logger.error(f"Error extracting frames from {video_file}: {e}")
+        return frames
+
+    # spawn rather than fork, the agent process runs other threads
+    with ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+    ) as executor:
+        futures = {
+            executor.submit(extract_frames, video_file): video_file
+            for video_file in video_files
+        }
+        for future in as_completed(futures):
+            video_file = futures[future]
             try:
-                # Calculate the RMSE between the current image and another
-                rmse = calculate_rmse(current_image, other_image)
-
-                # If RMSE is below the threshold, consider them almost identical
-                if rmse < threshold:
-                    logger.debug(
-                        f"Deleting nearly identical image: {other_image} (RMSE: {rmse:.2f})"
-                    )
-                    other_image.unlink()
-                    image_paths.remove(other_image)
+                frames[video_file] = future.result()
             except Exception as e:
-                logger.error(f"Error comparing {current_image} and {other_image}: {e}")
+                logger.error(f"Error extracting frames from {video_file}: {e}")
+    return frames
 
-    return unique_images
 
+def frame_label(image_path: Path) -> str:
+    """Returns the timestamp of an extracted frame, or the name of other images"""
+    if FRAME_NAME.fullmatch(image_path.stem):
+        return image_path.stem.removeprefix("frame").replace("-", ":")
+    return image_path.stem
 
-def extract_frames(video_file: Path, frames_per_second: int = 1):
-    # load the video clip
-    video_clip = VideoFileClip(str(video_file))
 
-    # if the SAVING_FRAMES_PER_SECOND is above video FPS, then set it to FPS (as maximum)
-    saving_frames_per_second = min(video_clip.fps, frames_per_second)
-    # if SAVING_FRAMES_PER_SECOND is set to 0, step is 1/fps, else 1/SAVING_FRAMES_PER_SECOND
-    step = (
-        1 / video_clip.fps
-        if saving_frames_per_second == 0
-        else 1 / saving_frames_per_second
-    )
+def frame_order(image_path: Path) -> tuple[int, float]:
+    # extracted frames by their timestamp, other images by when they were taken
+    match = FRAME_NAME.fullmatch(image_path.stem)
+    if match:
+        hours, minutes, seconds = match.groups()
+        return (0, int(hours) * 3600 + int(minutes) * 60 + float(seconds))
+    return (1, image_path.stat().st_mtime)
 
-    # iterate over each possible frame
-    for current_duration in np.arange(0, video_clip.duration, step):
-        # format the file name and save it
-        frame_duration_formatted = format_timedelta(timedelta(seconds=current_duration))
-        frame_filename = video_file.parent / f"frame{frame_duration_formatted}.png"
-        # save the frame with the current duration
-        video_clip.save_frame(frame_filename, current_duration)
 
-    keep_unique_images(video_file.parent)
+def build_contact_sheets(image_paths: list[Path]) -> list[Image.Image]:
+    """Lays out images in a grid with a timestamp label below each one
+
+    The images are ordered by timestamp and split over sheets of at most
+    ``SHEET_FRAMES`` images, so a test's visual timeline can be sent as a few
+    composite images instead of one image per frame.
+    """
+    image_paths = sorted(image_paths, key=frame_order)
+    font = ImageFont.load_default(size=14)
+    sheets = []
+    for start in range(0, len(image_paths), SHEET_FRAMES):
+        batch = image_paths[start : start + SHEET_FRAMES]
+        columns = min(SHEET_COLUMNS, len(batch))
+        rows = math.ceil(len(batch) / columns)
+        cell_width = SHEET_WIDTH // columns
+
+        thumbnails = []
+        for image_path in batch:
+            with Image.open(image_path) as image:
+                image = image.convert("RGB")
+                image.thumbnail((cell_width, cell_width * 2))
+                thumbnails.append((image, frame_label(image_path)))
+        cell_height = max(image.height for image, _ in thumbnails) + LABEL_HEIGHT
+
+        sheet = Image.new(
+            "RGB", (cell_width * columns, cell_height * rows), (255, 255, 255)
+        )
+        draw = ImageDraw.Draw(sheet)
+        for index, (image, label) in enumerate(thumbnails):
+            left = (index % columns) * cell_width
+            top = (index // columns) * cell_height
+            sheet.paste(image, (left, top))
+            draw.text(
+                (left + 4, top + cell_height - LABEL_HEIGHT + 2),
+                label,
+                fill=(0, 0, 0),
+                font=font,
+            )
+        sheets.append(sheet)
+    return sheets
@@ -0,0 +1,174 @@
+"""Stand-ins for the playwright objects used by the browser tools
+
+They answer from fixed data and record what was asked of them, so the tools
+can be tested without launching a browser.
+"""
+
+
+class StubLocator:
+    def __init__(self, page: "StubPage", built_with: tuple, matches: list[str]):
+        self.page = page
+        self.built_with = built_with
+        self.matches = matches
+
+    @property
+    def first(self) -> "StubLocator":
+        return self.nth(0)
+
+    def nth(self, index: int) -> "StubLocator":
+        return StubLocator(self.page, self.built_with, self.matches[index:][:1])
+
+    async def count(self) -> int:
+        return len(self.matches)
+
+    async def is_visible(self) -> bool:
+        return bool(self.matches)
+
+    async def evaluate(self, expression: str) -> str:
+        return self.matches[0]
+
+    async def click(self):
+        self._act("click")
+
+    async def fill(self, value: str):
+        self._act("fill", value)
+
+    def _act(self, *action):
+        if not self.matches:
+            raise TimeoutError(f"Timeout waiting for {self.built_with[-1]}")
+        self.page.actions.append((*action, self.built_with[-1]))
+
+
+class StubRequest:
+    def __init__(self, url: str, resource_type: str):
+        self.url = url
+        self.resource_type = resource_type
+
+
+class StubRoute:
+    def __init__(self, request: StubRequest):
+        self.request = request
+        self.outcome = None
+        self.body = None
+
+    async def fulfill(self, body: str, content_type: str):
+        self.outcome, self.body = "fulfilled", body
+
+    async def abort(self):
+        self.outcome = "aborted"
+
+    async def continue_(self):
+        self.outcome = "continued"
+
+
+class StubPage:
+    """A page whose elements are the outer html of each match by locator
+
+    Locators are keyed by the method that built them and its arguments, e.g.
+    ("locator", "#login") or ("get_by_role", "button", "Sign in").
+    """
+
+    def __init__(
+        self,
+        elements: dict[tuple, list[str]] | None = None,
+        html: str = "<html></html>",
+        title: str = "Stub",
+    ):
+        self.elements = elements or {}
+        self.html = html
+        self._title = title
+        self.url = "about:blank"
+        self.closed = False
+        self.actions = []
+        self.navigations = []
+        self.routes = []
+        self.timeouts = {}
+
+    def _locator(self, *built_with) -> StubLocator:
+        return StubLocator(self, built_with, self.elements.get(built_with, []))
+
+    def locator(self, selector: str) -> StubLocator:
+        return self._locator("locator", selector)
+
+    def get_by_text(self, text: str) -> StubLocator:
+        return self._locator("get_by_text", text)
+
+    def get_by_placeholder(self, text: str) -> StubLocator:
+        return self._locator("get_by_placeholder", text)
+
+    def get_by_label(self, text: str) -> StubLocator:
+        return self._locator("get_by_label", text)
+
+    def get_by_test_id(self, test_id: str) -> StubLocator:
+        return self._locator("get_by_test_id", test_id)
+
+    def get_by_role(self, role: str, name: str | None = None) -> StubLocator:
+        return self._locator("get_by_role", role, name)
+
+    async def route(self, pattern: str, handler):
+        self.routes.append(handler)
+
+    async def unroute(self, pattern: str, handler):
+        self.routes.remove(handler)
+
+    async def goto(self, url: str, wait_until: str | None = None):
+        """Loads url, from a route that fulfills the document or else the network
+
+        A script request follows the document, so routes that block scripts
+        can be checked.
+        """
+        self.url = url
+        source = "network"
+        for request in [StubRequest(url, "document"), StubRequest("app.js", "script")]:
+            for handler in self.routes:
+                route = StubRoute(request)
+                await handler(route)
+                if request.resource_type == "script":
+                    self.actions.append(("script", route.outcome))
+                elif route.outcome == "fulfilled":
+                    self.html, source = route.body, "route"
+        self.navigations.append((url, source))
+
+    async def wait_for_load_state(self, state: str):
+        pass
+
+    async def title(self) -> str:
+        return self._title
+
+    async def content(self) -> str:
+        return self.html
+
+    def set_default_timeout(self, timeout: float):
+        self.timeouts["action"] = timeout
+
+    def set_default_navigation_timeout(self, timeout: float):
+        self.timeouts["navigation"] = timeout
+
+    def is_closed(self) -> bool:
+        return self.closed
+
+
+class StubContext:
+    def __init__(self, page: StubPage):
+        self.page = page
+        self.closed = False
+
+    async def new_page(self) -> StubPage:
+        return self.page
+
+    async def close(self):
+        self.closed = True
+        self.page.closed = True
+
+
+class StubBrowser:
+    """Opens a context with a new stub page each time, made by new_page"""
+
+    def __init__(self, new_page=StubPage):
+        self.new_page = new_page
+        self.contexts: list[StubContext] = []
+
+    async def new_context(self, **kwargs) -> StubContext:
+        context = StubContext(self.new_page())
+        self.contexts.append(context)
+        return context
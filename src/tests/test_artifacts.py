@@ -0,0 +1,59 @@
+import os
+from agent.artifacts import ArtifactIndex, ArtifactStore
+
+
+def test_artifact_store_is_content_addressed(tmp_path):
+    store = ArtifactStore(tmp_path / "artifacts")
+    first = store.put_bytes(b"image", ".png")
+
+    assert store.put_bytes(b"image", ".png") == first
+    assert len(list((tmp_path / "artifacts").iterdir())) == 1
+    assert store.data_url(first) == "data:image/png;base64,aW1hZ2U="
+
+
+def test_artifact_index_tracks_new_and_sent_files(tmp_path):
+    image = tmp_path / "screenshot.png"
+    image.write_bytes(b"image")
+    deleted = tmp_path / "frame.png"
+    deleted.write_bytes(b"frame")
+
+    index = ArtifactIndex(tmp_path / "index.json")
+    assert index.is_new(image)
+
+    index.record(image, ["abc"])
+    index.record(deleted, ["def"])
+    index.mark_sent(["abc"])
+    deleted.unlink()
+    index.save()
+
+    index = ArtifactIndex(tmp_path / "index.json")
+    assert not index.is_new(image)
+    assert index.digests(image) == ["abc"]
+    assert index.sent == {"abc"}
+    assert str(deleted) not in index.files
+
+    # a rewritten file is picked up again
+    image.write_bytes(b"new image")
+    os.utime(image, (0, 0))
+    assert index.is_new(image)
+
+
+def test_artifact_index_resends_images_in_a_new_session(tmp_path):
+    image = tmp_path / "screenshot.png"
+    image.write_bytes(b"image")
+
+    index = ArtifactIndex(tmp_path / "index.json")
+    index.record(image, ["abc"])
+    index.mark_sent(["abc"])
+    index.save()
+
+    # the same session still knows the image was sent
+    assert "abc" in ArtifactIndex(tmp_path / "index.json").sent
+
+    index = ArtifactIndex(tmp_path / "index.json")
+    index.start_session()
+    index.save()
+
+    index = ArtifactIndex(tmp_path / "index.json")
+    assert index.sent == set()
+    assert not index.is_new(image)
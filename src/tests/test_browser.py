@@ -0,0 +1,158 @@
+import asyncio
+import pytest
+from agent.browser import (
+    LOCATOR_KINDS,
+    BrowserManager,
+    BrowserMetrics,
+    build_locator,
+    check_locators,
+    load_snapshot,
+)
+from tests.stubs import StubBrowser, StubPage
+
+
+@pytest.fixture
+def manager():
+    manager = BrowserManager(max_uses=2)
+    manager._browser = StubBrowser()
+    return manager
+
+
+async def use_pages(manager: BrowserManager, times: int) -> list[StubPage]:
+    pages = []
+    for _ in range(times):
+        pooled = await manager._acquire()
+        pages.append(pooled.page)
+        await manager._release(pooled)
+    return pages
+
+
+def test_pool_recycles_pages_after_max_uses(manager):
+    pages = asyncio.run(use_pages(manager, 3))
+
+    assert pages[0] is pages[1]
+    assert pages[2] is not pages[0]
+    assert manager._browser.contexts[0].closed
+    assert manager._idle[0].page is pages[2]
+    assert manager.metrics.pages_created == 2
+    assert manager.metrics.pages_recycled == 1
+
+
+def test_pool_discards_a_page_after_an_error(manager):
+    async def fail():
+        manager._slots = asyncio.Semaphore(manager.max_pages)
+        async with manager.page():
+            raise ValueError("broken")
+
+    with pytest.raises(ValueError):
+        asyncio.run(fail())
+
+    assert manager._browser.contexts[0].closed
+    assert manager._idle == []
+    assert manager.metrics.pages_recycled == 1
+
+
+def test_pool_skips_closed_idle_pages(manager):
+    (first,) = asyncio.run(use_pages(manager, 1))
+    first.closed = True
+
+    (second,) = asyncio.run(use_pages(manager, 1))
+
+    assert second is not first
+    assert manager._browser.contexts[0].closed
+    assert manager.metrics.pages_created == 2
+    assert manager.metrics.pages_recycled == 1
+
+
+def test_browser_metrics(manager):
+    page = StubPage()
+    asyncio.run(manager.goto(page, "https://example.com"))
+    asyncio.run(manager.goto(page, "https://example.com/login"))
+    asyncio.run(use_pages(manager, 1))
+
+    assert page.navigations == [
+        ("https://example.com", "network"),
+        ("https://example.com/login", "network"),
+    ]
+    assert manager.metrics.navigations == 2
+    assert manager.metrics.navigation_seconds > 0
+    assert manager.metrics.pages_created == 1
+
+    metrics = BrowserMetrics(
+        launch_seconds=1.5, navigations=4, navigation_seconds=2.0, pages_created=3
+    )
+    assert metrics.summary() == (
+        "Browser launched in 1.50s. 4 navigation(s) took 2.00s (0.50s on average). "
+        "3 page(s) created, 0 recycled."
+    )
+    assert "0.00s on average" in BrowserMetrics().summary()
+
+
+@pytest.mark.parametrize(
+    "spec,built_with",
+    [
+        ({"kind": "css", "value": "#login"}, ("locator", "#login")),
+        ({"kind": "text", "value": "Welcome"}, ("get_by_text", "Welcome")),
+        ({"kind": "placeholder", "value": "Email"}, ("get_by_placeholder", "Email")),
+        ({"kind": "label", "value": "Password"}, ("get_by_label", "Password")),
+        (
+            {"kind": "role", "value": "button", "name": "Sign in"},
+            ("get_by_role", "button", "Sign in"),
+        ),
+        ({"kind": "role", "value": "form"}, ("get_by_role", "form", None)),
+        ({"kind": "test_id", "value": "submit"}, ("get_by_test_id", "submit")),
+        ({"value": "form > button"}, ("locator", "form > button")),
+    ],
+)
+def test_build_locator(spec: dict, built_with: tuple):
+    assert build_locator(StubPage(), spec).built_with == built_with
+
+
+def test_build_locator_covers_every_kind():
+    page = StubPage()
+    built_with = {
+        build_locator(page, {"kind": kind, "value": "x"}).built_with[0]
+        for kind in LOCATOR_KINDS
+    }
+    assert len(built_with) == len(LOCATOR_KINDS)
+
+
+def test_check_locators_describes_the_first_match():
+    page = StubPage(
+        {
+            ("get_by_role", "button", "Sign in"): [
+                "<button>Sign in</button>",
+                "<button>Sign in with Google</button>",
+            ],
+        }
+    )
+
+    results = asyncio.run(
+        check_locators(
+            page,
+            [
+                {"kind": "role", "value": "button", "name": "Sign in"},
+                {"kind": "css", "value": "#missing"},
+                {"kind": "text"},
+            ],
+        )
+    )
+
+    assert results[0]["count"] == 2
+    assert results[0]["visible"]
+    assert results[0]["html"] == "<button>Sign in</button>"
+    assert results[1]["count"] == 0
+    assert results[1]["html"] is None
+    assert "error" in results[2]
+
+
+def test_load_snapshot_serves_the_document_without_scripts():
+    page = StubPage(html="<p>live</p>")
+    html = "<p>cached</p><script>render()</script>"
+
+    asyncio.run(load_snapshot(page, "https://example.com/login/", html))
+
+    assert page.navigations == [("https://example.com/login/", "route")]
+    assert page.html == "<p>cached</p>"
+    assert ("script", "aborted") in page.actions
+    assert page.routes == []
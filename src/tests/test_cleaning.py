@@ -0,0 +1,52 @@
+import pytest
+from agent.cleaning import clean_html
+
+PAGE = """<!DOCTYPE html>
+<html>
+<head><title>Sign in</title><link rel="stylesheet" href="/app.css"></head>
+<body>
+  <!-- build 1234 -->
+  <script>window.__STATE__ = {"user": null}</script>
+  <style>.btn { color: red; }</style>
+  <svg viewBox="0 0 10 10"><path d="M0 0L10 10"></path><svg><g></g></svg></svg>
+  <form action="/login" onsubmit="return false" data-reactid="42">
+    <input id="email" name="email" placeholder="Email" style="width: 100%" data-testid="email">
+    <button class="flex items-center justify-center rounded-md px-4 py-2 text-sm font-medium" type="submit">Sign in &amp; go</button>
+  </form>
+</body>
+</html>
+"""
+
+
+@pytest.mark.parametrize("engine", ["stream", "lxml", "bs4"])
+def test_clean_html_removes_noise(engine: str):
+    if engine == "lxml":
+        pytest.importorskip("lxml")
+
+    output = clean_html(PAGE, engine=engine)
+
+    for noise in [
+        "<title>",
+        "stylesheet",
+        "build 1234",
+        "__STATE__",
+        ".btn",
+        "<svg",
+        "<path",
+        "onsubmit",
+        "data-reactid",
+        "width: 100%",
+        "items-center",
+    ]:
+        assert noise not in output
+
+    for kept in [
+        'action="/login"',
+        'id="email"',
+        'name="email"',
+        'placeholder="Email"',
+        'data-testid="email"',
+        'type="submit"',
+        "Sign in &amp; go",
+    ]:
+        assert kept in output
@@ -0,0 +1,58 @@
+import math
+import numpy as np
+import pytest
+from PIL import Image, ImageChops
+from agent.compare import FrameCache, load_frame, rmse, rmse_many, rmse_pairs
+
+
+def histogram_rmse(image1: Image.Image, image2: Image.Image) -> float:
+    # the histogram based calculation calculate_rmse used before
+    h = ImageChops.difference(image1, image2).histogram()
+    sum_of_squares = sum(value * ((idx % 256) ** 2) for idx, value in enumerate(h))
+    return math.sqrt(sum_of_squares / (image1.size[0] * image1.size[1]))
+
+
+def random_image(seed: int, size=(64, 48)) -> Image.Image:
+    pixels = np.random.default_rng(seed).integers(0, 256, (*size[::-1], 4))
+    return Image.fromarray(pixels.astype(np.uint8))
+
+
+def test_rmse_matches_the_histogram_calculation(tmp_path):
+    paths = []
+    for seed in range(3):
+        path = tmp_path / f"{seed}.png"
+        random_image(seed).save(path)
+        paths.append(path)
+
+    frames = [load_frame(path) for path in paths]
+    expected = [histogram_rmse(random_image(0), random_image(s)) for s in range(3)]
+
+    assert rmse(frames[0], frames[1]) == pytest.approx(expected[1])
+    assert list(rmse_many(frames[0], frames)) == pytest.approx(expected)
+    assert list(rmse_pairs(frames[1:], frames[:-1]))[0] == pytest.approx(expected[1])
+
+
+def test_rmse_of_different_sizes_is_infinite():
+    frame = np.zeros((10, 10, 4), dtype=np.uint8)
+    assert rmse(frame, np.zeros((10, 12, 4), dtype=np.uint8)) == float("inf")
+
+
+def test_frame_cache_returns_the_closest_candidate(tmp_path):
+    Image.new("RGBA", (20, 20), (0, 0, 0, 255)).save(tmp_path / "black.png")
+    Image.new("RGBA", (20, 20), (2, 2, 2, 255)).save(tmp_path / "dark.png")
+    Image.new("RGBA", (20, 20), (255, 255, 255, 255)).save(tmp_path / "white.png")
+    Image.new("RGBA", (30, 30), (0, 0, 0, 255)).save(tmp_path / "large.png")
+
+    frames = FrameCache()
+    candidates = [
+        tmp_path / "white.png",
+        tmp_path / "large.png",
+        tmp_path / "black.png",
+    ]
+
+    assert frames.closest(tmp_path / "dark.png", candidates, 5.0) == (
+        tmp_path / "black.png"
+    )
+    assert frames.closest(tmp_path / "dark.png", candidates[:2], 5.0) is None
+    # the frame compared to the candidates is decoded once as well
+    assert tmp_path / "dark.png" in frames.frames
@@ -0,0 +1,67 @@
+import json
+from types import SimpleNamespace
+import agent.completions as completions
+
+
+def make_tool_call(id: str, name: str, **kwargs):
+    return SimpleNamespace(
+        id=id,
+        function=SimpleNamespace(name=name, arguments=json.dumps(kwargs)),
+    )
+
+
+def test_dispatch_tool_calls_answers_every_call(monkeypatch):
+    calls = []
+
+    def fake_read_file_contents(**kwargs):
+        calls.append(kwargs["path"])
+        return f"contents of {kwargs['path']}"
+
+    monkeypatch.setattr(
+        completions.tools, "read_file_contents", fake_read_file_contents
+    )
+
+    tool_calls = [
+        make_tool_call("call_1", "read_file_contents", path="a.py"),
+        make_tool_call("call_2", "read_file_contents", path="b.py"),
+    ]
+    messages = completions.dispatch_tool_calls(tool_calls)
+
+    assert calls == ["a.py", "b.py"]
+    assert messages == [
+        {"role": "tool", "tool_call_id": "call_1", "content": "contents of a.py"},
+        {"role": "tool", "tool_call_id": "call_2", "content": "contents of b.py"},
+    ]
+
+
+def test_dispatch_tool_calls_reports_tool_errors(monkeypatch):
+    def broken_tool(**kwargs):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(completions.tools, "list_files_in_dir", broken_tool)
+
+    messages = completions.dispatch_tool_calls(
+        [make_tool_call("call_1", "list_files_in_dir", dir=".")]
+    )
+
+    assert messages[0]["tool_call_id"] == "call_1"
+    assert "boom" in messages[0]["content"]
+
+
+def test_assistant_message_echoes_tool_calls():
+    message = SimpleNamespace(
+        content=None,
+        tool_calls=[make_tool_call("call_1", "run_tests")],
+    )
+
+    assert completions.assistant_message(message) == {
+        "role": "assistant",
+        "content": None,
+        "tool_calls": [
+            {
+                "id": "call_1",
+                "type": "function",
+                "function": {"name": "run_tests", "arguments": "{}"},
+            }
+        ],
+    }
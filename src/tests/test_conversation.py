@@ -0,0 +1,128 @@
+import json
+from agent.artifacts import ArtifactStore, artifact_url
+from agent.completions import screenshot_message
+from agent.conversation import Conversation, get_token_budget
+
+
+def tool_turn(conversation: Conversation, id: str, name: str, output: str, **kwargs):
+    conversation.append(
+        {
+            "role": "assistant",
+            "content": None,
+            "tool_calls": [
+                {
+                    "id": id,
+                    "type": "function",
+                    "function": {"name": name, "arguments": json.dumps(kwargs)},
+                }
+            ],
+        }
+    )
+    conversation.append({"role": "tool", "tool_call_id": id, "content": output})
+
+
+def screenshot_turn(conversation: Conversation, id: str):
+    tool_turn(conversation, id, "run_tests", "1 failed")
+    conversation.append(
+        {
+            "role": "user",
+            "content": [
+                {"type": "text", "text": "Screenshots were taken on test failure."},
+                {"type": "image_url", "image_url": {"url": "data:image/png;base64,"}},
+            ],
+        }
+    )
+
+
+def test_get_token_budget(monkeypatch):
+    monkeypatch.delenv("AGENT_TOKEN_BUDGET", raising=False)
+    assert get_token_budget("gpt-4o-mini") == 96_000
+    assert get_token_budget("gpt-4") == 6_144
+
+    monkeypatch.setenv("AGENT_TOKEN_BUDGET", "1000")
+    assert get_token_budget("gpt-4o") == 1000
+
+
+def test_compact_does_nothing_within_budget():
+    conversation = Conversation(model="gpt-4o", budget=10_000)
+    conversation.pin({"role": "assistant", "content": "system prompt"})
+    tool_turn(conversation, "call_1", "read_file_contents", "x" * 100, path="a.py")
+
+    assert not conversation.compact()
+
+
+def test_compact_keeps_pinned_and_latest_messages():
+    conversation = Conversation(model="gpt-4o", budget=1_500)
+    conversation.pin({"role": "assistant", "content": "system prompt " * 200})
+    page = "<body>" + "x" * 2000 + "</body>"
+    tool_turn(conversation, "call_1", "extract_webpage_content", page, url="/a")
+    screenshot_turn(conversation, "call_2")
+    tool_turn(conversation, "call_3", "extract_webpage_content", page, url="/a")
+    tool_turn(conversation, "call_4", "read_file_contents", "y" * 1000, path="a.py")
+
+    assert conversation.compact()
+    messages = conversation.messages
+
+    # the system prompt and the latest turn are untouched
+    assert messages[0]["content"] == "system prompt " * 200
+    assert messages[-1]["content"] == "y" * 1000
+    # the superseded page snapshot and stale screenshots are gone
+    assert "newer snapshot" in messages[2]["content"]
+    assert not any(
+        part["type"] == "image_url"
+        for m in messages
+        if isinstance(m["content"], list)
+        for part in m["content"]
+    )
+    # every tool call is still answered
+    tool_call_ids = [m["tool_call_id"] for m in messages if m["role"] == "tool"]
+    assert tool_call_ids == ["call_1", "call_2", "call_3", "call_4"]
+    assert conversation.tokens <= conversation.budget
+
+
+def test_compact_keeps_the_text_of_screenshot_messages():
+    conversation = Conversation(model="gpt-4o", budget=500)
+    tool_turn(conversation, "call_1", "run_tests", "1 failed")
+    conversation.append(
+        screenshot_message(
+            [f"{index:064x}" for index in range(4)],
+            traces=["Trace trace.zip:\n- locator.click(#submit) FAILED: Timeout"],
+        )
+    )
+    tool_turn(conversation, "call_2", "read_file_contents", "y" * 100, path="a.py")
+
+    assert conversation.compact()
+    [message] = [m for m in conversation.messages if m["role"] == "user"]
+
+    texts = [part["text"] for part in message["content"]]
+    assert all(part["type"] == "text" for part in message["content"])
+    assert "locator.click(#submit) FAILED: Timeout" in texts[0]
+    assert "4 screenshot(s) from an earlier test run removed" in texts[-1]
+    assert conversation.tokens <= conversation.budget
+
+
+def test_render_attaches_only_the_latest_screenshot_sets(tmp_path):
+    store = ArtifactStore(tmp_path)
+    digests = [store.put_bytes(bytes([i]) * 8, ".png") for i in range(3)]
+
+    conversation = Conversation(model="gpt-4o", screenshot_sets=2)
+    for index, digest in enumerate(digests):
+        tool_turn(conversation, f"call_{index}", "run_tests", "1 failed")
+        conversation.append(screenshot_message([digest]))
+
+    messages = conversation.render(store)
+    image_urls = [
+        part["image_url"]["url"]
+        for message in messages
+        if isinstance(message["content"], list)
+        for part in message["content"]
+        if part["type"] == "image_url"
+    ]
+
+    assert image_urls == [store.data_url(digest) for digest in digests[1:]]
+    assert image_urls[0].startswith("data:image/png;base64,")
+    assert "no longer attached" in messages[2]["content"][-1]["text"]
+    # the stored messages keep referring to the artifacts
+    assert conversation.messages[2]["content"][1]["image_url"]["url"] == (
+        artifact_url(digests[0])
+    )
@@ -0,0 +1,54 @@
+from agent.crawler import format_page, query_index, same_origin, summarize_page
+
+PAGE = """
+<html>
+<head><title>Settings</title></head>
+<body>
+  <h1>Settings</h1>
+  <nav>
+    <a href="/planning">Planning</a>
+    <a href="https://docs.example.com/help">Help</a>
+    <a href="mailto:support@example.com">Support</a>
+  </nav>
+  <form action="/offices" method="POST">
+    <input id="officeName" placeholder="Office name">
+    <input type="hidden" name="csrf">
+    <button type="submit">Save</button>
+  </form>
+  <button>Add Office</button>
+</body>
+</html>
+"""
+
+
+def test_summarize_page():
+    summary = summarize_page(PAGE, "https://app.example.com/settings")
+
+    assert summary["title"] == "Settings"
+    assert summary["headings"] == ["Settings"]
+    assert summary["forms"][0]["action"] == "https://app.example.com/offices"
+    assert summary["forms"][0]["method"] == "post"
+    assert [f["locator"] for f in summary["forms"][0]["fields"]] == ["#officeName"]
+    assert [b["text"] for b in summary["forms"][0]["buttons"]] == ["Save"]
+    assert [b["text"] for b in summary["buttons"]] == ["Add Office"]
+    assert summary["links"] == [
+        {"url": "https://app.example.com/planning", "text": "Planning"},
+        {"url": "https://docs.example.com/help", "text": "Help"},
+    ]
+
+
+def test_same_origin():
+    assert same_origin("https://app.example.com/a", "https://app.example.com/b")
+    assert not same_origin("https://app.example.com/a", "https://docs.example.com/")
+    assert not same_origin("http://app.example.com/a", "https://app.example.com/a")
+
+
+def test_query_index():
+    summary = summarize_page(PAGE, "https://app.example.com/settings")
+    summary["depth"] = 0
+    index = {"start_url": summary["url"], "pages": {summary["url"]: summary}}
+
+    assert "#officeName" in query_index(index, "office name")
+    assert "https://app.example.com/planning" in query_index(index, "planning")
+    assert query_index(index, "invoice").startswith("No pages")
+    assert "- form action=https://app.example.com/offices" in format_page(summary)
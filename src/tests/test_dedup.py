@@ -0,0 +1,87 @@
+import random
+from PIL import Image, ImageDraw
+from agent.dedup import (
+    BKTree,
+    DedupSettings,
+    dhash,
+    find_duplicates,
+    hamming_distance,
+)
+from agent.video import keep_unique_images
+
+
+def save_screen(path, text: str, noise: int = 0):
+    image = Image.new("RGB", (320, 240), (255, 255, 255))
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((0, 0, 320, 40), fill=(30, 60, 120))
+    draw.text((20, 100), text, fill=(0, 0, 0))
+    random.seed(noise)
+    for _ in range(noise):
+        image.putpixel((random.randrange(320), random.randrange(160, 240)), (240,) * 3)
+    image.save(path)
+    return path
+
+
+def save_form(path, email: str = ""):
+    image = Image.new("RGB", (1280, 720), (255, 255, 255))
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((0, 0, 1280, 64), fill=(30, 60, 120))
+    draw.text((40, 24), "Sign up", fill=(255, 255, 255))
+    for row, label in enumerate(["Email", "Password", "Organisation"]):
+        top = 160 + row * 110
+        draw.text((440, top), label, fill=(60, 60, 60))
+        draw.rectangle((440, top + 24, 840, top + 64), outline=(180,) * 3, width=2)
+    draw.text((452, 198), email, fill=(0, 0, 0))
+    draw.rectangle((440, 500, 840, 548), fill=(40, 110, 220))
+    draw.text((610, 516), "Create account", fill=(255, 255, 255))
+    image.save(path)
+    return path
+
+
+def test_bk_tree_finds_hashes_within_distance():
+    tree = BKTree()
+    for hash in [0b0000, 0b0001, 0b0111, 0b1111]:
+        tree.add(hash, hash)
+
+    assert [item for _, item in tree.search(0b0000, 1)] == [0b0000, 0b0001]
+    assert [item for _, item in tree.search(0b1110, 1)] == [0b1111]
+
+
+def test_find_duplicates_keeps_the_first_of_similar_images(tmp_path):
+    first = save_screen(tmp_path / "1.png", "Sign in")
+    noisy = save_screen(tmp_path / "2.png", "Sign in", noise=20)
+    other = save_screen(tmp_path / "3.png", "Welcome back, a very long message")
+
+    duplicates = find_duplicates([first, noisy, other])
+
+    assert duplicates == {noisy: first}
+
+
+def test_find_duplicates_uses_the_second_pass(tmp_path):
+    first = save_screen(tmp_path / "1.png", "Sign in")
+    noisy = save_screen(tmp_path / "2.png", "Sign in", noise=20)
+
+    assert find_duplicates([first, noisy], verify=lambda image, candidates: None) == {}
+
+
+def test_keep_unique_images_deletes_duplicates(tmp_path):
+    save_screen(tmp_path / "frame0-00-00.00.png", "Sign in")
+    save_screen(tmp_path / "frame0-00-01.00.png", "Sign in")
+    save_screen(tmp_path / "frame0-00-02.00.png", "Welcome back, a very long message")
+
+    unique = keep_unique_images(tmp_path, settings=DedupSettings(verify=True))
+
+    assert len(unique) == 2
+    assert sorted(p.name for p in tmp_path.iterdir()) == sorted(p.name for p in unique)
+
+
+def test_keep_unique_images_keeps_different_ui_states(tmp_path):
+    empty = save_form(tmp_path / "frame0-00-00.00.png")
+    filled = save_form(tmp_path / "frame0-00-01.00.png", "agent+1234@automators.com")
+    # the hashes of the two states are close enough to match
+    with Image.open(empty) as a, Image.open(filled) as b:
+        assert hamming_distance(dhash(a), dhash(b)) <= DedupSettings().max_distance
+
+    unique = keep_unique_images(tmp_path, settings=DedupSettings())
+
+    assert sorted(unique) == [empty, filled]
@@ -0,0 +1,68 @@
+from agent.distill import distill_html, format_accessibility_tree
+
+PAGE = """
+<html>
+<head><title>Sign in</title><style>body { color: red; }</style></head>
+<body>
+  <h1>Welcome back</h1>
+  <svg><path d="M0 0L10 10"></path></svg>
+  <form action="/login">
+    <label for="email">Email</label>
+    <input id="email" name="email" type="email" placeholder="Email">
+    <input name="password" type="password" placeholder="Password">
+    <input type="hidden" name="csrf" value="secret">
+    <button class="btn btn-primary px-4 py-2" type="submit">Sign in</button>
+  </form>
+  <div style="display: none"><a href="/hidden">Hidden link</a></div>
+  <a href="/signup">Create an account</a>
+  <button data-testid="cookie-accept">Accept</button>
+</body>
+</html>
+"""
+
+
+def test_distill_html_lists_interactive_elements():
+    output = distill_html(PAGE).splitlines()
+
+    assert output == [
+        "Title: Sign in",
+        '- h1 role="heading" text="Welcome back" -> role=heading[name="Welcome back"]',
+        '- form action="/login" -> form',
+        '  - label for="email" text="Email" -> label:has-text("Email")',
+        '  - input id="email" name="email" type="email" placeholder="Email" role="textbox" -> #email',
+        '  - input name="password" type="password" placeholder="Password" role="textbox" -> input[name="password"]',
+        '  - button type="submit" role="button" text="Sign in" -> role=button[name="Sign in"]',
+        '- a href="/signup" role="link" text="Create an account" -> role=link[name="Create an account"]',
+        '- button role="button" text="Accept" -> [data-testid="cookie-accept"]',
+    ]
+
+
+def test_distill_html_respects_max_chars():
+    output = distill_html(PAGE, max_chars=100)
+
+    assert len(output.splitlines()[0]) <= 100
+    assert output.endswith("more elements not shown)")
+
+
+def test_format_accessibility_tree_limits_depth():
+    tree = {
+        "role": "WebArea",
+        "name": "Sign in",
+        "children": [
+            {"role": "heading", "name": "Welcome back", "level": 1},
+            {
+                "role": "form",
+                "children": [
+                    {"role": "textbox", "name": "Email"},
+                    {"role": "button", "name": "Sign in"},
+                ],
+            },
+        ],
+    }
+
+    assert format_accessibility_tree(tree, max_depth=2).splitlines() == [
+        '- WebArea "Sign in"',
+        '  - heading "Welcome back" [level=1]',
+        "  - form",
+        "    - ... (2 children)",
+    ]
@@ -0,0 +1,41 @@
+import threading
+import agent.executor as executor
+
+
+def test_execute_tool_calls_keeps_order_and_runs_safe_tools_concurrently(
+    monkeypatch,
+):
+    # both reads must be in flight at the same time to get past the barrier
+    barrier = threading.Barrier(2, timeout=5)
+    events = []
+
+    def read_file_contents(**kwargs):
+        barrier.wait()
+        return f"read {kwargs['path']}"
+
+    def write_code_to_file(**kwargs):
+        events.append("write")
+        return f"wrote {kwargs['file_name']}"
+
+    monkeypatch.setattr(executor.tools, "read_file_contents", read_file_contents)
+    monkeypatch.setattr(executor.tools, "write_code_to_file", write_code_to_file)
+    monkeypatch.setenv("AGENT_TOOL_WORKERS", "2")
+
+    results = executor.execute_tool_calls(
+        [
+            ("read_file_contents", {"path": "a.py"}),
+            ("read_file_contents", {"path": "b.py"}),
+            ("write_code_to_file", {"file_name": "c.py", "code": ""}),
+        ]
+    )
+
+    assert results == ["read a.py", "read b.py", "wrote c.py"]
+    assert events == ["write"]
+
+
+def test_get_tool_workers_falls_back_on_invalid_config(monkeypatch):
+    monkeypatch.setenv("AGENT_TOOL_WORKERS", "lots")
+    assert executor.get_tool_workers() == 4
+
+    monkeypatch.setenv("AGENT_TOOL_WORKERS", "0")
+    assert executor.get_tool_workers() == 1
@@ -0,0 +1,37 @@
+import io
+import pytest
+from PIL import Image
+from agent.imaging import ImageSettings, ImageStats, prepare_image
+
+
+@pytest.mark.parametrize("image_format", ["jpeg", "webp"])
+def test_prepare_image_downscales_and_reencodes(tmp_path, image_format: str):
+    path = tmp_path / "screenshot.png"
+    Image.new("RGBA", (3000, 2000), (255, 0, 0, 128)).save(path)
+
+    stats = ImageStats()
+    prepared = prepare_image(
+        path, ImageSettings(max_edge=1500, format=image_format), stats=stats
+    )
+
+    assert len(prepared) == 1
+    data, suffix = prepared[0]
+    assert suffix == f".{image_format}"
+    with Image.open(io.BytesIO(data)) as image:
+        assert image.format == image_format.upper()
+        assert image.size == (1500, 1000)
+    assert stats.images == 1
+    assert stats.prepared_bytes < stats.original_bytes
+
+
+def test_prepare_image_tiles_tall_screenshots(tmp_path):
+    path = tmp_path / "full-page.png"
+    Image.new("RGB", (1000, 5000), (0, 0, 255)).save(path)
+
+    prepared = prepare_image(path, ImageSettings(max_edge=1000))
+
+    sizes = []
+    for data, _ in prepared:
+        with Image.open(io.BytesIO(data)) as image:
+            sizes.append(image.size)
+    assert sizes == [(1000, 1000)] * 5
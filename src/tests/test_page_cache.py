@@ -0,0 +1,69 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from agent.page_cache import PageCache, cache_key, normalize_url
+
+
+@pytest.mark.parametrize(
+    "url,expected",
+    [
+        ("HTTPS://Example.com:443/login/", "https://example.com/login"),
+        ("https://example.com/?b=2&a=1#section", "https://example.com/?a=1&b=2"),
+        ("http://localhost:3000", "http://localhost:3000/"),
+    ],
+)
+def test_normalize_url(url: str, expected: str):
+    assert normalize_url(url) == expected
+
+
+def test_cache_key_depends_on_viewport_and_auth_state():
+    url = "https://example.com/login"
+    key = cache_key(url, viewport={"width": 1280, "height": 720})
+
+    assert key == cache_key(url + "/", viewport={"width": 1280, "height": 720})
+    assert key != cache_key(url, viewport={"width": 800, "height": 600})
+    assert key != cache_key(
+        url, viewport={"width": 1280, "height": 720}, auth_state="abc"
+    )
+
+
+def test_page_cache_expires_entries(tmp_path):
+    cache = PageCache(tmp_path, ttl=60)
+    cache.put("page", "<body></body>")
+    assert cache.get("page") == "<body></body>"
+
+    # pretend the entry was stored two minutes ago
+    stored = time.time() - 120
+    os.utime(tmp_path / "page.html", (stored, stored))
+    assert cache.get("page") is None
+    assert not (tmp_path / "page.html").exists()
+
+
+def test_page_cache_evicts_least_recently_used(tmp_path):
+    cache = PageCache(tmp_path, max_bytes=25)
+    now = time.time()
+    for index, key in enumerate(["a", "b"]):
+        cache.put(key, "x" * 10)
+        os.utime(tmp_path / f"{key}.html", (now - 100 + index, now))
+
+    # reading "a" makes "b" the least recently used entry
+    assert cache.get("a") is not None
+    cache.put("c", "x" * 10)
+
+    assert sorted(p.stem for p in tmp_path.glob("*.html")) == ["a", "c"]
+
+
+def test_page_cache_concurrent_puts(tmp_path):
+    # entries are written and evicted by several threads at once
+    cache = PageCache(tmp_path, max_bytes=100)
+    pages = [(f"page-{index % 10}", f"<p>{index:03}</p>" * 2) for index in range(200)]
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda page: cache.put(*page), pages))
+
+    assert list(tmp_path.glob("*.tmp")) == []
+    entries = list(tmp_path.glob("*.html"))
+    assert entries
+    for path in entries:
+        assert path.read_text() in {content for _, content in pages}
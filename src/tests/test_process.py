@@ -0,0 +1,66 @@
+import time
+import agent.process
+from agent.process import OutputBuffer, ProcessResult, merge_results, run_streaming
+
+
+def test_output_buffer_keeps_the_head_and_tail():
+    buffer = OutputBuffer(head_chars=10, tail_chars=10)
+    for i in range(100):
+        buffer.write(f"line {i:02}\n")
+
+    output = buffer.getvalue()
+
+    assert output.startswith("line 00\nline 01\n")
+    assert output.endswith("line 99\n")
+    assert "characters omitted" in output
+    assert len(output) < 100
+
+
+def test_run_streaming_spools_the_output_to_the_log(tmp_path):
+    log_path = tmp_path / "output.log"
+    result = run_streaming(
+        ["sh", "-c", "printf '\\033[32mok\\033[0m\\n'; echo done"], log_path=log_path
+    )
+
+    assert result.returncode == 0
+    assert result.note is None
+    assert result.output == "ok\ndone\n"
+    assert log_path.read_text() == "ok\ndone\n"
+
+
+def test_run_streaming_kills_an_idle_run():
+    start = time.monotonic()
+    result = run_streaming(["sh", "-c", "echo start; sleep 30"], idle_timeout=0.5)
+
+    assert time.monotonic() - start < 10
+    assert "without output" in result.note
+    assert result.output == "start\n"
+
+
+def test_run_streaming_returns_once_the_reporter_is_done(monkeypatch):
+    monkeypatch.setattr(agent.process, "DONE_GRACE_SECONDS", 0.2)
+    start = time.monotonic()
+    result = run_streaming(
+        ["sh", "-c", "echo '  1 passed (1.0s)'; sleep 30"],
+        done_pattern=r"\d+ passed",
+    )
+
+    assert time.monotonic() - start < 10
+    assert result.note is None
+
+
+def test_merge_results_concatenates_the_logs(tmp_path):
+    results = []
+    for index, (returncode, note) in enumerate([(0, None), (1, "killed")]):
+        log_path = tmp_path / f"output-{index}.log"
+        log_path.write_text(f"shard {index}\n")
+        results.append(ProcessResult("", returncode, log_path, note))
+
+    merged = merge_results(results, tmp_path / "output.log")
+
+    assert merged.output == (
+        "=== shard 1 of 2 ===\nshard 0\n=== shard 2 of 2 ===\nshard 1\n"
+    )
+    assert merged.returncode == 1
+    assert merged.note == "killed"
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["output.log"]
@@ -0,0 +1,160 @@
+import os
+import pytest
+from agent.pytest_worker import PytestWorker, shutdown_pytest_worker
+from agent.results import load_results
+from agent.utils import run_pytest_playwright
+
+
+@pytest.fixture
+def worker():
+    worker = PytestWorker(warm_browser=False)
+    yield worker
+    worker.close()
+
+
+def run(worker, test_dir, name, timeout=60):
+    log_path = test_dir / f"{name}.log"
+    args = ["-q", "-p", "no:cacheprovider", str(test_dir)]
+    exit_code, note = worker.run(args, test_dir, log_path, timeout=timeout)
+    return exit_code, note, log_path.read_text() if log_path.exists() else ""
+
+
+def test_worker_runs_pytest_and_logs_the_output(worker, tmp_path):
+    (tmp_path / "test_sample.py").write_text(
+        "def test_passes():\n    assert True\n\ndef test_fails():\n    assert 1 == 2\n"
+    )
+
+    exit_code, note, output = run(worker, tmp_path, "first")
+
+    assert exit_code == 1
+    assert note is None
+    assert "1 failed, 1 passed" in output
+
+
+def test_worker_logs_the_output_to_stderr(worker, tmp_path):
+    (tmp_path / "test_stderr.py").write_text(
+        "import sys\n\ndef test_warns():\n    print('to stderr', file=sys.stderr)\n"
+    )
+    log_path = tmp_path / "run.log"
+
+    exit_code, _ = worker.run(["-q", "-s", str(tmp_path)], tmp_path, log_path)
+
+    assert exit_code == 0
+    assert "to stderr" in log_path.read_text()
+
+
+def test_worker_keeps_playwright_between_runs(tmp_path):
+    ids = tmp_path / "ids.txt"
+    (tmp_path / "test_warm.py").write_text(
+        "def test_playwright(playwright):\n"
+        f"    open({str(ids)!r}, 'a').write(f'{{id(playwright)}}\\n')\n"
+    )
+    worker = PytestWorker()
+    try:
+        results = [run(worker, tmp_path, name)[0] for name in ["first", "second"]]
+    finally:
+        worker.close()
+
+    assert results == [0, 0]
+    first, second = ids.read_text().splitlines()
+    assert first == second
+
+
+def test_worker_imports_changed_modules_again(worker, tmp_path):
+    helper = tmp_path / "helper.py"
+    helper.write_text("VALUE = 1\n")
+    (tmp_path / "test_helper.py").write_text(
+        "from helper import VALUE\n\ndef test_value():\n    assert VALUE == 2\n"
+    )
+
+    exit_code, _, _ = run(worker, tmp_path, "first")
+    assert exit_code == 1
+
+    helper.write_text("VALUE = 2\n")
+    # make sure the change is seen on file systems with a coarse mtime
+    stat = helper.stat()
+    os.utime(helper, (stat.st_atime, stat.st_mtime + 10))
+    exit_code, _, _ = run(worker, tmp_path, "second")
+    assert exit_code == 0
+
+
+def test_worker_is_restarted_after_a_crash(worker, tmp_path):
+    test_file = tmp_path / "test_crash.py"
+    test_file.write_text("import os\n\ndef test_crash():\n    os._exit(3)\n")
+
+    exit_code, note, _ = run(worker, tmp_path, "first")
+    assert exit_code is None
+    assert "crashed" in note
+
+    test_file.write_text("def test_passes():\n    assert True\n")
+    exit_code, note, _ = run(worker, tmp_path, "second")
+    assert exit_code == 0
+    assert note is None
+
+
+def test_worker_is_killed_when_a_run_times_out(worker, tmp_path):
+    (tmp_path / "test_slow.py").write_text(
+        "import time\n\ndef test_slow():\n    time.sleep(60)\n"
+    )
+
+    exit_code, note, _ = run(worker, tmp_path, "first", timeout=1)
+
+    assert exit_code is None
+    assert "killed after 1s" in note
+    assert worker.process is None
+
+
+def test_worker_is_replaced_after_max_runs(tmp_path):
+    (tmp_path / "test_pid.py").write_text(
+        "import os\n\ndef test_pid():\n"
+        "    print('worker', os.getpid())\n    assert False\n"
+    )
+    worker = PytestWorker(max_runs=1, warm_browser=False)
+    try:
+        outputs = [run(worker, tmp_path, name)[2] for name in ["first", "second"]]
+    finally:
+        worker.close()
+
+    pids = [
+        line
+        for output in outputs
+        for line in output.splitlines()
+        if line.startswith("worker ")
+    ]
+    assert len(pids) == 2
+    assert pids[0] != pids[1]
+
+
+def test_run_pytest_playwright_spreads_the_specs_across_workers(tmp_path, monkeypatch):
+    # the workers are started in, and save their artifacts to, the working dir
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("HEADLESS", "true")
+    test_dir = tmp_path / "tests"
+    report_dir = tmp_path / "report"
+    test_dir.mkdir()
+    report_dir.mkdir()
+    specs = []
+    for name in ["a", "b", "c"]:
+        spec = test_dir / f"test_{name}.py"
+        spec.write_text(
+            f"import os\n\ndef test_{name}():\n"
+            f"    open('{name}.pid', 'w').write(str(os.getpid()))\n"
+            f"    assert {name!r} != 'b'\n"
+        )
+        specs.append(spec)
+
+    try:
+        result = run_pytest_playwright(test_dir, report_dir, specs, workers=2)
+    finally:
+        shutdown_pytest_worker()
+
+    assert result.returncode == 1
+    assert "=== shard 2 of 2 ===" in result.output
+    assert sorted(path.name for path in report_dir.glob("*.xml")) == [
+        "junit-0.xml",
+        "junit-1.xml",
+    ]
+    run = load_results("pytest", report_dir, result.output, duration=1)
+    assert sorted(r.status for r in run.results) == ["failed", "passed", "passed"]
+    pids = {path.read_text() for path in tmp_path.glob("*.pid")}
+    assert len(pids) == 2
@@ -0,0 +1,136 @@
+import json
+from agent.results import (
+    TestRun,
+    load_results,
+    parse_junit_xml,
+    parse_playwright_json,
+    trim_stack,
+)
+
+JUNIT_XML = """<?xml version="1.0" encoding="utf-8"?>
+<testsuites><testsuite name="pytest" errors="0" failures="1" skipped="1" tests="3">
+<testcase classname="playwright.test_login" name="test_login[chromium]" time="1.5" />
+<testcase classname="playwright.test_login" name="test_logout[chromium]" time="5.2">
+<failure message="AssertionError: Locator expected to be visible">page = &lt;Page&gt;
+    def test_logout(page):
+&gt;       expect(page.locator("#logout")).to_be_visible()
+E       AssertionError: Locator expected to be visible</failure>
+</testcase>
+<testcase classname="playwright.test_login" name="test_reset" time="0">
+<skipped message="not ready" />
+</testcase>
+</testsuite></testsuites>
+"""
+
+PLAYWRIGHT_JSON = {
+    "suites": [
+        {
+            "title": "login.spec.ts",
+            "file": "login.spec.ts",
+            "specs": [],
+            "suites": [
+                {
+                    "title": "login",
+                    "specs": [
+                        {
+                            "title": "shows an error",
+                            "file": "login.spec.ts",
+                            "line": 12,
+                            "tests": [
+                                {
+                                    "projectName": "chromium",
+                                    "results": [
+                                        {
+                                            "status": "timedOut",
+                                            "duration": 30000,
+                                            "error": {
+                                                "message": "\u001b[31mTimeout\u001b[39m",
+                                                "stack": "Error: Timeout\n    at login.spec.ts:14:5",
+                                            },
+                                            "attachments": [
+                                                {
+                                                    "name": "screenshot",
+                                                    "path": "test-results/login/test-failed-1.png",
+                                                }
+                                            ],
+                                        }
+                                    ],
+                                }
+                            ],
+                        }
+                    ],
+                }
+            ],
+        }
+    ]
+}
+
+
+def test_parse_junit_xml(tmp_path):
+    path = tmp_path / "junit.xml"
+    path.write_text(JUNIT_XML)
+
+    results = parse_junit_xml(path)
+
+    assert [r.status for r in results] == ["passed", "failed", "skipped"]
+    failure = results[1]
+    assert failure.id == "playwright.test_login::test_logout[chromium]"
+    assert failure.duration == 5.2
+    assert failure.message == "AssertionError: Locator expected to be visible"
+    assert "to_be_visible" in failure.stack
+    assert failure.file is None
+
+
+def test_parse_junit_xml_reads_the_spec_file_of_cypress_reports(tmp_path):
+    path = tmp_path / "junit-1234.xml"
+    path.write_text(
+        '<testsuites><testsuite name="Root Suite" file="cypress/e2e/login.cy.js">'
+        '</testsuite><testsuite name="login">'
+        '<testcase classname="login" name="login works" time="1" />'
+        "</testsuite></testsuites>"
+    )
+
+    [result] = parse_junit_xml(path)
+
+    assert result.file == "cypress/e2e/login.cy.js"
+
+
+def test_parse_playwright_json(tmp_path):
+    path = tmp_path / "playwright.json"
+    path.write_text(json.dumps(PLAYWRIGHT_JSON))
+
+    [result] = parse_playwright_json(path)
+
+    assert result.id == "[chromium] login.spec.ts:12 › login › shows an error"
+    assert result.status == "failed"
+    assert result.duration == 30
+    assert result.artifacts == ["test-results/login/test-failed-1.png"]
+
+
+def test_trim_stack_keeps_the_last_lines():
+    stack = "\n".join(f"line {i}" for i in range(20))
+    assert trim_stack(stack, lines=3) == "... (17 lines)\nline 17\nline 18\nline 19"
+
+
+def test_load_results_summarizes_failures_and_keeps_the_log(tmp_path):
+    (tmp_path / "junit.xml").write_text(JUNIT_XML)
+    artifacts = tmp_path / "test-results"
+    (artifacts / "playwright-test-login-py-test-logout-chromium").mkdir(parents=True)
+    (artifacts / "playwright-test-login-py-test-logout-chromium" / "video.webm").touch()
+
+    run = load_results(
+        "pytest", tmp_path, "\x1b[32mverbose output\x1b[0m", 7.0, [artifacts]
+    )
+    summary = run.summary()
+
+    assert (tmp_path / "output.log").read_text() == "verbose output"
+    assert "Ran 3 test(s) in 7.0s: 1 passed, 1 failed, 1 skipped." in summary
+    assert "FAILED playwright.test_login::test_logout[chromium] (5.2s)" in summary
+    assert "test-logout-chromium/video.webm" in summary
+    assert "verbose output" not in summary
+
+
+def test_summary_without_results_includes_the_output():
+    run = TestRun("playwright", output="SyntaxError: Unexpected token")
+
+    assert "SyntaxError: Unexpected token" in run.summary()
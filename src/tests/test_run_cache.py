@@ -0,0 +1,56 @@
+import json
+from agent.results import TestResult, TestRun
+from agent.run_cache import RunCache, run_cache_key
+from agent.selection import TestSelection
+
+
+def selection_of(**digests: str) -> TestSelection:
+    return TestSelection(
+        sorted(digests), True, len(digests), digests=digests, shared="shared"
+    )
+
+
+def test_run_cache_key_changes_with_the_tests_and_the_url():
+    selection = selection_of(login="a", signup="b")
+    key = run_cache_key("pytest", "https://example.com/", selection)
+
+    assert key == run_cache_key("pytest", "https://EXAMPLE.com", selection)
+    assert key != run_cache_key("pytest", "https://example.org", selection)
+    assert key != run_cache_key(
+        "pytest", "https://example.com", selection_of(login="a", signup="c")
+    )
+    assert key != run_cache_key(
+        "pytest", "https://example.com", selection, full_run=True
+    )
+
+
+def test_run_cache_returns_the_stored_run(tmp_path):
+    cache = RunCache(tmp_path / "run_cache.json", ttl=60)
+    run = TestRun(
+        "playwright",
+        results=[
+            TestResult(id="login", status="passed", file="login.spec.ts"),
+            TestResult(id="signup", status="failed", message="Timeout"),
+        ],
+        duration=3.5,
+        log_path=tmp_path / "output.log",
+    )
+
+    assert cache.get("key") is None
+    cache.put("key", run, ["Ran 2 of 3 test file(s)."])
+    cached, notes, _ = cache.get("key")
+
+    assert cached == run
+    assert notes == ["Ran 2 of 3 test file(s)."]
+    assert cached.summary() == run.summary()
+
+
+def test_run_cache_entries_expire(tmp_path):
+    path = tmp_path / "run_cache.json"
+    cache = RunCache(path, ttl=60)
+    cache.put("key", TestRun("pytest"), [])
+    entries = json.loads(path.read_text())
+    entries["key"]["time"] -= 120
+    path.write_text(json.dumps(entries))
+
+    assert cache.get("key") is None
@@ -0,0 +1,162 @@
+import pytest
+from agent.results import TestResult, TestRun
+from agent.selection import (
+    pytest_module_matches,
+    record_run,
+    result_spec,
+    scan_test_files,
+    select_specs,
+)
+
+
+@pytest.fixture
+def test_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv("AGENT_STATE_DIR", str(tmp_path / "state"))
+    test_dir = tmp_path / "playwright"
+    (test_dir / "tests").mkdir(parents=True)
+    (test_dir / "playwright.config.ts").write_text("export default {}")
+    for name in ["login", "signup", "office"]:
+        (test_dir / "tests" / f"{name}.spec.ts").write_text(f"test('{name}')")
+    return test_dir
+
+
+def run_of(*results: tuple[str, str]) -> TestRun:
+    return TestRun(
+        "playwright",
+        results=[
+            TestResult(id=f"{file}:1 › test", status=status, file=file)
+            for file, status in results
+        ],
+    )
+
+
+def test_scan_test_files_skips_dependencies_and_results(test_dir):
+    (test_dir / "node_modules" / "pkg").mkdir(parents=True)
+    (test_dir / "node_modules" / "pkg" / "a.spec.ts").write_text("vendored")
+    (test_dir / "test-results").mkdir()
+    (test_dir / "test-results" / "trace.zip").write_bytes(b"zip")
+
+    specs, shared = scan_test_files(test_dir, "playwright")
+
+    assert sorted(specs) == [
+        "tests/login.spec.ts",
+        "tests/office.spec.ts",
+        "tests/signup.spec.ts",
+    ]
+    assert scan_test_files(test_dir, "playwright")[1] == shared
+
+
+def test_select_specs_runs_new_changed_and_failing_specs(test_dir):
+    selection = select_specs(test_dir, "playwright")
+    assert selection.full_run
+    record_run(
+        test_dir,
+        "playwright",
+        selection,
+        run_of(
+            ("login.spec.ts", "passed"),
+            ("signup.spec.ts", "failed"),
+            ("office.spec.ts", "passed"),
+        ),
+    )
+
+    (test_dir / "tests" / "office.spec.ts").write_text("test('office', changed)")
+    (test_dir / "tests" / "logout.spec.ts").write_text("test('logout')")
+    selection = select_specs(test_dir, "playwright")
+
+    assert not selection.full_run
+    assert selection.specs == [
+        "tests/logout.spec.ts",
+        "tests/office.spec.ts",
+        "tests/signup.spec.ts",
+    ]
+    assert selection.total == 4
+    assert "Ran 3 of 4" in selection.describe()
+
+
+def test_select_specs_skips_specs_that_passed(test_dir):
+    selection = select_specs(test_dir, "playwright")
+    record_run(
+        test_dir,
+        "playwright",
+        selection,
+        run_of(("login.spec.ts", "passed"), ("signup.spec.ts", "passed")),
+    )
+
+    # office.spec.ts did not report any results, e.g. it failed to compile
+    selection = select_specs(test_dir, "playwright")
+    assert selection.specs == ["tests/office.spec.ts"]
+
+    record_run(test_dir, "playwright", selection, run_of(("office.spec.ts", "passed")))
+    selection = select_specs(test_dir, "playwright")
+    assert not selection.full_run
+    assert selection.specs == []
+
+    assert select_specs(test_dir, "playwright", full_run=True).full_run
+
+
+def test_select_specs_runs_everything_when_a_shared_file_changed(test_dir):
+    selection = select_specs(test_dir, "playwright")
+    record_run(
+        test_dir,
+        "playwright",
+        selection,
+        run_of(
+            ("login.spec.ts", "passed"),
+            ("signup.spec.ts", "passed"),
+            ("office.spec.ts", "passed"),
+        ),
+    )
+
+    # the page dumps of a debug run are not sources of the tests
+    (test_dir / "example.com_login.html").write_text("<html></html>")
+    selection = select_specs(test_dir, "playwright")
+    assert not selection.full_run
+    assert selection.specs == []
+
+    (test_dir / "playwright.config.ts").write_text("export default { retries: 1 }")
+
+    selection = select_specs(test_dir, "playwright")
+    assert selection.full_run
+    assert len(selection.specs) == 3
+
+
+def test_pytest_module_matches_the_spec_path():
+    assert pytest_module_matches("test_login", "tests/test_login.py")
+    assert pytest_module_matches("tests.test_login", "tests/test_login.py")
+    assert pytest_module_matches("playwright.tests.test_login", "tests/test_login.py")
+    assert pytest_module_matches("tests.test_login.TestLogin", "tests/test_login.py")
+    assert not pytest_module_matches("other.test_login", "tests/test_login.py")
+    assert not pytest_module_matches("tests.test_logout", "tests/test_login.py")
+
+
+def test_result_spec_uses_the_reported_file():
+    specs = ["e2e/login.cy.js", "e2e/signup.cy.js"]
+    result = TestResult(
+        id="signup works", status="passed", file="cypress/e2e/signup.cy.js"
+    )
+
+    assert result_spec(result, specs) == "e2e/signup.cy.js"
+    assert result_spec(TestResult(id="x", status="passed"), specs) is None
+
+
+def test_select_specs_runs_everything_when_the_url_changed(test_dir):
+    selection = select_specs(test_dir, "playwright", url="https://example.com")
+    record_run(
+        test_dir,
+        "playwright",
+        selection,
+        run_of(
+            ("login.spec.ts", "passed"),
+            ("signup.spec.ts", "passed"),
+            ("office.spec.ts", "passed"),
+        ),
+    )
+
+    selection = select_specs(test_dir, "playwright", url="https://example.com/")
+    assert not selection.full_run
+    assert selection.specs == []
+
+    selection = select_specs(test_dir, "playwright", url="https://staging.example.com")
+    assert selection.full_run
+    assert len(selection.specs) == 3
@@ -0,0 +1,184 @@
+import asyncio
+from pathlib import Path
+import pytest
+from agent.browser import NAVIGATION_TIMEOUT, BrowserManager
+from agent.process import ProcessResult
+from agent.results import TestResult, TestRun
+from agent.selection import record_run, select_specs
+from agent.tools import (
+    browser_click,
+    browser_fill,
+    browser_goto,
+    browser_open,
+    browser_query,
+    browser_snapshot,
+    format_locator_result,
+    run_tests,
+    verify_locators,
+)
+from tests.stubs import StubBrowser, StubPage
+
+
+class FakeManager(BrowserManager):
+    """A browser manager on stub pages that runs each call on a new event loop"""
+
+    def __init__(self):
+        super().__init__()
+        self.elements = {}
+        self._browser = StubBrowser(lambda: StubPage(self.elements))
+        self._slots = asyncio.Semaphore(self.max_pages)
+
+    def run_async(self, fn, timeout=None):
+        return asyncio.run(fn())
+
+
+@pytest.fixture
+def browser(tmp_path, monkeypatch):
+    monkeypatch.setenv("AGENT_STATE_DIR", str(tmp_path / "state"))
+    manager = FakeManager()
+    monkeypatch.setattr("agent.tools.get_browser_manager", lambda: manager)
+    return manager
+
+
+def test_browser_tools_keep_the_session_page(browser):
+    browser.elements[("locator", "#email")] = ["<input id=email>"]
+    browser.elements[("locator", "button")] = ["<button>Go</button>"]
+
+    assert browser_open(url="https://example.com/login") == (
+        "Opened a new browser session. The page is now at "
+        "https://example.com/login (title: Stub)."
+    )
+    page = browser._session.page
+    assert page.timeouts == {"action": 5000, "navigation": NAVIGATION_TIMEOUT}
+
+    assert browser_fill(selector="#email", value="me@example.com").startswith(
+        "Filled #email."
+    )
+    assert browser_click(selector="button").startswith("Clicked button.")
+    assert browser_goto(url="https://example.com/home") == (
+        "The page is now at https://example.com/home (title: Stub)."
+    )
+    assert browser_query(selector="#email").splitlines() == [
+        "#email matches 1 element(s) on https://example.com/home.",
+        "- [0] visible=True html=<input id=email>",
+    ]
+    assert browser_snapshot(mode="html").startswith("The page is now at")
+
+    assert browser._session.page is page
+    assert page.actions == [("fill", "me@example.com", "#email"), ("click", "button")]
+    assert browser.metrics.navigations == 2
+
+    # opening a session again starts from a clean browser context
+    browser_open(url="https://example.com/login")
+    assert browser._session.page is not page
+    assert browser._browser.contexts[0].closed
+    assert browser.metrics.pages_recycled == 1
+
+
+def test_browser_tool_errors_are_returned_as_text(browser):
+    browser_open(url="https://example.com")
+
+    assert browser_click(selector="#missing") == (
+        "Browser session error: Timeout waiting for #missing"
+    )
+    assert browser_click() == "No selector provided to click."
+    # the session page survives the error
+    assert len(browser._browser.contexts) == 1
+    assert not browser._session.page.is_closed()
+
+
+def test_verify_locators_on_the_session_page(browser):
+    browser.elements[("locator", "#login")] = ["<form>"]
+
+    output = verify_locators(
+        locators=[
+            {"kind": "css", "value": "#login"},
+            {"kind": "role", "value": "button", "name": "Go"},
+        ]
+    )
+
+    assert output.splitlines() == [
+        "Checked against the browser session page about:blank:",
+        "- css '#login': 1 match(es), first visible=True, first html=<form>",
+        "- role 'button' name='Go': 0 match(es), first visible=False",
+    ]
+    assert (
+        format_locator_result(
+            {"kind": "text", "value": "Sign in", "error": "Invalid selector"}
+        )
+        == "- text 'Sign in': error: Invalid selector"
+    )
+
+
+def test_verify_locators_uses_a_cached_snapshot(browser):
+    browser.elements[("get_by_text", "Welcome")] = ["<h1>Welcome</h1>"]
+    locators = [{"kind": "text", "value": "Welcome"}]
+
+    output = verify_locators(locators=locators, url="https://example.com/login")
+    assert output.startswith("Checked against the live page https://example.com/")
+    assert browser.metrics.navigations == 1
+
+    # the snapshot stored by the live check answers the next one
+    output = verify_locators(locators=locators, url="https://example.com/login/")
+    assert output.startswith("Checked against a cached snapshot of https://")
+    assert "1 match(es)" in output
+    assert browser.metrics.navigations == 1
+    page = browser._idle[0].page
+    assert page.navigations[-1] == ("https://example.com/login/", "route")
+
+    verify_locators(locators=locators, url="https://example.com/login", live=True)
+    assert browser.metrics.navigations == 2
+
+
+@pytest.fixture
+def test_dir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("AGENT_STATE_DIR", str(tmp_path / "state"))
+    monkeypatch.setenv("AGENT_LANGUAGE", "typescript")
+    monkeypatch.setenv("AGENT_FRAMEWORK", "playwright")
+    monkeypatch.delenv("AGENT_URL", raising=False)
+    monkeypatch.delenv("AGENT_TEST_SELECTION", raising=False)
+    test_dir = Path("playwright")
+    (test_dir / "tests").mkdir(parents=True)
+    return test_dir
+
+
+def test_run_tests_without_test_files(test_dir):
+    # an earlier run recorded the state of a test directory that is now empty
+    record_run(
+        test_dir,
+        "playwright",
+        select_specs(test_dir, "playwright"),
+        TestRun("playwright"),
+    )
+
+    assert run_tests() == "No test files found in playwright."
+
+
+def test_run_tests_force_runs_every_test(test_dir, monkeypatch):
+    (test_dir / "tests" / "login.spec.ts").write_text("test('login')")
+    runs = []
+
+    def run_playwright(test_dir, report_dir, specs=None, workers=1):
+        runs.append(specs)
+        return ProcessResult("", 0)
+
+    monkeypatch.setattr("agent.tools.run_playwright", run_playwright)
+    selection = select_specs(test_dir, "playwright")
+    record_run(
+        test_dir,
+        "playwright",
+        selection,
+        TestRun(
+            "playwright",
+            results=[
+                TestResult(id="login", status="passed", file="tests/login.spec.ts")
+            ],
+        ),
+    )
+
+    assert run_tests().startswith("All 1 test file(s) passed in an earlier run")
+    assert runs == []
+
+    run_tests(force=True)
+    assert runs == [None]
@@ -0,0 +1,110 @@
+import io
+import json
+import zipfile
+from PIL import Image
+from agent.trace import read_trace
+from agent.utils import check_for_screenshots
+
+
+def jpeg(color) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (40, 30), color).save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+
+def write_trace(path, events: list[dict], resources: dict[str, bytes]):
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr("trace.trace", "\n".join(json.dumps(e) for e in events))
+        for name, data in resources.items():
+            archive.writestr(f"resources/{name}", data)
+    return path
+
+
+def test_read_trace_finds_the_failing_action_and_its_frames(tmp_path):
+    events = [
+        {"type": "context-options", "version": 7},
+        {
+            "type": "before",
+            "callId": "call@1",
+            "apiName": "page.goto",
+            "startTime": 0,
+            "params": {"url": "http://localhost"},
+        },
+        {"type": "after", "callId": "call@1", "endTime": 100},
+        {
+            "type": "before",
+            "callId": "call@2",
+            "apiName": "locator.click",
+            "startTime": 200,
+            "params": {"selector": "#submit"},
+        },
+        {"type": "log", "callId": "call@2", "message": "waiting for #submit"},
+        {
+            "type": "after",
+            "callId": "call@2",
+            "endTime": 5200,
+            "error": {"name": "TimeoutError", "message": "Timeout 5000ms exceeded."},
+        },
+        {"type": "console", "messageType": "error", "text": "Failed to load"},
+        {"type": "console", "messageType": "log", "text": "Loaded"},
+    ]
+    resources = {}
+    for timestamp in [50, 1000, 5000, 5100, 9000]:
+        name = f"page@1-{timestamp}.jpeg"
+        events.append(
+            {"type": "screencast-frame", "sha1": name, "timestamp": timestamp}
+        )
+        resources[name] = jpeg((timestamp % 256, 0, 0))
+    path = write_trace(tmp_path / "trace.zip", events, resources)
+
+    digest = read_trace(path)
+
+    assert digest.failing_action.api_name == "locator.click"
+    assert [timestamp for timestamp, _ in digest.frames] == [5000, 5100, 9000]
+    assert digest.console_errors == ["Failed to load"]
+    output = digest.format()
+    assert "page.goto(http://localhost) 100ms" in output
+    assert "locator.click(#submit) 5000ms FAILED: Timeout 5000ms exceeded." in output
+    assert "waiting for #submit" in output
+
+
+def test_read_trace_ignores_other_zip_files(tmp_path):
+    path = tmp_path / "archive.zip"
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr("readme.txt", "not a trace")
+
+    assert read_trace(path) is None
+
+
+def test_check_for_screenshots_skips_the_traces_of_passing_tests(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("AGENT_STATE_DIR", str(tmp_path / ".agent"))
+    monkeypatch.setenv("AGENT_FRAMEWORK", "playwright")
+    results_dir = tmp_path / "playwright" / "test-results"
+    for name, error in [("passes", None), ("fails", {"message": "Timeout"})]:
+        (results_dir / name).mkdir(parents=True)
+        after = {"type": "after", "callId": "call@1", "endTime": 100}
+        if error:
+            after["error"] = error
+        write_trace(
+            results_dir / name / "trace.zip",
+            [
+                {
+                    "type": "before",
+                    "callId": "call@1",
+                    "apiName": f"test.{name}",
+                    "startTime": 0,
+                },
+                after,
+                {"type": "screencast-frame", "sha1": "frame.jpeg", "timestamp": 50},
+            ],
+            {"frame.jpeg": jpeg((255, 0, 0))},
+        )
+    passing = read_trace(results_dir / "passes" / "trace.zip")
+    assert passing.frames and not passing.failed
+
+    screenshots, traces = check_for_screenshots()
+
+    assert len(traces) == 1
+    assert "test.fails" in traces[0]
+    assert len(screenshots) == 1
@@ -0,0 +1,75 @@
+import numpy as np
+from moviepy.editor import ImageSequenceClip
+from PIL import Image
+from agent.video import (
+    build_contact_sheets,
+    extract_all_frames,
+    extract_frames,
+    frame_label,
+)
+
+
+def write_video(path, colors: list[int], fps: int = 10):
+    frames = [np.full((120, 160, 3), color, dtype=np.uint8) for color in colors]
+    ImageSequenceClip(frames, fps=fps).write_videofile(
+        str(path), codec="libvpx", logger=None
+    )
+    return path
+
+
+def test_frame_label_uses_the_frame_timestamp(tmp_path):
+    assert frame_label(tmp_path / "frame0-00-01.50.png") == "0:00:01.50"
+    assert frame_label(tmp_path / "test-failed-1.png") == "test-failed-1"
+
+
+def test_build_contact_sheets_orders_frames_by_timestamp(tmp_path):
+    colors = {"frame0-00-10.00": (0, 0, 255), "frame0-00-02.00": (255, 0, 0)}
+    paths = []
+    for name, color in colors.items():
+        path = tmp_path / f"{name}.png"
+        Image.new("RGB", (800, 600), color).save(path)
+        paths.append(path)
+
+    sheets = build_contact_sheets(paths)
+
+    assert len(sheets) == 1
+    sheet = sheets[0]
+    assert sheet.width == 1536
+    # the earlier frame is placed first, even though it was listed last
+    assert sheet.getpixel((10, 10)) == (255, 0, 0)
+    assert sheet.getpixel((sheet.width // 2 + 10, 10)) == (0, 0, 255)
+
+
+def test_build_contact_sheets_splits_many_frames(tmp_path):
+    paths = []
+    for second in range(20):
+        path = tmp_path / f"frame0-00-{second:02}.00.png"
+        Image.new("RGB", (100, 100)).save(path)
+        paths.append(path)
+
+    assert len(build_contact_sheets(paths)) == 2
+
+
+def test_extract_frames_saves_scene_changes_and_the_last_frame(tmp_path):
+    video = write_video(tmp_path / "video.webm", [0] * 10 + [200] * 10 + [90] * 5)
+
+    frames = extract_frames(video, frames_per_second=5, threshold=10.0)
+
+    assert [frame_label(frame) for frame in frames] == [
+        "0:00:00.00",
+        "0:00:01.00",
+        "0:00:02.00",
+        "0:00:02.40",
+    ]
+
+
+def test_extract_all_frames_processes_videos_in_parallel(tmp_path):
+    videos = []
+    for name in ["first", "second"]:
+        (tmp_path / name).mkdir()
+        videos.append(write_video(tmp_path / name / "video.webm", [0] * 5 + [200] * 5))
+
+    frames = extract_all_frames(videos, workers=2)
+
+    assert sorted(frames) == videos
+    assert all(len(saved) == 3 for saved in frames.values())
@@ -0,0 +1,8 @@
+import { defineConfig } from 'cypress'
+
+export default defineConfig({
+  defaultCommandTimeout: 10000,
+  e2e: {
+    supportFile: "cypress/support/e2e.ts",
+  },
+})
@@ -0,0 +1,7 @@
+import './commands'
+
+Cypress.on('uncaught:exception', (err, runnable) => {
+  // returning false here prevents Cypress from
+  // failing the test
+  return false
+})
\ No newline at end of file